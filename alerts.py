@@ -0,0 +1,316 @@
+import json
+import math
+import socket
+import sys
+import threading
+import urllib.request
+import numpy as np
+from monitor import DROP_OLDEST, SampleBus
+from sample import DISK_FIELDS, NIC_FIELDS, SAMPLE_SCALARS, Sample
+
+# Values a rule can watch: every sample scalar, network and disk totals, the busiest core, the anomaly score
+DERIVED_METRICS = ('net_upload_mbps', 'net_download_mbps', 'net_errors', 'net_drops', 'net_packets_ps',
+                   'disk_iops', 'disk_latency_ms_max', 'cpu_core_max', 'anomaly_score')
+METRICS = SAMPLE_SCALARS + DERIVED_METRICS
+METRIC_INDEX = {name: i for i, name in enumerate(METRICS)}
+
+RULE_KINDS = ('threshold', 'rate', 'anomaly')
+OPERATORS = {'>': 1.0, '<': -1.0}
+SEVERITIES = ('info', 'warning', 'critical')
+
+DEFAULT_RULES = [
+    {'name': 'cpu-high', 'metric': 'cpu_usage_percent', 'op': '>', 'value': 90, 'clear': 80, 'for': 60, 'severity': 'warning'},
+    {'name': 'memory-high', 'metric': 'memory_percent', 'op': '>', 'value': 90, 'clear': 85, 'for': 30, 'severity': 'critical'},
+    {'name': 'disk-full', 'metric': 'disk_percent', 'op': '>', 'value': 95, 'clear': 93, 'severity': 'critical'},
+    {'name': 'network-errors', 'metric': 'net_errors', 'op': '>', 'value': 0, 'for': 10, 'severity': 'warning'},
+    {'name': 'anomaly', 'kind': 'anomaly', 'value': 0, 'clear': 0.02, 'for': 10, 'severity': 'warning'},
+]
+
+
+class Rule:
+    # threshold: the metric crosses `value` in the direction of `op`
+    # rate:      the metric changes faster than `value` per second
+    # anomaly:   the anomaly score drops below `value` (negative = anomalous)
+    # The rule fires once the condition held for `for` seconds and resolves only
+    # when the value is back past `clear` (hysteresis, defaults to `value`).
+    def __init__(self, name, metric=None, kind='threshold', op='>', value=0.0, clear=None, for_seconds=0.0,
+                 repeat=0.0, severity='warning'):
+        if kind not in RULE_KINDS:
+            raise ValueError(f"{name}: unknown rule kind: {kind}")
+        if kind == 'anomaly':
+            metric, op = 'anomaly_score', '<'
+        if metric not in METRIC_INDEX:
+            raise ValueError(f"{name}: unknown metric: {metric}")
+        if op not in OPERATORS:
+            raise ValueError(f"{name}: unknown operator: {op}")
+        if severity not in SEVERITIES:
+            raise ValueError(f"{name}: unknown severity: {severity}")
+        self.name = name
+        self.metric = metric
+        self.kind = kind
+        self.op = op
+        self.value = float(value)
+        self.clear = self.value if clear is None else float(clear)
+        if OPERATORS[op] * (self.value - self.clear) < 0:
+            raise ValueError(f"{name}: the clear level must be on the safe side of the value")
+        self.for_seconds = float(for_seconds)
+        self.repeat = float(repeat) # Re-notify while firing, 0 = only on changes
+        self.severity = severity
+
+    @classmethod
+    def from_dict(cls, rule):
+        rule = dict(rule)
+        if 'for' in rule:
+            rule['for_seconds'] = rule.pop('for')
+        return cls(**rule)
+
+
+def load_rules(path):
+    with open(path, encoding='utf-8') as f:
+        return [Rule.from_dict(rule) for rule in json.load(f)]
+
+
+def alert_metrics(sample, anomaly_score=math.nan):
+    # One value per METRICS entry, NaN where nothing was measured
+    flat = np.asarray(sample.values, dtype=float)
+    schema = sample.schema
+    scalars = len(SAMPLE_SCALARS)
+    values = np.empty(len(METRICS))
+    values[:scalars] = flat[:scalars]
+    totals = flat[schema.nics_at:schema.mounts_at].reshape(-1, len(NIC_FIELDS)).sum(axis=0)
+    disks = flat[schema.disks_at:].reshape(-1, len(DISK_FIELDS))
+    cores = flat[schema.cores_at:schema.nics_at]
+    values[scalars:] = (totals[0], totals[1], totals[2] + totals[3], totals[4] + totals[5], totals[6] + totals[7],
+                        disks[:, 2:4].sum(), disks[:, 4:].max() if len(disks) else 0.0,
+                        cores.max() if len(cores) else math.nan, anomaly_score)
+    return values
+
+
+class AlertEngine:
+    # Rules are compiled into arrays, one evaluation is a handful of numpy
+    # operations over all rules at once. Only state changes produce alerts:
+    # a firing rule is not re-sent (dedup) unless it has a repeat interval,
+    # and a token bucket caps the alerts per minute, whatever the rules say.
+    # Alerts are published on a bus; every sink drains its own subscription
+    # in its own thread, so a slow webhook never holds up collection.
+    def __init__(self, rules=None, sinks=(), rate_limit=60, host=None):
+        self.host = host or socket.gethostname()
+        self.rate_limit = rate_limit # Alerts per minute
+        self.bus = SampleBus()
+        self._sinks = []
+        self._lock = threading.Lock() # evaluate() on the collector, active() from the GUI/daemon
+        self.evaluations = 0
+        self.sent = 0
+        self.suppressed = 0
+        self._pending_suppressed = 0
+        self._tokens = float(rate_limit)
+        self._refilled = None
+        self.compile(rules if rules is not None else [Rule.from_dict(rule) for rule in DEFAULT_RULES])
+        for sink in sinks:
+            self.add_sink(sink)
+
+    def compile(self, rules):
+        names = [rule.name for rule in rules]
+        if len(set(names)) != len(names):
+            raise ValueError("rule names must be unique")
+        with self._lock:
+            self.rules = list(rules)
+            sign = np.array([OPERATORS[rule.op] for rule in rules])
+            self._metric = np.array([METRIC_INDEX[rule.metric] for rule in rules], dtype=np.intp)
+            # Signed, so every comparison is "greater is worse"
+            self._sign = sign
+            self._limit = sign * np.array([rule.value for rule in rules])
+            self._clear = sign * np.array([rule.clear for rule in rules])
+            self._rate = np.array([rule.kind == 'rate' for rule in rules], dtype=bool)
+            self._any_rate = bool(self._rate.any())
+            self._for = np.array([rule.for_seconds for rule in rules])
+            self._repeat = np.array([rule.repeat for rule in rules])
+            self._pending = np.full(len(rules), np.nan) # Since when the condition holds
+            self._firing = np.zeros(len(rules), dtype=bool)
+            self._notified = np.full(len(rules), -np.inf)
+            self._previous = None # (timestamp, metric values)
+
+    def evaluate(self, timestamp, values):
+        with self._lock:
+            current = values[self._metric]
+            if self._any_rate:
+                if self._previous is None or timestamp <= self._previous[0]:
+                    rates = np.full(len(values), np.nan)
+                else:
+                    rates = (values - self._previous[1]) / (timestamp - self._previous[0])
+                current[self._rate] = rates[self._metric[self._rate]]
+            self._previous = (timestamp, values)
+            current *= self._sign
+
+            # NaN (not measured, untrained detector) neither breaches nor clears
+            with np.errstate(invalid='ignore'):
+                breach = current > self._limit
+                cleared = current <= self._clear
+            firing = self._firing
+            pending = self._pending
+            pending[breach & np.isnan(pending)] = timestamp
+            pending[~breach & ~firing] = np.nan
+            fire = breach & ~firing & (timestamp - pending >= self._for)
+            resolve = firing & cleared
+            repeat = firing & ~resolve & (self._repeat > 0) & (timestamp - self._notified >= self._repeat)
+            firing |= fire
+            firing &= ~resolve
+            pending[resolve] = np.nan
+            self.evaluations += 1
+
+            changed = np.flatnonzero(fire | resolve | repeat)
+            if not len(changed):
+                return []
+            self._notified[changed] = timestamp
+            alerts = []
+            for index in changed.tolist():
+                rule = self.rules[index]
+                alerts.append({
+                    'time': round(timestamp, 3),
+                    'host': self.host,
+                    'rule': rule.name,
+                    'state': 'resolved' if resolve[index] else 'firing',
+                    'severity': rule.severity,
+                    'metric': rule.metric,
+                    'kind': rule.kind,
+                    'value': round(float(current[index] * self._sign[index]), 4),
+                    'limit': rule.value,
+                })
+        return [alert for alert in alerts if self._admit(alert)]
+
+    def _admit(self, alert):
+        # Token bucket, refilled by sample time so replays are limited the same way
+        now = alert['time']
+        if self._refilled is not None:
+            self._tokens = min(float(self.rate_limit), self._tokens + (now - self._refilled) * self.rate_limit / 60)
+        self._refilled = now
+        if self._tokens < 1:
+            self.suppressed += 1
+            self._pending_suppressed += 1
+            return False
+        self._tokens -= 1
+        if self._pending_suppressed:
+            alert['suppressed'] = self._pending_suppressed # Alerts dropped since the previous one
+            self._pending_suppressed = 0
+        self.sent += 1
+        self.bus.publish(now, alert)
+        return True
+
+    def observe(self, timestamp, data, anomaly_score=math.nan):
+        sample = data if isinstance(data, Sample) else Sample.from_data(data)
+        return self.evaluate(timestamp, alert_metrics(sample, anomaly_score))
+
+    def active(self):
+        with self._lock:
+            return [self.rules[index].name for index in np.flatnonzero(self._firing).tolist()]
+
+    def add_sink(self, sink):
+        worker = _SinkWorker(self.bus, sink)
+        self._sinks.append(worker)
+        return worker
+
+    def start(self):
+        for worker in self._sinks:
+            worker.start()
+
+    def stop(self):
+        for worker in self._sinks:
+            worker.stop()
+
+    def stats(self):
+        return {
+            'rules': len(self.rules),
+            'evaluations': self.evaluations,
+            'firing': int(self._firing.sum()),
+            'sent': self.sent,
+            'suppressed': self.suppressed,
+            'sinks': {worker.sink.name: worker.stats() for worker in self._sinks},
+        }
+
+
+class _SinkWorker:
+    def __init__(self, bus, sink, maxlen=1000):
+        self.sink = sink
+        self.bus = bus
+        self.subscription = bus.subscribe(sink.name, maxlen, DROP_OLDEST)
+        self.errors = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run(self):
+        while True:
+            stopping = self._stop.is_set()
+            if not stopping:
+                self.subscription.wait()
+            for timestamp, alert in self.subscription.drain():
+                try:
+                    self.sink.send(alert)
+                except Exception as e:
+                    # A broken sink loses its alerts, the others are unaffected
+                    self.errors += 1
+                    self.last_error = str(e)
+            if stopping:
+                break
+        close = getattr(self.sink, 'close', None)
+        if close is not None:
+            close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=f'alerts-{self.sink.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        # Alerts already queued are still delivered
+        self._stop.set()
+        self.subscription.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.bus.unsubscribe(self.subscription)
+
+    def stats(self):
+        stats = self.subscription.stats()
+        return {'delivered': stats['consumed'], 'dropped': stats['dropped'], 'errors': self.errors,
+                'last_error': self.last_error}
+
+
+class StdoutSink:
+    name = 'stdout'
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, alert):
+        self.stream.write(json.dumps({'alert': alert}) + '\n')
+        self.stream.flush()
+
+
+class LogFileSink:
+    name = 'log'
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def send(self, alert):
+        self._file.write(json.dumps(alert) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class WebhookSink:
+    # JSON POST per alert, meant for a local receiver (chat bridge, pager relay)
+    name = 'webhook'
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        request = urllib.request.Request(self.url, data=json.dumps(alert).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
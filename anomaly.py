@@ -1,35 +1,229 @@
-from sklearn.ensemble import IsolationForest
+import threading
+import time
 import numpy as np
-import pandas as pd
+from features import FeatureExtractor, contributions, robust_scale
+
+MAX_TRAIN_SAMPLES = 3600
+
+
+def training_rows(weights, max_train_samples):
+    # Indices of the rows a fit uses: the newest ones covering max_train_samples
+    # base intervals, one row per base interval
+    covered = np.cumsum(weights[::-1])
+    n = min(int(np.searchsorted(covered, max_train_samples)) + 1, len(covered))
+    steps = np.floor(covered[:n] + 1e-9)
+    keep = np.flatnonzero(np.diff(steps, prepend=0.0) > 0)
+    return len(weights) - 1 - keep[::-1]
+
 
 class AnomalyDetector:
-    def __init__(self, contamination=0.01, random_state=42, min_samples=60):
-        self.model = IsolationForest(random_state=random_state, contamination=contamination)
+    # min_samples, relearning_interval and max_train_samples count samples at
+    # the base interval: faster samples count by the time they cover, and the
+    # model is fitted on one row per base interval, so a burst neither brings a
+    # retrain forward nor outweighs the rest of the training window.
+    # capacity is the number of feature rows kept, at least max_train_samples.
+    def __init__(self, contamination=0.01, random_state=42, min_samples=60, relearning_interval=180,
+                 max_train_samples=MAX_TRAIN_SAMPLES, fit_histogram=None, interval=1.0, capacity=None):
+        self.contamination = contamination
+        self.random_state = random_state
         self.is_trained = False
         self.min_samples = min_samples
+        self.relearning_interval = relearning_interval
+        self.max_train_samples = max_train_samples
+        # Training window is bounded, no matter the uptime
+        self.features = FeatureExtractor(capacity=max(capacity or 0, max_train_samples), interval=interval)
+        self._fitted = None # (model, center, scale), swapped as a single reference
+        self._since_training = 0.0 # Weighted samples since the last fit started
+        self._refit = False
+        self._training_thread = None
+        self.fit_histogram = fit_histogram # diagnostics.Histogram of fit durations, optional
 
-    def train(self, data_list):
-        if len(data_list) < self.min_samples:
-            return False
+    @property
+    def model(self):
+        return self._fitted[0] if self._fitted else None
+
+    @property
+    def is_training(self):
+        return self._training_thread is not None and self._training_thread.is_alive()
 
-        # Use CPU % and Memory % data
-        df = pd.DataFrame([entry['data'] for entry in data_list])
-        features = df[['cpu_usage_percent', 'memory_percent']].values
-        
-        # Learning the model
-        self.model.fit(features)
+    def _fit(self, features):
+        # Imported here, so scikit-learn is only loaded once a model is actually trained
+        from sklearn.ensemble import IsolationForest
+
+        start = time.perf_counter()
+        model = IsolationForest(random_state=self.random_state, contamination=self.contamination)
+        model.fit(features)
+
+        # Robust per-feature spread of the training set, used to explain scores
+        center = np.median(features, axis=0)
+        scale = robust_scale(np.median(np.abs(features - center), axis=0), center)
+
+        # Swapping a single reference is atomic, scoring never sees a half-fitted model
+        self._fitted = (model, center, scale)
         self.is_trained = True
+        if self.fit_histogram is not None:
+            self.fit_histogram.record(time.perf_counter() - start)
+
+    def _consume(self, store):
+        new = self.features.update(store)
+        self._since_training += float(self.features.weights(new).sum())
+
+    def _window(self):
+        # Training rows (a copy), or None before min_samples
+        weights = self.features.weights()
+        if not len(weights) or weights.sum() < self.min_samples - 1e-6:
+            return None
+        return self.features.matrix()[training_rows(weights, self.max_train_samples)]
+
+    def train(self, store):
+        self._consume(store)
+        window = self._window()
+        if window is None:
+            return False
+
+        self._since_training = 0.0
+        self._refit = False
+        self._fit(window)
         return True
 
-    def predict_anomaly_score(self, current_data):
-        if not self.is_trained:
+    def train_async(self, store):
+        self._consume(store)
+        features = None if self.is_training else self._window()
+        if features is None:
+            return False
+
+        # The window is a copy, the background fit doesn't see later appends
+        self._since_training = 0.0
+        self._refit = False
+        self._training_thread = threading.Thread(target=self._fit, args=(features,), daemon=True)
+        self._training_thread.start()
+        return True
+
+    def update(self, store):
+        self._consume(store)
+        if not self.is_trained or self._refit or self._since_training >= self.relearning_interval - 1e-6:
+            return self.train_async(store)
+        return False
+
+    def reconfigure(self, contamination, relearning_interval, min_samples):
+        # The current model keeps scoring, a new contamination is fitted in the background
+        self.relearning_interval = relearning_interval
+        self.min_samples = min_samples
+        if contamination != self.contamination:
+            self.contamination = contamination
+            self._refit = True
+
+    def _current(self, features):
+        return self.features.latest() if features is None else features
+
+    def predict_anomaly_score(self, features=None):
+        fitted = self._fitted
+        current = self._current(features)
+        if fitted is None or current is None:
             return 0.0 # Model not trained yet
-        
-        current_features = np.array([[
-            current_data['cpu_usage_percent'], 
-            current_data['memory_percent']
-        ]])
-        
+
         # The decision_function returns the anomaly score. Lower scores indicate more abnormal instances.
-        score = self.model.decision_function(current_features)[0]
-        return score
\ No newline at end of file
+        score = fitted[0].decision_function(current.reshape(1, -1))[0]
+        return score
+
+    def explain(self, features=None):
+        fitted = self._fitted
+        current = self._current(features)
+        if fitted is None or current is None:
+            return {}
+
+        _, center, scale = fitted
+        return contributions((current - center) / scale)
+
+
+class StreamingAnomalyDetector:
+    # Robust streaming z-score: exponentially weighted mean and mean absolute
+    # deviation per feature, updated in O(1) per sample. Once warmed up, values
+    # are clipped before updating so a spike doesn't become the new normal.
+    # alpha and min_samples are per base interval, faster samples count by the
+    # time they cover, so a burst doesn't pull the baseline along faster.
+    def __init__(self, min_samples=60, alpha=0.01, threshold=4.0, interval=1.0):
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.threshold = threshold
+        self.features = FeatureExtractor(capacity=max(min_samples, 600), interval=interval)
+        self.mean = None
+        self.deviation = None
+        self.samples = 0
+
+    @property
+    def is_trained(self):
+        return self.samples >= self.min_samples - 1e-6 # Weighted, ten 0.1 s samples make one
+
+    @property
+    def is_training(self):
+        return False
+
+    def _scale(self):
+        return robust_scale(self.deviation, self.mean)
+
+    def observe(self, values, weight=1.0):
+        if self.mean is None:
+            self.mean = values.copy()
+            self.deviation = np.zeros_like(values)
+        elif not self.is_trained:
+            # Plain running averages while warming up
+            rate = weight / (self.samples + weight)
+            diff = values - self.mean
+            self.mean += rate * diff
+            self.deviation += rate * (np.abs(diff) - self.deviation)
+        else:
+            alpha = self.alpha if weight == 1.0 else 1.0 - (1.0 - self.alpha) ** weight
+            limit = self.threshold * self._scale()
+            diff = np.clip(values, self.mean - limit, self.mean + limit) - self.mean
+            self.mean += alpha * diff
+            self.deviation += alpha * (np.abs(diff) - self.deviation)
+        self.samples += weight
+
+    def update(self, store):
+        # Consume every sample appended since the last call, not just the latest one
+        new = self.features.update(store)
+        for values, weight in zip(self.features.matrix(new), self.features.weights(new).tolist()):
+            self.observe(values, weight)
+        return new > 0
+
+    def train(self, store):
+        self.update(store)
+        return self.is_trained
+
+    def reconfigure(self, contamination, relearning_interval, min_samples):
+        # No contamination or retraining here, the running statistics are kept
+        self.min_samples = min_samples
+
+    def _zscores(self, features):
+        current = self.features.latest() if features is None else features
+        if not self.is_trained or current is None:
+            return None
+        return (current - self.mean) / self._scale()
+
+    def predict_anomaly_score(self, features=None):
+        z = self._zscores(features)
+        if z is None:
+            return 0.0
+
+        # Same convention as IsolationForest: negative means anomalous
+        return (self.threshold - np.abs(z).max()) / self.threshold
+
+    def explain(self, features=None):
+        z = self._zscores(features)
+        return {} if z is None else contributions(z)
+
+
+DETECTOR_MODES = ('isolation_forest', 'streaming')
+
+
+def create_detector(mode='isolation_forest', contamination=0.01, random_state=42, min_samples=60, relearning_interval=180,
+                    fit_histogram=None, interval=1.0, capacity=None):
+    if mode == 'streaming':
+        # Nothing to retrain, every sample updates the model in place
+        return StreamingAnomalyDetector(min_samples=min_samples, interval=interval)
+    if mode == 'isolation_forest':
+        return AnomalyDetector(contamination=contamination, random_state=random_state,
+                               min_samples=min_samples, relearning_interval=relearning_interval,
+                               fit_histogram=fit_histogram, interval=interval, capacity=capacity)
+    raise ValueError(f"unknown detector mode: {mode}")
@@ -0,0 +1,139 @@
+import argparse
+import math
+import time
+import numpy as np
+from benchmarks.fake_psutil import FakePsutil, installed
+from benchmarks.synthetic import make_sample
+from engine import MonitorEngine
+from monitor import SysMonitor
+from sample import Sample
+
+# (start s, length s, kind): a sustained CPU step, a traffic burst, a short CPU spike
+EPISODES = ((300, 60, 'cpu'), (900, 30, 'network'), (1500, 3, 'cpu'))
+
+
+def trace(t, rng, episodes=EPISODES, cores=8):
+    # A quiet host with noise, except during the episodes
+    cpu, network = 25.0, 5.0
+    for start, length, kind in episodes:
+        if start <= t < start + length:
+            if kind == 'cpu':
+                cpu = 95.0
+            else:
+                network = 200.0
+    data = make_sample(0, cores=cores, nics=2, mounts=1, disks=1)
+    loads = np.clip(cpu + rng.normal(0, 3, cores), 0, 100)
+    data['cpu_usage_percent'] = float(loads.mean())
+    data['cpu_usage_per_core_percent'] = loads.tolist()
+    data['memory_percent'] = 40 + float(rng.normal(0, 0.2))
+    data['disk_read_mbps'] = max(2 + float(rng.normal(0, 0.5)), 0.0)
+    for stats in data['network_stats']:
+        stats['upload_mbps'] = max(network / 10 + float(rng.normal(0, 0.2)), 0.0)
+        stats['download_mbps'] = max(network / 2 + float(rng.normal(0, 0.5)), 0.0)
+    return data
+
+
+def collect_cost(ticks):
+    # CPU time of one collect_data with only the every-tick probes due; the
+    # slow ones (processes, partitions, sensors) run on their own interval
+    # whatever the sampling rate, so they cost the same in every mode
+    backend = FakePsutil()
+    with installed(backend):
+        monitor = SysMonitor(run_interval=0)
+        monitor.collect_data()
+        for probe in monitor.engine.probes.values():
+            if probe.interval:
+                probe.interval = math.inf
+        start = time.process_time()
+        for _ in range(ticks):
+            backend.advance()
+            monitor.collect_data()
+        elapsed = time.process_time() - start
+        monitor.engine.shutdown()
+    return elapsed / ticks
+
+
+def simulate(interval, adaptive, args):
+    # SysMonitor.run in simulated time: the same store and sinks, no sleeping.
+    # The engine's scoring thread is stood in for by scoring after each sample.
+    rng = np.random.default_rng(args.seed)
+    with installed(FakePsutil()):
+        engine = MonitorEngine(run_interval=interval, retention=args.retention, detector_mode='streaming',
+                               adaptive=adaptive, burst_interval=args.burst_interval, burst_hold=args.burst_hold)
+    monitor = engine.monitor
+    times = []
+    cpu_seen = []
+    pipeline = 0.0
+    t = 0.0
+    while t < args.duration:
+        data = Sample.from_data(trace(t, rng))
+        start = time.process_time()
+        monitor.deliver(t, data)
+        engine.score()
+        pipeline += time.process_time() - start
+        times.append(t)
+        cpu_seen.append(data.scalar('cpu_usage_percent'))
+        t += interval if monitor.sampler is None else monitor.sampler.next_interval(t)
+    monitor.engine.shutdown()
+    history = monitor.store.timestamps()
+    return np.array(times), np.array(cpu_seen), pipeline, engine.sampler, float(history[-1] - history[0])
+
+
+def episode_report(times, args):
+    # Per episode: samples inside it and the time until the first burst-rate sample
+    rows = []
+    spacing = np.diff(times, append=times[-1] + args.interval)
+    for start, length, kind in EPISODES:
+        inside = (times >= start) & (times < start + length)
+        fast = np.flatnonzero((times >= start) & (spacing <= args.burst_interval * 1.01))
+        delay = times[fast[0]] - start if len(fast) else math.nan
+        rows.append((f'{kind}@{start}s/{length}s', int(inside.sum()), delay))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive sampling: overhead vs. fixed high-rate sampling, and time to full resolution on incidents")
+    parser.add_argument('--duration', type=float, default=1800, help="simulated seconds")
+    parser.add_argument('--interval', type=float, default=1.0, help="steady-state interval (s)")
+    parser.add_argument('--burst-interval', type=float, default=0.1)
+    parser.add_argument('--burst-hold', type=float, default=10.0)
+    parser.add_argument('--retention', type=int, default=3600)
+    parser.add_argument('--collect-ticks', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    per_collect = collect_cost(args.collect_ticks)
+    print(f"collect_data (every-tick probes): {per_collect * 1000:.3f} ms CPU per sample")
+    print(f"{args.duration:.0f} s simulated, episodes: {', '.join(f'{kind} at {start}s for {length}s' for start, length, kind in EPISODES)}\n")
+
+    modes = (
+        (f'fixed {1 / args.interval:g} Hz', args.interval, False),
+        (f'fixed {1 / args.burst_interval:g} Hz', args.burst_interval, False),
+        (f'adaptive {1 / args.interval:g}-{1 / args.burst_interval:g} Hz', args.interval, True),
+    )
+    results = {}
+    for name, interval, adaptive in modes:
+        results[name] = simulate(interval, adaptive, args)
+
+    fast = results[modes[1][0]]
+    fast_cpu = len(fast[0]) * per_collect + fast[2]
+    print(f"{'mode':<20} {'samples':>8} {'cpu_s':>8} {'cpu_%':>7} {'vs fixed fast':>14} {'history_s':>10}")
+    for name, (times, cpu_seen, pipeline, sampler, history) in results.items():
+        cpu = len(times) * per_collect + pipeline
+        print(f"{name:<20} {len(times):>8} {cpu:>8.2f} {cpu / args.duration * 100:>7.3f} {cpu / fast_cpu * 100:>13.1f}% {history:>10.0f}")
+
+    print(f"\n{'episode':<22}" + ''.join(f" {name:>28}" for name in results))
+    reports = {name: episode_report(times, args) for name, (times, *_) in results.items()}
+    for i, (start, length, kind) in enumerate(EPISODES):
+        cells = []
+        for name in results:
+            label, count, delay = reports[name][i]
+            cells.append(f"{count:>5} samples, fast after {delay:5.1f}s" if delay == delay else f"{count:>5} samples, never fast")
+        print(f"{reports[modes[0][0]][i][0]:<22}" + ''.join(f" {cell:>28}" for cell in cells))
+
+    sampler = results[modes[2][0]][3]
+    print(f"\nadaptive: {sampler.bursts} bursts, triggers {sampler.triggers}, {sampler.suppressed} suppressed for lack of history room")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import argparse
+import time
+import numpy as np
+from alerts import METRICS, AlertEngine, Rule, alert_metrics
+from benchmarks.synthetic import make_sample
+from sample import Sample
+
+
+def make_rules(count, seed=5):
+    # Thresholds, rates and anomaly rules over random metrics, a third of them with a duration and hysteresis
+    rng = np.random.default_rng(seed)
+    rules = []
+    for i in range(count):
+        kind = ('threshold', 'threshold', 'rate', 'anomaly')[i % 4]
+        op = '>' if rng.random() < 0.8 else '<'
+        value = float(rng.uniform(0, 100))
+        sign = 1 if op == '>' else -1
+        if kind == 'anomaly':
+            op, value, sign = '<', float(rng.uniform(-0.1, 0.0)), -1
+        elif kind == 'rate':
+            value = float(rng.uniform(0.5, 20))
+        sustained = i % 3 == 0
+        rules.append(Rule(f'rule-{i}', metric=METRICS[i % (len(METRICS) - 1)], kind=kind, op=op, value=value,
+                          clear=value - sign * 5 if sustained else None, for_seconds=30 if sustained else 0))
+    return rules
+
+
+def metric_stream(ticks, seed=6):
+    # Metrics slowly drifting through the thresholds. The anomaly score is
+    # noisy around zero, with a one minute anomalous episode every 500 ticks.
+    rng = np.random.default_rng(seed)
+    values = np.abs(50 + np.cumsum(rng.normal(0, 0.5, (ticks, len(METRICS))), axis=0))
+    values[:, -1] = rng.normal(0.02, 0.03, ticks) - 0.08 * (np.arange(ticks) % 500 >= 440)
+    return values
+
+
+def naive_evaluate(rules, state, timestamp, values, previous):
+    # The same semantics rule by rule, the shape an interpreted rule list takes
+    fired = []
+    for rule in rules:
+        index = METRICS.index(rule.metric)
+        value = values[index]
+        if rule.kind == 'rate':
+            if previous is None:
+                continue
+            value = (value - previous[1][index]) / (timestamp - previous[0])
+        sign = 1 if rule.op == '>' else -1
+        pending, firing = state.get(rule.name, (None, False))
+        breach = sign * value > sign * rule.value
+        if firing:
+            if sign * value <= sign * rule.clear:
+                state[rule.name] = (None, False)
+                fired.append(rule.name)
+            continue
+        if not breach:
+            state[rule.name] = (None, False)
+            continue
+        pending = timestamp if pending is None else pending
+        firing = timestamp - pending >= rule.for_seconds
+        state[rule.name] = (pending, firing)
+        if firing:
+            fired.append(rule.name)
+    return fired
+
+
+class SlowSink:
+    name = 'slow'
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.received = 0
+
+    def send(self, alert):
+        time.sleep(self.delay)
+        self.received += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alert rules: evaluation cost per tick and sink isolation")
+    parser.add_argument('--rules', type=int, nargs='+', default=[10, 100, 1000, 5000, 10000])
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--naive-ticks', type=int, default=200)
+    args = parser.parse_args()
+
+    stream = metric_stream(args.ticks)
+    print(f"{'rules':>7} {'compiled us/tick':>17} {'naive us/tick':>14} {'transitions/tick':>17}")
+    for count in args.rules:
+        rules = make_rules(count)
+        engine = AlertEngine(rules, rate_limit=10 ** 9)
+        transitions = 0
+        start = time.perf_counter()
+        for tick, values in enumerate(stream):
+            transitions += len(engine.evaluate(float(tick), values.copy()))
+        compiled = (time.perf_counter() - start) / args.ticks
+
+        state = {}
+        previous = None
+        naive_ticks = min(args.naive_ticks, args.ticks)
+        start = time.perf_counter()
+        for tick, values in enumerate(stream[:naive_ticks].tolist()):
+            naive_evaluate(rules, state, float(tick), values, previous)
+            previous = (float(tick), values)
+        naive = (time.perf_counter() - start) / naive_ticks
+        print(f"{count:>7} {compiled * 1e6:>17.1f} {naive * 1e6:>14.1f} {transitions / args.ticks:>17.2f}")
+
+    # Metric extraction from a real sample shape, paid once per tick whatever the rule count
+    sample = Sample.from_data(make_sample(0, cores=64, nics=32, mounts=8))
+    start = time.perf_counter()
+    for _ in range(args.ticks):
+        alert_metrics(sample, 0.0)
+    print(f"\nmetric vector (64 cores, 32 NICs): {(time.perf_counter() - start) / args.ticks * 1e6:.1f} us/tick")
+
+    # Flapping: the raw "score < 0" flips against the default anomaly rule (10 s, clears at 0.02)
+    scores = stream[:, -1]
+    raw_flips = int(np.count_nonzero(np.diff(scores < 0)))
+    engine = AlertEngine(rate_limit=10 ** 9)
+    blank = np.full(len(METRICS), np.nan)
+    notifications = 0
+    for tick, score in enumerate(scores.tolist()):
+        blank[-1] = score
+        notifications += len(engine.evaluate(float(tick), blank.copy()))
+    print(f"anomaly label flips over {args.ticks} s: {raw_flips}, alert notifications: {notifications}")
+
+    # A sink that takes 200 ms per alert must not slow down evaluation
+    slow = SlowSink(0.2)
+    engine = AlertEngine(make_rules(1000), sinks=[slow], rate_limit=10 ** 9)
+    engine.start()
+    start = time.perf_counter()
+    for tick, values in enumerate(stream[:500]):
+        engine.evaluate(float(tick), values.copy())
+    elapsed = time.perf_counter() - start
+    stats = engine.stats()
+    engine.stop()
+    sink = stats['sinks']['slow']
+    print(f"slow sink (200 ms/alert), 1000 rules: {elapsed / 500 * 1e6:.1f} us/tick, "
+          f"{stats['sent']} alerts sent, {sink['delivered']} delivered, {sink['dropped']} dropped by the sink queue")
+
+
+if __name__ == '__main__':
+    main()
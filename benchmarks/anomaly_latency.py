@@ -0,0 +1,54 @@
+import argparse
+import time
+import numpy as np
+from anomaly import AnomalyDetector, StreamingAnomalyDetector
+from benchmarks.synthetic import make_sample
+from store import SampleStore
+
+
+def fill_store(size):
+    store = SampleStore(capacity=size)
+    for i in range(size):
+        store.append(i, make_sample(i, cores=4, nics=2, mounts=1))
+    return store
+
+
+def timed(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return np.array(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anomaly detector training time and scoring latency vs. history size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[600, 3600, 36000, 100000])
+    parser.add_argument('--window', type=int, default=3600, help="bounded training window of the detector")
+    parser.add_argument('--scores', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'history':>8} {'full_fit_s':>11} {'window_fit_s':>13} {'if_score_us':>12} {'stream_upd_us':>14} {'stream_score_us':>16}")
+    for size in args.sizes:
+        store = fill_store(size)
+
+        unbounded = AnomalyDetector(min_samples=10, max_train_samples=size)
+        full_fit = timed(lambda: unbounded.train(store), 1).mean()
+
+        bounded = AnomalyDetector(min_samples=10, max_train_samples=args.window)
+        window_fit = timed(lambda: bounded.train(store), 1).mean()
+        if_score = np.median(timed(lambda: bounded.predict_anomaly_score(), args.scores))
+
+        streaming = StreamingAnomalyDetector(min_samples=10)
+        start = time.perf_counter()
+        streaming.update(store)
+        stream_update = (time.perf_counter() - start) / size
+        stream_score = np.median(timed(lambda: streaming.predict_anomaly_score(), args.scores))
+
+        print(f"{size:>8} {full_fit:>11.3f} {window_fit:>13.3f} {if_score * 1e6:>12.1f} "
+              f"{stream_update * 1e6:>14.2f} {stream_score * 1e6:>16.2f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
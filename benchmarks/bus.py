@@ -0,0 +1,61 @@
+import argparse
+import threading
+import time
+from benchmarks.synthetic import make_sample
+from monitor import COALESCE_LATEST, DROP_OLDEST, SampleBus
+
+
+def consume(subscription, delay, stop):
+    while not stop.is_set():
+        if subscription.wait(0.1):
+            for _ in subscription.drain():
+                if delay:
+                    time.sleep(delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish cost and per-subscriber lag of the sample bus")
+    parser.add_argument('--samples', type=int, default=20000)
+    parser.add_argument('--rate', type=float, default=1000.0, help="published samples per second")
+    parser.add_argument('--slow-delay', type=float, default=0.005, help="processing time of the slow consumer (s)")
+    args = parser.parse_args()
+
+    bus = SampleBus()
+    consumers = {
+        'fast_drop_oldest': (bus.subscribe('fast_drop_oldest', 64, DROP_OLDEST), 0.0),
+        'slow_drop_oldest': (bus.subscribe('slow_drop_oldest', 64, DROP_OLDEST), args.slow_delay),
+        'slow_coalesce': (bus.subscribe('slow_coalesce', policy=COALESCE_LATEST), args.slow_delay),
+    }
+    stop = threading.Event()
+    threads = [threading.Thread(target=consume, args=(subscription, delay, stop))
+               for subscription, delay in consumers.values()]
+    for thread in threads:
+        thread.start()
+
+    sample = make_sample(0)
+    publish_time = 0.0
+    next_tick = time.perf_counter()
+    for i in range(args.samples):
+        start = time.perf_counter()
+        bus.publish(time.time(), sample)
+        publish_time += time.perf_counter() - start
+        next_tick += 1 / args.rate
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    time.sleep(0.2)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"published: {args.samples} at {args.rate:.0f}/s, publish cost {publish_time / args.samples * 1e6:.2f} us "
+          f"with {len(consumers)} subscribers")
+    print(f"\n{'subscriber':<18} {'consumed':>9} {'dropped':>8} {'max_depth':>9} {'lag':>5} {'max_latency_ms':>15}")
+    for name, stats in bus.stats().items():
+        print(f"{name:<18} {stats['consumed']:>9} {stats['dropped']:>8} {stats['max_depth']:>9} "
+              f"{stats['lag']:>5} {stats['max_latency_ms']:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
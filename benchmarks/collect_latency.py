@@ -0,0 +1,38 @@
+import argparse
+import time
+import numpy as np
+from monitor import SysMonitor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-sample cost of SysMonitor.collect_data")
+    parser.add_argument('--samples', type=int, default=500)
+    parser.add_argument('--interval', type=float, default=0.0, help="sleep between samples (s)")
+    args = parser.parse_args()
+
+    monitor = SysMonitor(run_interval=args.interval)
+    durations = np.empty(args.samples)
+    for i in range(args.samples):
+        start = time.perf_counter()
+        data = monitor.collect_data()
+        durations[i] = time.perf_counter() - start
+        if 'error' in data:
+            raise SystemExit(data['error'])
+        if args.interval:
+            time.sleep(args.interval)
+
+    ms = durations * 1000
+    print(f"samples: {args.samples}")
+    print(f"mean: {ms.mean():.3f} ms  p50: {np.percentile(ms, 50):.3f} ms  "
+          f"p99: {np.percentile(ms, 99):.3f} ms  max: {ms.max():.3f} ms")
+
+    print(f"\n{'probe':<14} {'runs':>6} {'mean_ms':>9} {'max_ms':>9} {'total_s':>9} {'timeouts':>9}")
+    stats = sorted(monitor.probe_stats().items(), key=lambda item: item[1]['total_s'], reverse=True)
+    for name, probe in stats:
+        print(f"{name:<14} {probe['count']:>6} {probe['mean_ms']:>9.3f} {probe['max_ms']:>9.3f} "
+              f"{probe['total_s']:>9.3f} {probe['timeouts']:>9}")
+    monitor.engine.shutdown()
+
+
+if __name__ == '__main__':
+    main()
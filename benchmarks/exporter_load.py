@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+# The exporter runs in a child process, so the load generator doesn't share its GIL.
+SERVER = """
+import sys, time
+from benchmarks.synthetic import make_sample
+from exporter import MetricsExporter
+
+class Engine:
+    class monitor:
+        sinks = []
+    class detector:
+        is_trained = True
+    anomaly_score = 0.12
+    is_anomaly = False
+    def score(self):
+        return self.anomaly_score
+
+engine = Engine()
+exporter = MetricsExporter(engine, '127.0.0.1', 0)
+exporter.start()
+print(exporter.port, flush=True)
+i = 0
+while True:
+    exporter.publish(time.time(), make_sample(i, cores=16, nics=8, mounts=6))
+    i += 1
+    time.sleep(float(sys.argv[1]))
+"""
+
+REQUEST = b'GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n'
+
+
+async def scraper(port, deadline, latencies, sizes):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(REQUEST)
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            sizes.append(length)
+            await asyncio.sleep(0)
+    finally:
+        writer.close()
+
+
+async def load(port, clients, duration):
+    latencies, sizes = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(scraper(port, deadline, latencies, sizes) for _ in range(clients)))
+    return np.array(latencies) * 1000, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent scrape latency of the /metrics endpoint")
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 50, 200, 500])
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--publish-interval', type=float, default=0.1, help="seconds between new samples")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen([sys.executable, '-c', SERVER, str(args.publish_interval)], cwd=root,
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(server.stdout.readline())
+        print(f"{'clients':>8} {'scrapes/s':>10} {'p50_ms':>8} {'p99_ms':>8} {'max_ms':>8} {'body_bytes':>11}")
+        for clients in args.clients:
+            ms, sizes = asyncio.run(load(port, clients, args.duration))
+            print(f"{clients:>8} {len(ms) / args.duration:>10.0f} {np.percentile(ms, 50):>8.2f} "
+                  f"{np.percentile(ms, 99):>8.2f} {ms.max():>8.2f} {int(np.mean(sizes)):>11}", flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
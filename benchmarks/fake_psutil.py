@@ -0,0 +1,118 @@
+import contextlib
+import math
+from collections import namedtuple
+import psutil
+import probes
+from benchmarks.process_probe import SyntheticProcessTable
+
+# Field names of the psutil result types the probes read
+CpuFreq = namedtuple('CpuFreq', 'current min max')
+VirtualMemory = namedtuple('VirtualMemory', 'total available percent used free')
+DiskUsage = namedtuple('DiskUsage', 'total used free percent')
+Partition = namedtuple('Partition', 'device mountpoint fstype opts')
+DiskIO = namedtuple('DiskIO', 'read_count write_count read_bytes write_bytes read_time write_time')
+NetIO = namedtuple('NetIO', 'bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout')
+Temperature = namedtuple('Temperature', 'label current high critical')
+
+GIB = 1024 ** 3
+
+
+def _wave(tick, phase=0.0, period=60.0):
+    return math.sin((tick + phase) / period)
+
+
+def _area(tick, rate, period=60.0):
+    # Closed-form integral of rate * (1 + sin(t / period)) up to tick, a smooth monotonic counter
+    return int(rate * (tick + period - period * math.cos(tick / period)))
+
+
+class FakePsutil:
+    # Deterministic stand-in for the parts of psutil the probes call. Values
+    # are pure functions of the tick counter, which only advance() moves, so
+    # every run replays exactly the same counter sequence on any hardware.
+    NoSuchProcess = psutil.NoSuchProcess
+    AccessDenied = psutil.AccessDenied
+    ZombieProcess = psutil.ZombieProcess
+
+    def __init__(self, cores=8, nics=4, mounts=3, processes=300, churn=3, seed=42):
+        self.cores = cores
+        self.nics = nics
+        self.mounts = mounts
+        self.tick = 0
+        self.process_table = SyntheticProcessTable(processes, churn, seed)
+
+    def advance(self):
+        self.tick += 1
+        self.process_table.tick()
+
+    def cpu_count(self, logical=True):
+        return self.cores
+
+    def cpu_percent(self, interval=None, percpu=False):
+        per_core = [50 + 40 * _wave(self.tick, core * 7) for core in range(self.cores)]
+        return per_core if percpu else sum(per_core) / len(per_core)
+
+    def cpu_freq(self, percpu=False):
+        return CpuFreq(2400 + 400 * _wave(self.tick), 800, 4000)
+
+    def virtual_memory(self):
+        total = 32 * GIB
+        used = int((12 + 2 * _wave(self.tick)) * GIB)
+        return VirtualMemory(total, total - used, round(used / total * 100, 1), used, total - used)
+
+    def disk_usage(self, path):
+        total = 500 * GIB
+        used = int((200 + len(path) * 13 % 100 + self.tick / 3600) * GIB)
+        return DiskUsage(total, used, total - used, round(used / total * 100, 1))
+
+    def disk_partitions(self, all=False):
+        return [Partition(f'/dev/sd{chr(97 + m)}1', '/' if m == 0 else f'/mnt/disk{m}', 'ext4', 'rw')
+                for m in range(self.mounts)]
+
+    def _disk(self, index):
+        reads = _area(self.tick, 5e6 * (index + 1))
+        writes = _area(self.tick, 2e6 * (index + 1), 90.0)
+        return DiskIO(reads // 4096, writes // 4096, reads, writes, reads // 10**6, writes // 10**6)
+
+    def disk_io_counters(self, perdisk=False):
+        disks = {f'sd{chr(97 + m)}': self._disk(m) for m in range(self.mounts)}
+        if perdisk:
+            return disks
+        return DiskIO(*(sum(column) for column in zip(*disks.values())))
+
+    def net_io_counters(self, pernic=False):
+        nics = {}
+        for n in range(self.nics):
+            sent = _area(self.tick, 1e6 * (n + 1))
+            received = _area(self.tick, 5e6 * (n + 1), 45.0)
+            nics[f'eth{n}'] = NetIO(sent, received, sent // 1400, received // 1400,
+                                    self.tick // 600, 0, self.tick // 300, 0)
+        if pernic:
+            return nics
+        return NetIO(*(sum(column) for column in zip(*nics.values())))
+
+    def getloadavg(self):
+        load = self.cores / 4 * (1 + _wave(self.tick))
+        return load, load * 0.9, load * 0.8
+
+    def sensors_temperatures(self):
+        return {'coretemp': [Temperature(f'Core {core}', 50 + 10 * _wave(self.tick, core), 90, 100)
+                             for core in range(self.cores)]}
+
+    def pids(self):
+        return self.process_table.pids()
+
+    def Process(self, pid):
+        return self.process_table.process(pid)
+
+
+@contextlib.contextmanager
+def installed(backend):
+    # Probes call psutil at collection time; create them inside the block too,
+    # so their baselines (primed cpu_percent, first counters) come from the fake
+    original = probes.psutil
+    probes.psutil = backend
+    try:
+        yield backend
+    finally:
+        probes.psutil = original
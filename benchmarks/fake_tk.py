@@ -0,0 +1,72 @@
+from contextlib import contextmanager
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import gui
+import widgets
+
+
+class Widget:
+    # Stand-in for any Tk/ttk widget without a display: every method call is
+    # accepted and counted, configured options are kept so reads see them,
+    # queries (get_children, selection) see an empty widget
+    def __init__(self, *args, **options):
+        self.options = dict(options)
+        self.calls = 0
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        def call(*args, **options):
+            self.calls += 1
+            if name in ('config', 'configure'):
+                self.options.update(options)
+            return ()
+        return call
+
+    def __getitem__(self, key):
+        return self.options.get(key, ())
+
+    def __setitem__(self, key, value):
+        self.options[key] = value
+
+
+class Variable:
+    def __init__(self, master=None, value=None, name=None):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+
+
+class Canvas(FigureCanvasAgg):
+    # The Agg canvas under a FigureCanvasTkAgg signature
+    def __init__(self, figure, master=None):
+        super().__init__(figure)
+
+    def get_tk_widget(self):
+        return Widget()
+
+
+class _Module:
+    # tkinter / ttk: variables are real values, everything else is a Widget
+    BOTH = 'both'
+    TclError = RuntimeError
+    StringVar = BooleanVar = IntVar = DoubleVar = Variable
+
+    def __getattr__(self, name):
+        return Widget
+
+
+@contextmanager
+def installed():
+    # The GUI and widget modules see the stand-ins, the real code runs unchanged
+    module = _Module()
+    original = (gui.tk, gui.ttk, gui.FigureCanvasTkAgg, widgets.tk)
+    gui.tk, gui.ttk, gui.FigureCanvasTkAgg, widgets.tk = module, module, Canvas, module
+    try:
+        yield Widget()
+    finally:
+        gui.tk, gui.ttk, gui.FigureCanvasTkAgg, widgets.tk = original
@@ -0,0 +1,38 @@
+import argparse
+import time
+from benchmarks.synthetic import make_sample
+from features import FeatureExtractor
+from store import SampleStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FeatureExtractor cost vs. number of samples")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 300000])
+    parser.add_argument('--incremental', type=int, default=2000, help="single-sample updates to time")
+    args = parser.parse_args()
+
+    print(f"{'samples':>8} {'bulk_s':>9} {'bulk_us/sample':>15} {'incremental_us':>15}")
+    for size in args.sizes:
+        store = SampleStore(capacity=size)
+        for i in range(size):
+            store.append(i, make_sample(i, cores=8, nics=4, mounts=1))
+
+        extractor = FeatureExtractor(capacity=size)
+        start = time.perf_counter()
+        extractor.update(store)
+        bulk = time.perf_counter() - start
+
+        # Steady state: one new sample per update, on a full buffer
+        incremental = 0.0
+        for i in range(size, size + args.incremental):
+            store.append(i, make_sample(i, cores=8, nics=4, mounts=1))
+            start = time.perf_counter()
+            extractor.update(store)
+            incremental += time.perf_counter() - start
+
+        print(f"{size:>8} {bulk:>9.3f} {bulk / size * 1e6:>15.2f} "
+              f"{incremental / args.incremental * 1e6:>15.2f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import multiprocessing
+import time
+from benchmarks.synthetic import make_sample
+from hub import MSG_HELLO, Hub, encode_json, encode_samples, encode_schema
+from sample import Sample
+
+
+async def agent(port, name, frames, rate, batch, deadline):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(encode_json(MSG_HELLO, {'host': name, 'interval': 1}) + frames[0])
+    period = batch / rate if rate else 0.0
+    next_send = time.monotonic()
+    i = 0
+    while time.monotonic() < deadline:
+        writer.write(frames[1 + i % (len(frames) - 1)])
+        await writer.drain()
+        i += 1
+        if period:
+            next_send += period
+            await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+        else:
+            await asyncio.sleep(0)
+    writer.close()
+
+
+def load(port, hosts, rate, batch, duration, compress, cores, nics):
+    # Pre-encoded traffic, so the load generator costs as little as possible
+    samples = [(time.time() + i, Sample.from_data(make_sample(i, cores=cores, nics=nics))) for i in range(batch * 20)]
+    frames = [encode_schema(samples[0][1].schema)]
+    frames += [encode_samples(samples[i:i + batch], compress) for i in range(0, len(samples), batch)]
+
+    async def run():
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(agent(port, f'host-{i:04d}', frames, rate, batch, deadline) for i in range(hosts)))
+    asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hub ingest throughput with many agents on loopback")
+    parser.add_argument('--hosts', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--rate', type=float, default=20, help="samples/s per host, 0 = as fast as possible")
+    parser.add_argument('--batch', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--compress', action='store_true')
+    parser.add_argument('--detector', default='isolation_forest')
+    parser.add_argument('--cores', type=int, default=8)
+    parser.add_argument('--nics', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"batch {args.batch}, {args.cores} cores, {args.nics} NICs, detector {args.detector}, "
+          f"{'compressed' if args.compress else 'uncompressed'}, rate {args.rate or 'max'}")
+    # CPU is the whole hub process, so background model training is included
+    print(f"{'hosts':>6} {'offered/s':>10} {'ingested/s':>11} {'MB/s':>7} {'bytes/sample':>13} "
+          f"{'cpu_us/sample':>14} {'loop_us/sample':>15} {'cpu_%/host@1Hz':>15}")
+    for hosts in args.hosts:
+        hub = Hub(port=0, retention=3600, detector_mode=args.detector)
+        hub.start()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        loader = multiprocessing.Process(target=load, args=(hub.port, hosts, args.rate, args.batch, args.duration,
+                                                            args.compress, args.cores, args.nics))
+        loader.start()
+        loader.join()
+        hub.stop()
+        cpu = time.process_time() - cpu_start
+        # Agents are throttled by TCP backpressure, the hub may still be draining after their deadline
+        wall = time.perf_counter() - wall_start
+
+        states = list(hub.hosts.values())
+        samples = sum(state.samples for state in states)
+        received = sum(state.bytes for state in states)
+        loop_cpu = sum(state.cpu_time for state in states)
+        per_sample = cpu / max(samples, 1)
+        offered = f"{hosts * args.rate:.0f}" if args.rate else 'max'
+        print(f"{hosts:>6} {offered:>10} {samples / wall:>11.0f} {received / wall / 1e6:>7.2f} "
+              f"{received / max(samples, 1):>13.1f} {per_sample * 1e6:>14.1f} {loop_cpu / max(samples, 1) * 1e6:>15.1f} "
+              f"{per_sample * 100:>15.4f}", flush=True)
+        if hub.errors:
+            print(f"errors: {hub.errors} ({hub.last_error})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import contextlib
+import random
+import time
+from collections import namedtuple
+import numpy as np
+import psutil
+from probes import ProcessProbe
+
+MemoryInfo = namedtuple('MemoryInfo', 'rss vms')
+IOCounters = namedtuple('IOCounters', 'read_count write_count read_bytes write_bytes')
+
+
+class SyntheticProcessTable:
+    # Deterministic stand-in for the OS process table, with PID churn per tick
+    def __init__(self, size, churn, seed=42):
+        self.random = random.Random(seed)
+        self.churn = churn
+        self.next_pid = 1
+        self.alive = set()
+        self.calls = 0
+        for _ in range(size):
+            self._spawn()
+
+    def _spawn(self):
+        self.alive.add(self.next_pid)
+        self.next_pid += 1
+
+    def tick(self):
+        for pid in self.random.sample(sorted(self.alive), self.churn):
+            self.alive.discard(pid)
+            self._spawn()
+
+    def pids(self):
+        return list(self.alive)
+
+    def process(self, pid):
+        return SyntheticProcess(self, pid)
+
+
+class SyntheticProcess:
+    def __init__(self, table, pid):
+        if pid not in table.alive:
+            raise psutil.NoSuchProcess(pid)
+        self.table = table
+        self.pid = pid
+        self._io = 0
+
+    def _check(self):
+        self.table.calls += 1
+        if self.pid not in self.table.alive:
+            raise psutil.NoSuchProcess(self.pid)
+
+    @contextlib.contextmanager
+    def oneshot(self):
+        yield
+
+    def name(self):
+        self._check()
+        return f'proc-{self.pid}'
+
+    def cpu_percent(self, interval=None):
+        self._check()
+        return (self.pid * 7919 % 1000) / 10.0
+
+    def memory_info(self):
+        self._check()
+        return MemoryInfo(rss=(self.pid * 104729 % 4096) * 1024 * 1024, vms=0)
+
+    def io_counters(self):
+        self._check()
+        self._io += self.pid % 97 * 4096
+        return IOCounters(0, 0, self._io, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ProcessProbe cost per tick against a synthetic process table")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000])
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--churn', type=float, default=0.01, help="share of processes replaced per tick")
+    args = parser.parse_args()
+
+    print(f"{'processes':>10} {'first_tick_ms':>14} {'steady_p50_ms':>14} {'steady_p99_ms':>14} {'calls/tick':>11}")
+    for size in args.sizes:
+        table = SyntheticProcessTable(size, int(size * args.churn))
+        probe = ProcessProbe(top_n=10, pids=table.pids, process_factory=table.process)
+
+        start = time.perf_counter()
+        probe.collect()
+        first = time.perf_counter() - start
+
+        durations = []
+        table.calls = 0
+        for _ in range(args.ticks):
+            table.tick()
+            start = time.perf_counter()
+            result = probe.collect()
+            durations.append(time.perf_counter() - start)
+        assert len(result['top_processes']['cpu_percent']) == 10
+
+        ms = np.array(durations) * 1000
+        print(f"{size:>10} {first * 1000:>14.1f} {np.percentile(ms, 50):>14.1f} {np.percentile(ms, 99):>14.1f} "
+              f"{table.calls / args.ticks:>11.0f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
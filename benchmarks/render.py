@@ -0,0 +1,80 @@
+import argparse
+import time
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from benchmarks.synthetic import make_sample
+from graphs import LiveGraphs
+from store import SampleStore
+
+
+def legacy_frame(axes, canvas, store, history_len):
+    # The original SysMonitorGUI path: raw lists, clear, replot, rebuild decorations, full draw
+    cpu = store.column('cpu_usage_percent', history_len).tolist()
+    mem = store.column('memory_percent', history_len).tolist()
+    upload = store.network_total('upload_mbps', history_len).tolist()
+    download = store.network_total('download_mbps', history_len).tolist()
+    x = list(range(len(cpu)))
+    for ax in axes:
+        ax.clear()
+    axes[0].plot(x, cpu, color='blue')
+    axes[0].set_ylim(0, 100)
+    axes[0].set_title('CPU használat (%)', fontsize=9)
+    axes[1].plot(x, mem, color='green')
+    axes[1].set_ylim(0, 100)
+    axes[1].set_title('Memória használat (%)', fontsize=9)
+    axes[2].plot(x, upload, label='Feltöltés', color='orange')
+    axes[2].plot(x, download, label='Letöltés', color='purple')
+    axes[2].legend(loc='upper left', fontsize=7)
+    axes[2].set_title('Hálózati forgalom (Mbit/s)', fontsize=9)
+    axes[2].set_ylim(bottom=0)
+    for ax in axes:
+        ax.set_xticks([x[0], x[-1]])
+        ax.set_xticklabels([time.strftime('%H:%M:%S'), 'Most'])
+        ax.grid(True, linestyle=':', alpha=0.6)
+    canvas.draw()
+
+
+def measure(render, store, frames):
+    durations = []
+    for frame in range(frames):
+        store.append(store.count, make_sample(store.count, cores=4, nics=2, mounts=1))
+        start = time.perf_counter()
+        render()
+        durations.append(time.perf_counter() - start)
+    return np.median(np.array(durations[1:]) * 1000) # The first frame is a full draw for both
+
+
+def filled_store(history_len):
+    store = SampleStore(capacity=history_len)
+    for i in range(history_len):
+        store.append(i, make_sample(i, cores=4, nics=2, mounts=1))
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame graph render cost: full redraw vs. decimated, blitted LiveGraphs (Agg, headless)")
+    parser.add_argument('--history', type=int, nargs='+', default=[30, 600, 3600, 86400])
+    parser.add_argument('--legacy-max', type=int, default=3600, help="skip the legacy renderer above this window")
+    parser.add_argument('--frames', type=int, default=40)
+    args = parser.parse_args()
+
+    print(f"{'history':>8} {'legacy_p50_ms':>14} {'live_p50_ms':>12} {'speedup':>8}")
+    for history_len in args.history:
+        store = filled_store(history_len)
+        legacy = float('nan')
+        if history_len <= args.legacy_max:
+            figure = Figure(figsize=(10, 4), dpi=100)
+            axes = [figure.add_subplot(1, 3, i+1) for i in range(3)]
+            canvas = FigureCanvasAgg(figure)
+            legacy = measure(lambda: legacy_frame(axes, canvas, store, history_len), store, args.frames)
+
+        graphs = LiveGraphs(history_len)
+        graphs.attach(FigureCanvasAgg(graphs.figure))
+        live = measure(lambda: graphs.update(store), store, args.frames)
+
+        print(f"{history_len:>8} {legacy:>14.2f} {live:>12.2f} {legacy / live:>7.1f}x", flush=True)
+
+
+if __name__ == '__main__':
+    main()
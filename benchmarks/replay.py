@@ -0,0 +1,90 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from anomaly import AnomalyDetector, StreamingAnomalyDetector
+from benchmarks.synthetic import make_sample
+from replay import Recorder, read_samples, tune
+from sample import Sample
+from store import SampleStore
+
+
+def record_day(path, samples, seed=7):
+    # 1 Hz synthetic stream with noise and a one minute CPU/network spike every two hours
+    rng = np.random.default_rng(seed)
+    recorder = Recorder(path, interval=1.0, batch_size=600)
+    start = 1.7e9
+    for i in range(samples):
+        sample = Sample.from_data(make_sample(i, cores=4, nics=2, mounts=1))
+        values = np.asarray(sample.values)
+        values += rng.normal(0, 0.5, len(values)) * (values != 0)
+        if i % 7200 >= 7140:
+            values[:1] = 99.0
+            values[sample.schema.cores_at:sample.schema.nics_at] = 99.0
+            values[sample.schema.nics_at:sample.schema.mounts_at] *= 10
+        recorder(start + i, Sample(sample.schema, values.tolist()))
+    recorder.close()
+
+
+def live_detections(path, limit, mode, contamination, relearning_interval, min_samples):
+    # The live path, one sample at a time: store, detector update, score
+    store = SampleStore(capacity=3600)
+    if mode == 'streaming':
+        detector = StreamingAnomalyDetector(min_samples=min_samples)
+    else:
+        detector = AnomalyDetector(contamination=contamination, min_samples=min_samples,
+                                   relearning_interval=relearning_interval)
+        detector.train_async = detector.train # Fit in line, the replay convention
+    detections = 0
+    for i, (timestamp, sample) in enumerate(read_samples(path)):
+        if i == limit:
+            break
+        store.append(timestamp, sample)
+        detector.update(store)
+        if detector.is_trained and detector.predict_anomaly_score() < 0:
+            detections += 1
+    return detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a synthetic day, check replay tuning against the live detectors, time a parameter grid")
+    parser.add_argument('--samples', type=int, default=86400, help="samples in the recording (1 Hz)")
+    parser.add_argument('--check-samples', type=int, default=900, help="prefix replayed through the live detectors")
+    parser.add_argument('--contamination', type=float, nargs='+', default=[0.001, 0.005, 0.01])
+    parser.add_argument('--relearning-interval', type=int, nargs='+', default=[900, 3600])
+    parser.add_argument('--min-samples', type=int, nargs='+', default=[60, 300])
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'day.smr')
+        start = time.perf_counter()
+        record_day(path, args.samples)
+        print(f"recorded {args.samples} samples in {time.perf_counter() - start:.1f} s, {os.path.getsize(path) / args.samples:.1f} B/sample")
+
+        short = os.path.join(directory, 'short.smr')
+        recorder = Recorder(short, interval=1.0)
+        for i, (timestamp, sample) in enumerate(read_samples(path)):
+            if i == args.check_samples:
+                break
+            recorder(timestamp, sample)
+        recorder.close()
+
+        print(f"\nequivalence on the first {args.check_samples} samples (relearning 120, min_samples 60)")
+        for mode, contamination in (('isolation_forest', 0.01), ('isolation_forest', 0.05), ('streaming', None)):
+            live = live_detections(short, args.check_samples, mode, contamination, 120, 60)
+            replayed = tune(short, mode, [contamination or 0.0], [120], [60], workers=1)['configs'][0]['detections']
+            print(f"  {mode:<17} contamination {contamination}: live {live}, replay {replayed}")
+
+        for mode in ('streaming', 'isolation_forest'):
+            start = time.perf_counter()
+            report = tune(path, mode, args.contamination, args.relearning_interval, args.min_samples, args.workers)
+            elapsed = time.perf_counter() - start
+            print(f"\n{mode}: {len(report['configs'])} configurations over {report['samples']} samples in {elapsed:.1f} s wall")
+            for config in report['configs']:
+                print('  ' + ', '.join(f'{key}={value}' for key, value in config.items() if key not in ('detector', 'samples')))
+
+
+if __name__ == '__main__':
+    main()
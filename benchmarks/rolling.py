@@ -0,0 +1,87 @@
+import argparse
+import time
+import numpy as np
+from rolling import METRICS, QUANTILES, RollingStats, window_label
+
+
+def synthetic_metrics(samples, seed=3):
+    # CPU: uniform load with bursts, memory: slow drift, network: heavy tailed with idle periods
+    rng = np.random.default_rng(seed)
+    cpu = np.clip(rng.normal(30, 10, samples) + 60 * (rng.random(samples) < 0.02), 0, 100)
+    memory = 40 + 5 * np.sin(np.arange(samples) / 3600) + rng.normal(0, 0.2, samples)
+    network = rng.lognormal(1, 2, samples) * (rng.random(samples) > 0.3)
+    return np.column_stack((cpu, memory, network))
+
+
+def exact(values, windows, timestamps, end):
+    # NumPy over the trailing window: the same order statistic the sketch targets (rank q * (n - 1))
+    result = {}
+    for seconds in windows:
+        window = values[(timestamps > timestamps[end] - seconds) & (timestamps <= timestamps[end])]
+        result[window_label(seconds)] = {
+            metric: {
+                **{f'p{round(q * 100)}': float(np.percentile(window[:, i], q * 100, method='lower')) for q in QUANTILES},
+                'min': float(window[:, i].min()),
+                'max': float(window[:, i].max()),
+            } for i, metric in enumerate(METRICS)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling statistics: sketch accuracy and update/query cost against exact NumPy")
+    parser.add_argument('--samples', type=int, default=20000)
+    parser.add_argument('--windows', type=int, nargs='+', default=[60, 300, 3600])
+    parser.add_argument('--checkpoints', type=int, default=20)
+    args = parser.parse_args()
+
+    values = synthetic_metrics(args.samples)
+    timestamps = np.arange(args.samples, dtype=float)
+    rows = values.tolist()
+    checkpoints = set(np.linspace(max(args.windows), args.samples - 1, args.checkpoints).astype(int).tolist())
+
+    stats = RollingStats(args.windows)
+    errors = {}
+    mismatched_extremes = 0
+    update_time = 0.0
+    snapshot_time = []
+    for i, row in enumerate(rows):
+        start = time.perf_counter()
+        stats.update(timestamps[i], row)
+        update_time += time.perf_counter() - start
+        if i in checkpoints:
+            start = time.perf_counter()
+            snapshot = stats.snapshot()
+            snapshot_time.append(time.perf_counter() - start)
+            for window, metrics in exact(values, args.windows, timestamps, i).items():
+                for metric, expected in metrics.items():
+                    got = snapshot[window][metric]
+                    mismatched_extremes += got['min'] != expected['min'] or got['max'] != expected['max']
+                    for name in ('p50', 'p95', 'p99'):
+                        error = abs(got[name] - expected[name]) / max(abs(expected[name]), 1e-3)
+                        key = (window, metric, name)
+                        errors[key] = max(errors.get(key, 0.0), error)
+
+    # Exact baseline: every update recomputes the window statistics from the history
+    start = time.perf_counter()
+    baseline_samples = min(args.samples, 2000)
+    for i in range(args.samples - baseline_samples, args.samples):
+        for seconds in args.windows:
+            window = values[max(0, i + 1 - seconds):i + 1]
+            np.percentile(window, [50, 95, 99], axis=0)
+            window.min(axis=0)
+            window.max(axis=0)
+    exact_update = (time.perf_counter() - start) / baseline_samples
+
+    print(f"sketch update:          {update_time / args.samples * 1e6:9.1f} us/sample ({args.samples / update_time:,.0f} samples/s)")
+    print(f"sketch snapshot:        {np.mean(snapshot_time) * 1e3:9.3f} ms (all windows and metrics)")
+    print(f"numpy exact per update: {exact_update * 1e6:9.1f} us/sample ({1 / exact_update:,.0f} samples/s)")
+    print(f"min/max mismatches:     {mismatched_extremes}")
+    print(f"\nmax relative quantile error over {len(checkpoints)} checkpoints (target 1%)")
+    for window in (window_label(seconds) for seconds in sorted(args.windows)):
+        print(f"  {window:>4} " + '  '.join(
+            f"{metric} " + '/'.join(f"{errors[window, metric, name] * 100:.2f}" for name in ('p50', 'p95', 'p99'))
+            for metric in METRICS) + ' %')
+
+
+if __name__ == '__main__':
+    main()
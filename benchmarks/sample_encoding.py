@@ -0,0 +1,87 @@
+import argparse
+import gc
+import statistics
+import sys
+import time
+import tracemalloc
+import types
+from benchmarks.synthetic import make_sample
+from hub import encode_samples
+from monitor import SysMonitor
+from sample import Sample
+
+
+def reachable(root):
+    seen = {}
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, types.ModuleType, types.FunctionType)):
+            continue
+        seen[id(obj)] = obj
+        stack.extend(gc.get_referents(obj))
+    return seen
+
+
+def owned(sample, previous):
+    # Objects only this sample keeps alive: interned schemas, cached probe
+    # results and shared strings are reachable from the previous sample too
+    shared = reachable(previous)
+    own = [obj for key, obj in reachable(sample).items() if key not in shared]
+    return len(own), sum(sys.getsizeof(obj) for obj in own)
+
+
+def probe_ticks(ticks):
+    monitor = SysMonitor(run_interval=0)
+    previous = monitor.collect_data()
+    objects, sizes, peaks, times = [], [], [], []
+    tracemalloc.start()
+    for _ in range(ticks):
+        time.sleep(0.02)
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        data = monitor.collect_data()
+        monitor.store.append(time.time(), data)
+        times.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        count, size = owned(data, previous)
+        objects.append(count)
+        sizes.append(size)
+        previous = data
+    tracemalloc.stop()
+    monitor.engine.shutdown()
+
+    print(f"live probes, median of {ticks} ticks (collect + store append, under tracemalloc)")
+    print(f"  objects/sample: {statistics.median(objects):.0f}  bytes/sample: {statistics.median(sizes):.0f}  "
+          f"transient peak/tick: {statistics.median(peaks) / 1024:.1f} KB  tick: {statistics.median(times) * 1000:.2f} ms")
+
+
+def synthetic(cores, nics, mounts, batch):
+    dicts = [make_sample(i, cores, nics, mounts) for i in range(batch + 1)]
+    compact = [Sample.from_data(data) for data in dicts]
+    dict_objects, dict_bytes = owned(dicts[1], dicts[0])
+    compact_objects, compact_bytes = owned(compact[1], compact[0])
+    samples = [(float(i), sample) for i, sample in enumerate(compact[1:])]
+    raw = len(encode_samples(samples)) / batch
+    packed = len(encode_samples(samples, compress=True)) / batch
+    print(f"{cores:>6} {nics:>5} {mounts:>7} {dict_objects:>13} {dict_bytes:>11} {compact_objects:>16} {compact_bytes:>14} "
+          f"{raw:>9.0f} {packed:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Size of a sample: nested dicts vs the compact Sample encoding")
+    parser.add_argument('--ticks', type=int, default=30)
+    parser.add_argument('--batch', type=int, default=10, help="samples per wire frame")
+    args = parser.parse_args()
+
+    probe_ticks(args.ticks)
+    print(f"\nsynthetic layouts, per sample (wire: one frame of {args.batch} samples)")
+    print(f"{'cores':>6} {'nics':>5} {'mounts':>7} {'dict_objects':>13} {'dict_bytes':>11} {'compact_objects':>16} "
+          f"{'compact_bytes':>14} {'wire_raw':>9} {'wire_delta':>12}")
+    for cores, nics, mounts in ((4, 2, 2), (8, 4, 3), (64, 16, 8), (128, 64, 16)):
+        synthetic(cores, nics, mounts, args.batch)
+
+
+if __name__ == '__main__':
+    main()
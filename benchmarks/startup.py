@@ -0,0 +1,41 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ('tkinter', 'matplotlib', 'sklearn', 'pandas')
+
+# Runs the headless daemon in a child interpreter, then reports what it loaded and cost.
+PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+import main
+import psutil
+engine_args = ['--headless', '--duration', sys.argv[1], '--interval', sys.argv[2], '--output', os.devnull]
+main.main(engine_args)
+print(json.dumps({
+    'wall_s': round(time.perf_counter() - start, 3),
+    'rss_mb': round(psutil.Process().memory_info().rss / (1024 * 1024), 1),
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless daemon startup time, RSS and loaded heavy modules")
+    parser.add_argument('--duration', type=float, default=2.0)
+    parser.add_argument('--interval', type=float, default=0.5)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', PROBE, str(args.duration), str(args.interval)],
+                            cwd=root, capture_output=True, text=True, check=True)
+    print(result.stderr.strip())
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    print(f"rss after {args.duration:.1f} s: {report['rss_mb']} MB")
+    print(f"heavy modules loaded: {', '.join(report['loaded']) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import shutil
+import tempfile
+import time
+import numpy as np
+from storage import METRICS, RECORD_DTYPE, SegmentStorage
+
+
+def synthetic_day(day, start):
+    records = np.zeros(86400, RECORD_DTYPE)
+    seconds = np.arange(86400, dtype=np.float64)
+    records['timestamp'] = start + day * 86400 + seconds
+    wave = np.sin(seconds / 3600.0 + day)
+    for i, name in enumerate(METRICS):
+        records[name] = 50 + 40 * wave * ((i % 3) + 1) / 3
+    return records
+
+
+def latency_report(label, durations, rows):
+    ms = np.array(durations) * 1000
+    print(f"{label:<24} n={len(ms):<5} p50={np.percentile(ms, 50):8.3f} ms  p99={np.percentile(ms, 99):8.3f} ms  "
+          f"rows/query={np.mean(rows):.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SegmentStorage write throughput and range queries over simulated 1 Hz data")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--directory', default=None)
+    args = parser.parse_args()
+
+    directory = args.directory or tempfile.mkdtemp(prefix='sysmonitor-bench-')
+    start = 1_700_000_000.0
+    rng = np.random.default_rng(42)
+    try:
+        storage = SegmentStorage(directory)
+        written = 0
+        elapsed = 0.0
+        for day in range(args.days):
+            rows = synthetic_day(day, start).tolist()
+            begin = time.perf_counter()
+            for row in rows:
+                storage.append_record(row)
+            elapsed += time.perf_counter() - begin
+            written += len(rows)
+        storage.flush()
+        print(f"write: {written} records in {elapsed:.2f} s -> {written / elapsed:,.0f} records/s (per-sample append path)")
+
+        end = start + args.days * 86400
+        for label, span, resolution in (('1 h raw', 3600, 'raw'), ('1 day @ 1m', 86400, '1m'),
+                                        ('7 days @ 1h', 7 * 86400, '1h'), ('1 day auto', 86400, 'auto')):
+            durations, rows = [], []
+            for _ in range(args.queries):
+                lo = rng.uniform(start, end - span)
+                begin = time.perf_counter()
+                result = storage.query(lo, lo + span, resolution)
+                float(result['cpu_usage_percent'].sum()) # Touch the data, memmaps are lazy
+                durations.append(time.perf_counter() - begin)
+                rows.append(len(result))
+            latency_report(label, durations, rows)
+
+        begin = time.perf_counter()
+        result = storage.query(start, end, '1h')
+        print(f"full range @ 1h: {len(result)} rows in {(time.perf_counter() - begin) * 1000:.2f} ms")
+        storage.close()
+    finally:
+        if args.directory is None:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
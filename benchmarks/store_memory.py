@@ -0,0 +1,51 @@
+import argparse
+import subprocess
+import sys
+import psutil
+from benchmarks.synthetic import make_sample
+from store import SampleStore
+
+# Each mode runs in a fresh interpreter so the RSS figures don't contaminate each other.
+
+def rss_mb():
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def run_mode(mode, samples, checkpoints, retention):
+    store = SampleStore(capacity=retention)
+    data = []
+    step = max(1, samples // checkpoints)
+    print(f"{'samples':>10} {'rss_mb':>10}")
+    print(f"{0:>10} {rss_mb():>10.1f}")
+    for i in range(1, samples + 1):
+        sample = make_sample(i)
+        if mode == 'store':
+            store.append(i, sample)
+        else:
+            data.append({'timestamp': i, 'data': sample})
+        if i % step == 0:
+            print(f"{i:>10} {rss_mb():>10.1f}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS growth: SampleStore vs. the old list of dicts")
+    parser.add_argument('--samples', type=int, default=2_000_000)
+    parser.add_argument('--list-samples', type=int, default=200_000, help="the list grows by several KB per sample")
+    parser.add_argument('--retention', type=int, default=3600)
+    parser.add_argument('--checkpoints', type=int, default=10)
+    parser.add_argument('--mode', choices=('store', 'list'))
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.samples, args.checkpoints, args.retention)
+        return
+
+    for mode, samples in (('store', args.samples), ('list', args.list_samples)):
+        print(f"\n== {mode} ==", flush=True)
+        subprocess.run([sys.executable, '-m', 'benchmarks.store_memory', '--mode', mode,
+                        '--samples', str(samples), '--retention', str(args.retention),
+                        '--checkpoints', str(args.checkpoints)], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import psutil
+from benchmarks.fake_psutil import FakePsutil, installed
+from benchmarks.synthetic import make_sample
+from sample import Sample
+
+# Every metric is "lower is better": milliseconds, seconds or kilobytes.
+
+
+def percentiles(prefix, seconds):
+    ms = np.array(seconds) * 1000
+    return {
+        f'{prefix}_mean_ms': float(ms.mean()),
+        f'{prefix}_p50_ms': float(np.percentile(ms, 50)),
+        f'{prefix}_p99_ms': float(np.percentile(ms, 99)),
+    }
+
+
+def synthetic_store(size, cores, nics, mounts):
+    from store import SampleStore
+
+    store = SampleStore(capacity=size)
+    for i in range(size):
+        store.append(float(i), Sample.from_data(make_sample(i, cores, nics, mounts)))
+    return store
+
+
+def bench_collect(args):
+    # Worst-case tick: every probe runs every tick, against the fake backend
+    from monitor import SysMonitor
+
+    backend = FakePsutil(args.cores, args.nics, args.mounts, args.processes)
+    with installed(backend):
+        monitor = SysMonitor(run_interval=0)
+        for probe in monitor.engine.probes.values():
+            probe.interval = 0
+        durations = []
+        for i in range(args.ticks):
+            backend.advance()
+            start = time.perf_counter()
+            data = monitor.collect_data()
+            monitor.store.append(float(i), data)
+            durations.append(time.perf_counter() - start)
+        monitor.engine.shutdown()
+
+    results = percentiles('tick', durations[10:])
+    for name, stats in monitor.probe_stats().items():
+        results[f'probe_{name}_mean_ms'] = stats['mean_ms']
+    return results
+
+
+def bench_memory(args):
+    # One simulated hour of the full pipeline (collect, store, bus, scoring)
+    # after the ring buffer is full and the first model is trained
+    from engine import MonitorEngine
+
+    backend = FakePsutil(args.cores, args.nics, args.mounts, args.processes)
+    process = psutil.Process()
+    with installed(backend):
+        engine = MonitorEngine(run_interval=1, retention=args.retention, detector_mode=args.detector)
+        monitor = engine.monitor
+
+        def tick(i):
+            backend.advance()
+            data = monitor.collect_data()
+            monitor.store.append(float(i), data)
+            monitor.bus.publish(float(i), data)
+            engine.score()
+
+        for i in range(args.retention):
+            tick(i)
+        while getattr(engine.detector, 'is_training', False):
+            time.sleep(0.01)
+
+        rss = process.memory_info().rss
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        for i in range(args.retention, args.retention + args.hour_ticks):
+            tick(i)
+        elapsed = time.perf_counter() - start
+        monitor.engine.shutdown()
+
+    return {
+        'rss_growth_kb_per_hour': (process.memory_info().rss - rss) / 1024,
+        'allocated_blocks_growth_per_hour': float(sys.getallocatedblocks() - blocks),
+        'pipeline_tick_mean_ms': elapsed / args.hour_ticks * 1000,
+    }
+
+
+def bench_training(args):
+    from anomaly import AnomalyDetector, StreamingAnomalyDetector
+
+    results = {}
+    for size in args.history:
+        store = synthetic_store(size, args.cores, args.nics, args.mounts)
+        detector = AnomalyDetector(min_samples=10, max_train_samples=size)
+        start = time.perf_counter()
+        detector.train(store)
+        results[f'train_{size}_s'] = time.perf_counter() - start
+
+        durations = []
+        for _ in range(args.scores):
+            start = time.perf_counter()
+            detector.predict_anomaly_score()
+            durations.append(time.perf_counter() - start)
+        results[f'predict_{size}_p50_ms'] = float(np.percentile(np.array(durations) * 1000, 50))
+
+        streaming = StreamingAnomalyDetector(min_samples=10)
+        start = time.perf_counter()
+        streaming.update(store)
+        results[f'streaming_catchup_{size}_s'] = time.perf_counter() - start
+    return results
+
+
+def bench_render(args):
+    # Agg canvas, the same per-frame path the GUI takes minus the Tk blit
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from graphs import LiveGraphs
+
+    results = {}
+    for window in args.windows:
+        store = synthetic_store(window, args.cores, args.nics, args.mounts)
+        graphs = LiveGraphs(history_len=window)
+        graphs.attach(FigureCanvasAgg(graphs.figure))
+        durations = []
+        for frame in range(args.frames + 1):
+            store.append(float(store.count), Sample.from_data(make_sample(store.count, args.cores, args.nics, args.mounts)))
+            start = time.perf_counter()
+            graphs.update(store)
+            durations.append(time.perf_counter() - start)
+        results.update(percentiles(f'frame_{window}', durations[1:])) # The first frame is a full draw
+    return results
+
+
+def bench_gui(args):
+    # The whole update_data path with Tk widgets. Without a display the
+    # widgets are stand-ins: the timings then cover the Python side only,
+    # but every frame still runs, so a broken update path fails here too.
+    import tkinter as tk
+    from benchmarks import fake_tk
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"gui: no display ({e}), stand-in widgets", file=sys.stderr)
+        with fake_tk.installed() as root:
+            return run_gui_frames(args, root, 'headless_update')
+    try:
+        return run_gui_frames(args, root, 'update')
+    finally:
+        root.destroy()
+
+
+def run_gui_frames(args, root, prefix):
+    from engine import MonitorEngine
+    from gui import SysMonitorGUI
+
+    backend = FakePsutil(args.cores, args.nics, args.mounts, args.processes)
+    results = {}
+    with installed(backend):
+        engine = MonitorEngine(run_interval=1, retention=max(args.windows), detector_mode='streaming')
+        monitor = engine.monitor
+        for probe in monitor.engine.probes.values():
+            probe.interval = 0
+        app = SysMonitorGUI(root, engine)
+        tick = 0
+        try:
+            for window in args.windows:
+                app.history_len = window
+                app._configure_graph_time_axis()
+                durations = []
+                for frame in range(args.frames + 1):
+                    backend.advance()
+                    data = monitor.collect_data()
+                    monitor.store.append(float(tick), data)
+                    tick += 1
+                    start = time.perf_counter()
+                    app.update_data(data)
+                    root.update()
+                    durations.append(time.perf_counter() - start)
+                results.update(percentiles(f'{prefix}_{window}', durations[1:]))
+        finally:
+            app.close()
+            monitor.engine.shutdown()
+    return results
+
+
+SUITES = {
+    'collect': bench_collect,
+    'memory': bench_memory,
+    'training': bench_training,
+    'render': bench_render,
+    'gui': bench_gui,
+}
+
+
+def metadata(args):
+    def git(*command):
+        try:
+            return subprocess.run(['git', *command], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    import matplotlib
+    import sklearn
+    return {
+        'commit': git('rev-parse', '--short', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'matplotlib': matplotlib.__version__,
+        'machine': platform.machine(),
+        'cpus': psutil.cpu_count(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+    }
+
+
+def compare(baseline, results, tolerance, min_delta):
+    regressions = []
+    print(f"\n{'metric':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for suite, metrics in results.items():
+        for name, value in metrics.items():
+            old = baseline.get('results', {}).get(suite, {}).get(name)
+            if old is None:
+                continue
+            change = (value - old) / old * 100 if old else 0.0
+            regressed = value > old * (1 + tolerance) and value - old > min_delta
+            flag = '  REGRESSION' if regressed else ''
+            print(f"{suite + '.' + name:<40} {old:>12.3f} {value:>12.3f} {change:>8.1f}%{flag}")
+            if regressed:
+                regressions.append(f'{suite}.{name}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite on a deterministic fake psutil backend, JSON results for comparing commits")
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--cores', type=int, default=8)
+    parser.add_argument('--nics', type=int, default=4)
+    parser.add_argument('--mounts', type=int, default=3)
+    parser.add_argument('--processes', type=int, default=300)
+    parser.add_argument('--ticks', type=int, default=500, help="collect: ticks to time")
+    parser.add_argument('--retention', type=int, default=3600, help="memory: samples kept in memory")
+    parser.add_argument('--hour-ticks', type=int, default=3600, help="memory: ticks in one simulated hour")
+    parser.add_argument('--detector', default='isolation_forest', help="memory: detector of the pipeline")
+    parser.add_argument('--history', type=int, nargs='+', default=[600, 1800, 3600], help="training: history sizes")
+    parser.add_argument('--scores', type=int, default=100, help="training: scoring calls per size")
+    parser.add_argument('--windows', type=int, nargs='+', default=[60, 600, 3600], help="render: graph windows")
+    parser.add_argument('--frames', type=int, default=50, help="render: frames per window")
+    parser.add_argument('--output', default=None, help="write the results as JSON")
+    parser.add_argument('--compare', default=None, help="baseline JSON from an earlier run")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative slowdown before failing")
+    parser.add_argument('--min-delta', type=float, default=0.05, help="ignore absolute changes below this")
+    args = parser.parse_args()
+
+    results = {}
+    for suite in args.suites:
+        start = time.perf_counter()
+        results[suite] = SUITES[suite](args)
+        print(f"{suite}: {time.perf_counter() - start:.1f} s", file=sys.stderr, flush=True)
+        for name, value in results[suite].items():
+            print(f"  {name:<38} {value:>12.3f}")
+
+    report = {'meta': metadata(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), results, args.tolerance, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import math
+
+
+def make_sample(i, cores=8, nics=4, mounts=3, disks=2):
+    # Shape-compatible with SysMonitor.collect_data, deterministic per index
+    wave = math.sin(i / 60.0)
+    return {
+        'cpu_usage_percent': round(50 + 40 * wave, 2),
+        'cpu_usage_per_core_percent': [round(50 + 40 * math.sin((i + c) / 60.0), 2) for c in range(cores)],
+        'cpu_freq_current_mhz': 2400,
+        'memory_total_gb': 31.2,
+        'memory_used_gb': round(12 + 2 * wave, 4),
+        'memory_percent': round(40 + 6 * wave, 2),
+        'disk_total_gb': 467.3,
+        'disk_used_gb': 201.5,
+        'disk_percent': 43.1,
+        'disk_read_mbps': round(abs(wave) * 20, 4),
+        'disk_write_mbps': round(abs(wave) * 5, 4),
+        'load_avg_1': round(2 + wave, 2),
+        'disk_usages': [{
+            'mountpoint': f'/mnt/disk{m}',
+            'fstype': 'ext4',
+            'usage': {'total': 500107862016, 'used': 216367665152, 'free': 283740196864, 'percent': 43.3}
+        } for m in range(mounts)],
+        'network_stats': [{
+            'interface': f'eth{n}',
+            'upload_mbps': round(abs(wave) * 10 * (n + 1), 4),
+            'download_mbps': round(abs(wave) * 50 * (n + 1), 4),
+            'errors_in': 0,
+            'errors_out': 0,
+            'dropped_in': i % 7 == 0,
+            'dropped_out': 0,
+            'packets_in_ps': round(abs(wave) * 4000 * (n + 1), 1),
+            'packets_out_ps': round(abs(wave) * 800 * (n + 1), 1),
+        } for n in range(nics)],
+        'disk_io_stats': [{
+            'device': f'sd{chr(97 + d)}',
+            'read_mbps': round(abs(wave) * 20 / disks, 4),
+            'write_mbps': round(abs(wave) * 5 / disks, 4),
+            'read_iops': round(abs(wave) * 300, 1),
+            'write_iops': round(abs(wave) * 80, 1),
+            'read_latency_ms': round(0.5 + abs(wave), 3),
+            'write_latency_ms': round(1.5 + abs(wave), 3),
+        } for d in range(disks)],
+    }
@@ -0,0 +1,181 @@
+import argparse
+import time
+from array import array
+import numpy as np
+from sample import NIC_FIELDS, Sample, Schema
+from widgets import AGGREGATED_INTERFACE_PREFIXES, KeyedRows, heat_bands, interface_rows
+
+
+def synthetic_host(interfaces, cores, frames, active=0.3, churn=50, seed=11):
+    # A container host: a few physical NICs and bridges, the rest veth pairs.
+    # Most veths are idle, every `churn` frames a few containers come and go.
+    rng = np.random.default_rng(seed)
+    fixed = ['eth0', 'eth1', 'docker0', 'lo']
+    names = fixed + [f'veth{i:05x}' for i in range(interfaces - len(fixed))]
+    busy = rng.random(len(names)) < active
+    busy[:len(fixed)] = True
+    born = len(names)
+    samples = []
+    for frame in range(frames):
+        if frame and frame % churn == 0:
+            for _ in range(5):
+                index = int(rng.integers(len(fixed), len(names)))
+                names[index] = f'veth{born:05x}'
+                busy[index] = rng.random() < active
+                born += 1
+        traffic = rng.lognormal(0, 1.5, (len(names), 2)) * busy[:, None]
+        nics = np.zeros((len(names), len(NIC_FIELDS)))
+        nics[:, :2] = traffic
+        nics[:, 2] = (rng.random(len(names)) < 0.001) * busy
+        loads = np.clip(50 + 30 * np.sin(frame / 20 + np.arange(cores)) + rng.normal(0, 5, cores), 0, 100)
+        schema = Schema.intern(cores, tuple(names), ())
+        values = array('d', [0.0] * schema.cores_at)
+        values.extend(loads.tolist())
+        values.extend(nics.ravel().tolist())
+        samples.append(Sample(schema, values))
+    return samples
+
+
+class RecordingTree:
+    # Stand-in for a Treeview without a display: counts the calls a frame would make
+    def __init__(self):
+        self.rows = {}
+        self.calls = 0
+
+    def get_children(self, item=''):
+        self.calls += 1
+        return tuple(self.rows)
+
+    def delete(self, iid):
+        self.calls += 1
+        del self.rows[iid]
+
+    def insert(self, parent, index, iid=None, values=()):
+        self.calls += 1
+        iid = iid if iid is not None else f'I{len(self.rows)}'
+        self.rows[iid] = values
+        return iid
+
+    def item(self, iid, values=None):
+        self.calls += 1
+        self.rows[iid] = values
+
+    def move(self, iid, parent, index):
+        self.calls += 1
+
+
+def old_frame(tree, labels, sample):
+    # The previous update: every row deleted and reinserted, every label rebuilt
+    network_stats = sorted(sample.network_stats(), key=lambda x: x['interface'])
+    for item in tree.get_children():
+        tree.delete(item)
+    for stats in network_stats:
+        tree.insert("", "end", values=(stats['interface'], f"{stats['upload_mbps']:.4f}", f"{stats['download_mbps']:.4f}",
+                                       stats['errors_in'], stats['errors_out'], stats['dropped_in'], stats['dropped_out']))
+    labels(', '.join(f'{core:.1f}%' for core in sample.cores()))
+
+
+def format_row(row):
+    return (row[0],) + tuple(f"{value:.4f}" if i < 2 else f"{value:.0f}" for i, value in enumerate(row[1]))
+
+
+def new_frame(rows, cells, sample, hide_idle, aggregate):
+    shown, hidden = interface_rows(sample.schema.interfaces, sample.nics(), hide_idle,
+                                   AGGREGATED_INTERFACE_PREFIXES if aggregate else ())
+    rows.update([(key, (label, values)) for key, label, values in shown])
+    cells(heat_bands(sample.cores(), 10))
+    return len(shown)
+
+
+def run(samples, make_tree, label, heatmap, update=lambda: None):
+    # Mean ms per frame and widget calls per frame, old path then the keyed variants
+    results = {}
+    tree = make_tree()
+    calls = [0]
+
+    def count_label(text):
+        calls[0] += 1
+        label(text)
+
+    start = time.perf_counter()
+    for sample in samples:
+        old_frame(tree, count_label, sample)
+        update()
+    elapsed = time.perf_counter() - start
+    results['delete + insert all'] = (elapsed / len(samples) * 1000, (getattr(tree, 'calls', 0) + calls[0]) / len(samples), len(sample.schema.interfaces))
+
+    for name, hide_idle, aggregate in (('keyed rows', False, False), ('keyed, hide idle', True, False),
+                                       ('keyed, hide idle + veth*', True, True)):
+        tree = make_tree()
+        rows = KeyedRows(tree, format_row)
+        shown_bands = []
+        cell_calls = [0]
+
+        def cells(bands):
+            # Cells recolored only when their band changed
+            if len(bands) != len(shown_bands):
+                shown_bands[:] = [-1] * len(bands)
+            for i, band in enumerate(bands):
+                if band != shown_bands[i]:
+                    heatmap(i, band)
+                    shown_bands[i] = band
+                    cell_calls[0] += 1
+
+        tree_calls = 0
+        start = time.perf_counter()
+        for sample in samples:
+            shown = new_frame(rows, cells, sample, hide_idle, aggregate)
+            tree_calls += rows.calls
+            update()
+        elapsed = time.perf_counter() - start
+        results[name] = (elapsed / len(samples) * 1000, (tree_calls + cell_calls[0]) / len(samples), shown)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Network table and core heatmap: frame cost with many interfaces")
+    parser.add_argument('--interfaces', type=int, default=500)
+    parser.add_argument('--cores', type=int, default=64)
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+
+    samples = synthetic_host(args.interfaces, args.cores, args.frames)
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+    except Exception as e:
+        root = None
+        print(f"no display ({e}): widget calls are counted on a stand-in, times are the Python side only")
+
+    if root is None:
+        results = run(samples, RecordingTree, lambda text: None, lambda i, band: None)
+    else:
+        columns = ("interface", "upload", "download", "errors_in", "errors_out", "dropped_in", "dropped_out")
+        label = ttk.Label(root)
+        label.pack()
+        canvas = tk.Canvas(root, width=16 * 16, height=16 * (args.cores // 16 + 1))
+        canvas.pack()
+        cells = [canvas.create_rectangle(i % 16 * 16, i // 16 * 16, i % 16 * 16 + 14, i // 16 * 16 + 14) for i in range(args.cores)]
+        trees = []
+
+        def make_tree():
+            for tree in trees:
+                tree.destroy()
+            tree = ttk.Treeview(root, columns=columns, show='headings')
+            tree.pack(fill='both', expand=True)
+            trees[:] = [tree]
+            return tree
+
+        results = run(samples, make_tree, lambda text: label.config(text=text),
+                      lambda i, band: canvas.itemconfigure(cells[i], fill='#%02x0000' % (band * 25)), root.update)
+        root.destroy()
+
+    print(f"{args.interfaces} interfaces, {args.cores} cores, {args.frames} frames")
+    print(f"{'':<26} {'ms/frame':>9} {'widget calls/frame':>19} {'rows shown':>11}")
+    for name, (ms, calls, shown) in results.items():
+        print(f"{name:<26} {ms:>9.2f} {calls:>19.1f} {shown:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import json
+import signal
+import sys
+import threading
+import time
+import psutil
+from monitor import COALESCE_LATEST
+
+
+def summarize_diagnostics(metrics):
+    # One line per sample, so stages are reduced to their p99, per-probe timings are left to the GUI
+    return {
+        'cpu_percent': metrics['cpu_percent'],
+        'rss_mb': metrics['rss_mb'],
+        'jitter_p99_ms': metrics['jitter']['p99_ms'],
+        'interval_s': metrics['interval_s'],
+        'late': metrics['late'],
+        'skipped': metrics['skipped'],
+        'failed': metrics['failed'],
+        'sink_errors': metrics['sink_errors'],
+        'dropped': metrics['dropped'],
+        'stage_p99_ms': {name: stage['p99_ms'] for name, stage in metrics['stages'].items()
+                         if not name.startswith('probe:') and stage['count']},
+    }
+
+
+def summarize_rolling(rolling):
+    return {window: {metric: {name: round(value, 2) for name, value in stats.items()} for metric, stats in metrics.items()}
+            for window, metrics in rolling.snapshot().items()}
+
+
+def summarize(engine):
+    latest = engine.store.latest
+    data = latest['data']
+    network_stats = data.get('network_stats', [])
+    process_count = data.get('process_count')
+    top = sorted(engine.anomaly_contributions.items(), key=lambda item: item[1], reverse=True)[:3]
+    return {
+        'timestamp': round(latest['timestamp'], 3),
+        'cpu_usage_percent': round(data['cpu_usage_percent'], 2),
+        'memory_percent': round(data['memory_percent'], 2),
+        'disk_percent': round(data['disk_percent'], 2),
+        'net_upload_mbps': round(sum(s['upload_mbps'] for s in network_stats), 4),
+        'net_download_mbps': round(sum(s['download_mbps'] for s in network_stats), 4),
+        'net_packets_ps': round(sum(s.get('packets_in_ps', 0.0) + s.get('packets_out_ps', 0.0) for s in network_stats), 1),
+        'disks': {s['device']: {field: round(value, 3) for field, value in s.items() if field != 'device'}
+                  for s in data.get('disk_io_stats', [])},
+        'anomaly_trained': engine.detector.is_trained,
+        'anomaly_score': round(float(engine.anomaly_score), 4),
+        'is_anomaly': bool(engine.is_anomaly),
+        'anomaly_features': {name: round(share, 3) for name, share in top},
+        'alerts': engine.alerts.active(),
+        'process_count': None if process_count is None else int(process_count),
+        'top_processes': [
+            {'pid': process['pid'], 'name': process['name'], 'cpu_percent': process['cpu_percent'], 'rss_mb': process['rss_mb']}
+            for process in data.get('top_processes', {}).get('cpu_percent', [])[:5]
+        ],
+        'rolling': summarize_rolling(engine.rolling),
+        'sampling': None if engine.sampler is None else engine.sampler.stats(),
+        'diagnostics': summarize_diagnostics(engine.monitor.self_metrics(probes=False)),
+        'last_error': engine.monitor.last_error,
+    }
+
+
+class HeadlessDaemon:
+    def __init__(self, engine, output=sys.stdout, report_interval=None):
+        self.engine = engine
+        self.output = output
+        self.report_interval = report_interval # None: report every sample
+        # Only the newest sample is ever reported, a slow output just coalesces samples
+        self.subscription = engine.monitor.bus.subscribe('daemon', policy=COALESCE_LATEST)
+        self._stop = threading.Event()
+
+    def _handle_signal(self, signum, frame):
+        self.stop()
+
+    def stop(self):
+        self._stop.set()
+        self.subscription.wake()
+
+    def emit(self):
+        if self.subscription.get_nowait() is None:
+            return False
+
+        engine = self.engine
+        start = time.perf_counter()
+        engine.score()
+        self.output.write(json.dumps(summarize(engine)) + '\n')
+        self.output.flush()
+        engine.monitor.diagnostics.record('report', time.perf_counter() - start)
+        return True
+
+    def run(self, duration=None, started=None):
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self._handle_signal)
+
+        self.engine.start()
+        if started is not None:
+            rss_mb = psutil.Process().memory_info().rss / (1024 * 1024)
+            print(f"sysmonitor: started in {(time.perf_counter() - started) * 1000:.0f} ms, RSS {rss_mb:.1f} MB",
+                  file=sys.stderr, flush=True)
+
+        deadline = None if duration is None else time.monotonic() + duration
+        next_report = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                if now < next_report:
+                    # Rate limited, samples published meanwhile coalesce into the newest one
+                    self._stop.wait(next_report - now if deadline is None else min(next_report, deadline) - now)
+                    continue
+                # Woken by the collector, a signal or the deadline
+                self.subscription.wait(1.0 if deadline is None else min(1.0, deadline - now))
+                if self.emit():
+                    if self.report_interval:
+                        next_report = time.monotonic() + self.report_interval
+                elif not self.engine.collecting:
+                    # The collector finished on its own (end of a replay) or died
+                    if self.engine.monitor.running:
+                        print(f"sysmonitor: collector stopped: {self.engine.monitor.last_error}", file=sys.stderr, flush=True)
+                    break
+        finally:
+            self.engine.monitor.bus.unsubscribe(self.subscription)
+            self.engine.stop()
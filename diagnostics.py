@@ -0,0 +1,140 @@
+import time
+from array import array
+from collections import deque
+import numpy as np
+import psutil
+
+SUB_BITS = 6
+SUB_COUNT = 1 << SUB_BITS # Exact below this many microseconds
+HALF_COUNT = SUB_COUNT // 2
+MAX_SHIFT = 22 # Up to 2**28 µs, about 4.5 minutes
+BUCKETS = SUB_COUNT + MAX_SHIFT * HALF_COUNT
+
+
+def _bucket(us):
+    # Log-linear (HDR-style) index: every power of two is split into HALF_COUNT
+    # linear buckets, so the relative error stays below 1 / HALF_COUNT (~3%)
+    if us < SUB_COUNT:
+        return us
+    shift = min(us.bit_length() - SUB_BITS, MAX_SHIFT)
+    top = min(us >> shift, SUB_COUNT - 1)
+    return SUB_COUNT + (shift - 1) * HALF_COUNT + top - HALF_COUNT
+
+
+def _bucket_bounds():
+    # Lower bound and width of every bucket, in microseconds
+    lows = np.arange(BUCKETS, dtype=float)
+    widths = np.ones(BUCKETS)
+    index = np.arange(SUB_COUNT, BUCKETS)
+    shift = (index - SUB_COUNT) // HALF_COUNT + 1
+    top = (index - SUB_COUNT) % HALF_COUNT + HALF_COUNT
+    lows[SUB_COUNT:] = top * 2.0 ** shift
+    widths[SUB_COUNT:] = 2.0 ** shift
+    return lows, widths
+
+
+BUCKET_LOWS, BUCKET_WIDTHS = _bucket_bounds()
+
+
+class Histogram:
+    # Durations in fixed memory: BUCKETS counters, recording is O(1) and
+    # allocation free. One writer per histogram, readers only take snapshots.
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = array('q', bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        if seconds < 0:
+            seconds = 0.0
+        self.counts[_bucket(int(seconds * 1e6))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentiles(self, quantiles):
+        if not self.count:
+            return [0.0 for _ in quantiles]
+        seen = np.cumsum(np.frombuffer(self.counts, dtype=np.int64))
+        # Bucket midpoints, never above the exact maximum
+        index = np.searchsorted(seen, np.ceil(np.array(quantiles) * seen[-1]).clip(1))
+        values = (BUCKET_LOWS[index] + (BUCKET_WIDTHS[index] - 1) / 2) / 1e6
+        return np.minimum(values, self.max).tolist()
+
+    def as_dict(self):
+        p50, p90, p99 = self.percentiles((0.5, 0.9, 0.99))
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(p50 * 1000, 3),
+            'p90_ms': round(p90 * 1000, 3),
+            'p99_ms': round(p99 * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class SelfMetrics:
+    # What the monitor itself costs: stage timings, tick jitter, CPU time and
+    # RSS of this process. Per-probe timings live in ProbeStats, the snapshot
+    # merges them in.
+    def __init__(self, run_interval=1, cpu_window=60):
+        self.run_interval = run_interval
+        self.started = time.monotonic()
+        self.stages = {} # name -> Histogram
+        self.jitter = Histogram() # Tick start after its deadline
+        self.ticks = 0
+        self.late = 0 # Started more than a tenth of the interval late
+        self.skipped = 0 # Deadlines missed entirely because a tick overran
+        self.failed = 0 # Collections that produced no sample
+        self.sink_errors = 0 # Sink calls that raised, the sample still reached the others
+        self._cpu_marks = deque(maxlen=cpu_window) # (monotonic, process CPU seconds) per tick
+        self._process = psutil.Process()
+
+    def stage(self, name):
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages.setdefault(name, Histogram())
+        return histogram
+
+    def record(self, name, seconds):
+        self.stage(name).record(seconds)
+
+    def tick(self, lateness):
+        self.ticks += 1
+        self.jitter.record(lateness)
+        if lateness > self.run_interval * 0.1:
+            self.late += 1
+        self._cpu_marks.append((time.monotonic(), time.process_time()))
+
+    def cpu_percent(self):
+        # Over the last cpu_window ticks, 100 = one core busy
+        if len(self._cpu_marks) < 2:
+            return 0.0
+        (wall_start, cpu_start), (wall_end, cpu_end) = self._cpu_marks[0], self._cpu_marks[-1]
+        return (cpu_end - cpu_start) / max(wall_end - wall_start, 1e-6) * 100
+
+    def snapshot(self, probe_stats=None, bus=None):
+        stages = {name: histogram.as_dict() for name, histogram in list(self.stages.items())}
+        for name, stats in (probe_stats or {}).items():
+            stages[f'probe:{name}'] = stats.histogram.as_dict()
+        dropped = sum(stats['dropped'] for stats in bus.stats().values()) if bus is not None else 0
+        return {
+            'uptime_s': round(time.monotonic() - self.started, 1),
+            'cpu_percent': round(self.cpu_percent(), 2),
+            'cpu_time_s': round(time.process_time(), 3),
+            'rss_mb': round(self._process.memory_info().rss / (1024 * 1024), 1),
+            'threads': self._process.num_threads(),
+            'ticks': self.ticks,
+            'interval_s': self.run_interval, # Current one, varies with adaptive sampling
+            'late': self.late,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'sink_errors': self.sink_errors,
+            'dropped': dropped,
+            'jitter': self.jitter.as_dict(),
+            'stages': stages,
+        }
@@ -0,0 +1,214 @@
+import math
+import threading
+import time
+import numpy as np
+import psutil
+from alerts import AlertEngine
+from anomaly import MAX_TRAIN_SAMPLES, create_detector
+from monitor import COALESCE_LATEST, SysMonitor
+from rolling import WINDOWS, RollingStats
+from sampling import AdaptiveSampler, history_rows
+
+
+class MonitorEngine:
+    # Sampling plus anomaly scoring, shared by the GUI and the headless daemon
+    def __init__(self, run_interval=1, retention=3600, detector_mode='isolation_forest',
+                 contamination=0.005, relearning_interval=180, min_samples=60, storage_dir=None,
+                 metrics_address=None, record_path=None, replay_path=None, replay_speed=1.0, rolling_windows=WINDOWS,
+                 alert_rules=None, alert_sinks=(), alert_rate_limit=60,
+                 adaptive=False, burst_interval=0.1, burst_hold=10.0, burst_score=0.02):
+        adaptive = adaptive and replay_path is None
+        self.retention = retention # Samples at the base interval
+        self._burst_interval = burst_interval if adaptive else None
+        if replay_path is not None:
+            # A recording stands in for the probes, everything downstream is the same
+            from replay import ReplayMonitor
+            self.monitor = ReplayMonitor(replay_path, speed=replay_speed, retention=retention)
+        else:
+            self.monitor = SysMonitor(run_interval=run_interval, retention=history_rows(retention, run_interval, self._burst_interval))
+        self.recorder = None
+        if record_path is not None:
+            from replay import Recorder
+            self.recorder = Recorder(record_path, interval=self.monitor.run_interval)
+            self.monitor.sinks.append(self.recorder)
+        self.rolling = RollingStats(rolling_windows, interval=self.monitor.run_interval)
+        self.monitor.sinks.append(self.rolling.observe)
+        self.storage = None
+        if storage_dir is not None:
+            from storage import SegmentStorage
+            self.storage = SegmentStorage(storage_dir)
+            self._last_compaction = time.monotonic()
+            self._restore_history()
+            self.rolling.backfill(self.store)
+            self.monitor.sinks.append(self._persist)
+        self.detector_mode = detector_mode
+        self.contamination = contamination
+        self.relearning_interval = relearning_interval
+        self.min_samples = min_samples
+        self.detector = self._create_detector()
+
+        # Rules are evaluated on every sample, an anomaly rule reads the last published score
+        self.alerts = AlertEngine(alert_rules, alert_sinks, rate_limit=alert_rate_limit)
+        self.monitor.sinks.append(self._evaluate_alerts)
+
+        # Bursts of fast sampling, a recording keeps its own timing
+        self.sampler = None
+        self.burst_score = burst_score # Scores below it start a burst, a little above the anomaly boundary
+        self._firing = set()
+        if adaptive:
+            self.sampler = AdaptiveSampler(run_interval, burst_interval, hold=burst_hold)
+            self.monitor.sampler = self.sampler
+            self.monitor.sinks.append(self.sampler.observe)
+            self.monitor.sinks.append(self._adapt_sampling)
+
+        self.exporter = None
+        if metrics_address is not None:
+            from exporter import MetricsExporter
+            host, port = metrics_address
+            self.exporter = MetricsExporter(self, host, port)
+
+        self.anomaly_score = 0.0 # Last anomaly score
+        self.anomaly_contributions = {} # Feature -> share of the deviation
+        self.is_anomaly = False
+        self.published_score = math.nan # Score of the last sample a trained detector scored
+        self._scored_count = 0
+        self._score_lock = threading.Lock() # Consumers may score from different threads
+        self._thread = None
+        self._scorer = None
+        self._scoring = None
+        self._scoring_stop = threading.Event()
+
+    @property
+    def store(self):
+        return self.monitor.store
+
+    def _rows(self, samples):
+        return history_rows(samples, self.monitor.run_interval, self._burst_interval)
+
+    def _restore_history(self):
+        # History from before a restart goes back into memory, so the detector can train right away
+        from storage import sample_from_record
+
+        self.storage.compact()
+        cores = psutil.cpu_count() or 1
+        records = self.storage.latest(self.store.capacity)
+        # Records from before the detector fields were persisted can't reproduce
+        # its features, they would train it on a host that never existed
+        legacy = np.flatnonzero(np.isnan(records['net_packets_ps']))
+        if len(legacy):
+            records = records[legacy[-1] + 1:]
+        for record in records:
+            self.store.append(float(record['timestamp']), sample_from_record(record, cores))
+
+    def _persist(self, timestamp, data):
+        self.storage.append(timestamp, data)
+        if time.monotonic() - self._last_compaction >= 3600:
+            self._last_compaction = time.monotonic()
+            self.storage.compact()
+
+    def _evaluate_alerts(self, timestamp, data):
+        start = time.perf_counter()
+        self.alerts.observe(timestamp, data, self.published_score)
+        self.monitor.diagnostics.record('alerts', time.perf_counter() - start)
+
+    def _adapt_sampling(self, timestamp, data):
+        # Bursts pause while the store covers less than the retention
+        store = self.store
+        self.sampler.paused = (len(store) == store.capacity and
+                               timestamp - store.column('timestamp')[0] < self.retention * self.monitor.run_interval)
+        # After the alert rules, so a rule that just fired is already seen
+        if self.published_score < self.burst_score:
+            self.sampler.trigger('anomaly', timestamp)
+        firing = set(self.alerts.active())
+        # Only rules that newly fired: a long-firing one (disk full) must not pin the fast rate
+        if firing - self._firing:
+            self.sampler.trigger('alert', timestamp)
+        self._firing = firing
+
+    def _create_detector(self):
+        return create_detector(
+            self.detector_mode,
+            contamination=self.contamination,
+            random_state=42,
+            min_samples=self.min_samples,
+            relearning_interval=self.relearning_interval,
+            fit_histogram=self.monitor.diagnostics.stage('retraining'),
+            interval=self.monitor.run_interval,
+            capacity=self._rows(MAX_TRAIN_SAMPLES),
+        )
+
+    def configure_detector(self, mode, contamination, relearning_interval, min_samples):
+        with self._score_lock:
+            self.contamination = contamination
+            self.relearning_interval = relearning_interval
+            self.min_samples = min_samples
+            if mode == self.detector_mode:
+                # Keep the trained model, only a different detector type starts over
+                self.detector.reconfigure(contamination, relearning_interval, min_samples)
+            else:
+                self.detector_mode = mode
+                self.detector = self._create_detector()
+                self.published_score = math.nan
+            self._scored_count = 0
+
+    def score(self):
+        # Cheap to call repeatedly, only does work when new samples arrived
+        with self._score_lock:
+            store = self.store
+            if store.count == self._scored_count:
+                return self.anomaly_score
+            self._scored_count = store.count
+
+            # Retraining runs in the background, the previous model keeps scoring meanwhile
+            start = time.perf_counter()
+            self.detector.update(store)
+            if self.detector.is_trained:
+                self.anomaly_score = self.detector.predict_anomaly_score()
+                self.anomaly_contributions = self.detector.explain()
+                self.is_anomaly = self.anomaly_score < 0
+                self.published_score = self.anomaly_score
+            self.monitor.diagnostics.record('scoring', time.perf_counter() - start)
+            return self.anomaly_score
+
+    def _score_samples(self):
+        # Scoring thread: detector update, predict and explain take milliseconds
+        # per sample, so the collector only publishes. A slow score coalesces
+        # the samples that arrived meanwhile, detector.update still sees them all.
+        while not self._scoring_stop.is_set():
+            if self._scoring.wait(1.0):
+                self._scoring.drain()
+                self.score()
+
+    @property
+    def collecting(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self.alerts.start()
+        if self.exporter is not None:
+            self.exporter.start()
+        self._scoring_stop.clear()
+        self._scoring = self.monitor.bus.subscribe('scoring', policy=COALESCE_LATEST)
+        self._scorer = threading.Thread(target=self._score_samples, name='scoring', daemon=True)
+        self._scorer.start()
+        self._thread = threading.Thread(target=self.monitor.run, name='collector', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.monitor.stop()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._scorer is not None:
+            self._scoring_stop.set()
+            self._scoring.wake()
+            self._scorer.join()
+            self._scorer = None
+            self.monitor.bus.unsubscribe(self._scoring)
+        self.alerts.stop()
+        if self.exporter is not None:
+            self.exporter.stop()
+        if self.storage is not None:
+            self.storage.close()
+        if self.recorder is not None:
+            self.recorder.close()
@@ -0,0 +1,147 @@
+import asyncio
+from server import ServerThread
+
+CONTENT_TYPE = b'application/openmetrics-text; version=1.0.0; charset=utf-8'
+MEBIBIT = 1024 * 1024 # The collector's "Mbit/s" are MiB * 8
+GIBIBYTE = 1024 ** 3
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class _Family:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.samples = []
+
+    def add(self, value, **labels):
+        self.samples.append(f'{self.name}{_labels(labels)} {float(value)!r}')
+
+    def render(self):
+        lines = [f'# TYPE {self.name} gauge', f'# HELP {self.name} {self.help_text}']
+        return '\n'.join(lines + self.samples)
+
+
+def render_openmetrics(timestamp, data, anomaly_score=0.0, is_anomaly=False, anomaly_trained=False):
+    families = []
+
+    def family(name, help_text):
+        families.append(_Family(f'sysmonitor_{name}', help_text))
+        return families[-1]
+
+    family('sample_timestamp_seconds', 'Unix time of the latest sample.').add(timestamp)
+    family('cpu_usage_percent', 'Total CPU usage.').add(data['cpu_usage_percent'])
+    cores = family('cpu_core_usage_percent', 'Per-core CPU usage.')
+    for core, usage in enumerate(data['cpu_usage_per_core_percent']):
+        cores.add(usage, core=core)
+    family('cpu_frequency_hertz', 'Current CPU frequency.').add(data.get('cpu_freq_current_mhz', 0) * 1e6)
+    family('load_average_1m', 'One minute load average.').add(data.get('load_avg_1', 0.0))
+
+    family('memory_total_bytes', 'Total physical memory.').add(data.get('memory_total_gb', 0.0) * GIBIBYTE)
+    family('memory_used_bytes', 'Used physical memory.').add(data.get('memory_used_gb', 0.0) * GIBIBYTE)
+    family('memory_usage_percent', 'Used physical memory.').add(data['memory_percent'])
+
+    family('disk_usage_percent', 'Root filesystem usage.').add(data['disk_percent'])
+    family('disk_read_bytes_per_second', 'Disk read throughput.').add(data.get('disk_read_mbps', 0.0) * 1024 * 1024)
+    family('disk_write_bytes_per_second', 'Disk write throughput.').add(data.get('disk_write_mbps', 0.0) * 1024 * 1024)
+    filesystems = family('filesystem_usage_percent', 'Usage per mounted filesystem.')
+    for part in data.get('disk_usages', []):
+        filesystems.add(part['usage']['percent'], mountpoint=part['mountpoint'], fstype=part['fstype'])
+
+    upload = family('network_transmit_bits_per_second', 'Upload throughput per interface.')
+    download = family('network_receive_bits_per_second', 'Download throughput per interface.')
+    errors = family('network_errors', 'Errors per interface since the previous sample.')
+    dropped = family('network_dropped', 'Dropped packets per interface since the previous sample.')
+    packets = family('network_packets_per_second', 'Packet rate per interface.')
+    for stats in data.get('network_stats', []):
+        interface = stats['interface']
+        upload.add(stats['upload_mbps'] * MEBIBIT, interface=interface)
+        download.add(stats['download_mbps'] * MEBIBIT, interface=interface)
+        errors.add(stats['errors_in'], interface=interface, direction='in')
+        errors.add(stats['errors_out'], interface=interface, direction='out')
+        dropped.add(stats['dropped_in'], interface=interface, direction='in')
+        dropped.add(stats['dropped_out'], interface=interface, direction='out')
+        packets.add(stats.get('packets_in_ps', 0.0), interface=interface, direction='in')
+        packets.add(stats.get('packets_out_ps', 0.0), interface=interface, direction='out')
+
+    device_bytes = family('disk_device_bytes_per_second', 'Throughput per disk.')
+    device_iops = family('disk_device_operations_per_second', 'Completed operations per disk.')
+    device_latency = family('disk_device_latency_seconds', 'Mean time per completed operation per disk.')
+    for stats in data.get('disk_io_stats', []):
+        device = stats['device']
+        for direction in ('read', 'write'):
+            device_bytes.add(stats[f'{direction}_mbps'] * 1024 * 1024, device=device, direction=direction)
+            device_iops.add(stats[f'{direction}_iops'], device=device, direction=direction)
+            device_latency.add(stats[f'{direction}_latency_ms'] / 1000, device=device, direction=direction)
+
+    if 'process_count' in data:
+        family('processes', 'Number of processes.').add(data['process_count'])
+
+    family('anomaly_score', 'Anomaly score of the latest sample, negative means anomalous.').add(anomaly_score)
+    family('anomaly_detected', '1 if the latest sample is anomalous.').add(1 if is_anomaly else 0)
+    family('anomaly_model_trained', '1 once the anomaly detector is trained.').add(1 if anomaly_trained else 0)
+
+    return ('\n'.join(f.render() for f in families if f.samples) + '\n# EOF\n').encode('utf-8')
+
+
+def _response(status, body, content_type=CONTENT_TYPE):
+    head = (b'HTTP/1.1 ' + status + b'\r\nContent-Type: ' + content_type
+            + b'\r\nContent-Length: ' + str(len(body)).encode() + b'\r\n\r\n')
+    return head, head + body
+
+
+NOT_FOUND = _response(b'404 Not Found', b'Not Found\n', b'text/plain')[1]
+
+
+class MetricsExporter:
+    # Serves /metrics from a response that is rendered once per sample, in the
+    # collector thread. Scrapes only write the cached bytes, so concurrent
+    # scrapers cost no rendering at all.
+    def __init__(self, engine, host='127.0.0.1', port=9108):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self._cached = _response(b'200 OK', b'# EOF\n') # (head only, head + body)
+        self._server = ServerThread(self._handle, host, port, 'exporter')
+        engine.monitor.sinks.append(self.publish)
+
+    def publish(self, timestamp, data):
+        engine = self.engine
+        engine.score()
+        body = render_openmetrics(timestamp, data, engine.anomaly_score, engine.is_anomaly, engine.detector.is_trained)
+        # A single reference swap, a scrape sees either the old or the new response
+        self._cached = _response(b'200 OK', body)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await reader.readuntil(b'\r\n\r\n')
+                method, _, rest = request.partition(b' ')
+                path = rest.split(b' ', 1)[0].split(b'?', 1)[0]
+                if path != b'/metrics' or method not in (b'GET', b'HEAD'):
+                    writer.write(NOT_FOUND)
+                else:
+                    head, full = self._cached
+                    writer.write(full if method == b'GET' else head)
+                await writer.drain()
+                if b'connection: close' in request.lower():
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, asyncio.CancelledError):
+            pass # Disconnected, or cancelled by stop()
+        finally:
+            writer.close()
+
+    def start(self):
+        self._server.start()
+        self.port = self._server.port
+
+    def stop(self):
+        self._server.stop()
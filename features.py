@@ -0,0 +1,163 @@
+import numpy as np
+
+FEATURE_NAMES = (
+    'cpu_usage_percent',
+    'memory_percent',
+    'disk_percent',
+    'cpu_core_mean',
+    'cpu_core_max',
+    'cpu_core_std',
+    'net_upload_mbps',
+    'net_download_mbps',
+    'net_errors',
+    'net_drops',
+    'net_packets_ps',
+    'disk_read_mbps',
+    'disk_write_mbps',
+    'disk_iops',
+    'disk_latency_ms',
+    'load_avg_1',
+    'cpu_ewma',
+    'net_ewma',
+    'cpu_derivative',
+    'memory_derivative',
+    'net_derivative',
+)
+
+_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+
+def sample_weights(elapsed, interval):
+    # Time a sample covers in units of the base interval, at most 1, as in
+    # RollingStats: a burst of fast samples weighs as much as the time it spans
+    if interval <= 0:
+        return np.ones(len(elapsed))
+    return np.where((elapsed == 0) | (elapsed >= interval * 0.9), 1.0, elapsed / interval)
+
+
+class FeatureExtractor:
+    # Turns new store rows into fixed-width feature rows, once per sample.
+    # Rows live in a mirrored ring buffer like SampleStore, so matrix(n) is a view.
+    # Each row also gets the weight of the time it covers, see sample_weights.
+    def __init__(self, capacity=3600, ewma_alpha=0.1, interval=1.0):
+        self.capacity = capacity
+        self.ewma_alpha = ewma_alpha
+        self.interval = interval
+        self.count = 0
+        self._head = 0
+        self._seen = 0
+        self._rows = np.zeros((2 * capacity, len(FEATURE_NAMES)))
+        self._weights = np.zeros(2 * capacity)
+        self._prev = None # (timestamp, cpu, memory, net, cpu_ewma, net_ewma) of the previous row
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def update(self, store):
+        new = min(store.count - self._seen, len(store))
+        self._seen = store.count
+        if new <= 0:
+            return 0
+
+        block = np.empty((new, len(FEATURE_NAMES)))
+        block[:, _INDEX['cpu_usage_percent']] = store.column('cpu_usage_percent', new)
+        block[:, _INDEX['memory_percent']] = store.column('memory_percent', new)
+        block[:, _INDEX['disk_percent']] = store.column('disk_percent', new)
+
+        cores = store.cores(new)
+        if cores.shape[1]:
+            block[:, _INDEX['cpu_core_mean']] = cores.mean(axis=1)
+            block[:, _INDEX['cpu_core_max']] = cores.max(axis=1)
+            block[:, _INDEX['cpu_core_std']] = cores.std(axis=1)
+        else:
+            block[:, _INDEX['cpu_core_mean']:_INDEX['cpu_core_std'] + 1] = 0
+
+        block[:, _INDEX['net_upload_mbps']] = store.network_total('upload_mbps', new)
+        block[:, _INDEX['net_download_mbps']] = store.network_total('download_mbps', new)
+        block[:, _INDEX['net_errors']] = store.network_total('errors_in', new) + store.network_total('errors_out', new)
+        block[:, _INDEX['net_drops']] = store.network_total('dropped_in', new) + store.network_total('dropped_out', new)
+        block[:, _INDEX['net_packets_ps']] = store.network_total('packets_in_ps', new) + store.network_total('packets_out_ps', new)
+        block[:, _INDEX['disk_read_mbps']] = store.column('disk_read_mbps', new)
+        block[:, _INDEX['disk_write_mbps']] = store.column('disk_write_mbps', new)
+        read_iops, write_iops = store.disk('read_iops', new), store.disk('write_iops', new)
+        iops = read_iops.sum(axis=1) + write_iops.sum(axis=1)
+        # Mean latency over all requests of all disks, so an idle disk's zero doesn't dilute it
+        busy = (store.disk('read_latency_ms', new) * read_iops).sum(axis=1) + (store.disk('write_latency_ms', new) * write_iops).sum(axis=1)
+        block[:, _INDEX['disk_iops']] = iops
+        block[:, _INDEX['disk_latency_ms']] = np.divide(busy, iops, out=np.zeros(new), where=iops > 0)
+        block[:, _INDEX['load_avg_1']] = store.column('load_avg_1', new)
+
+        weights = self._fill_rolling(block, store.timestamps(new))
+
+        kept = block[-self.capacity:]
+        positions = (self._head + np.arange(len(kept))) % self.capacity
+        self._rows[positions] = kept
+        self._rows[positions + self.capacity] = kept
+        self._weights[positions] = weights[-self.capacity:]
+        self._weights[positions + self.capacity] = weights[-self.capacity:]
+        self._head = (self._head + len(kept)) % self.capacity
+        self.count += new
+        return new
+
+    def _fill_rolling(self, block, timestamps):
+        cpu = block[:, _INDEX['cpu_usage_percent']]
+        memory = block[:, _INDEX['memory_percent']]
+        net = block[:, _INDEX['net_upload_mbps']] + block[:, _INDEX['net_download_mbps']]
+
+        if self._prev is None:
+            self._prev = (timestamps[0], cpu[0], memory[0], net[0], cpu[0], net[0])
+
+        # Derivatives against the preceding row, per second of real elapsed time
+        prev_ts, prev_cpu, prev_memory, prev_net, cpu_ewma, net_ewma = self._prev
+        elapsed = np.maximum(np.diff(timestamps, prepend=prev_ts), 1e-6)
+        block[:, _INDEX['cpu_derivative']] = np.diff(cpu, prepend=prev_cpu) / elapsed
+        block[:, _INDEX['memory_derivative']] = np.diff(memory, prepend=prev_memory) / elapsed
+        block[:, _INDEX['net_derivative']] = np.diff(net, prepend=prev_net) / elapsed
+
+        # EWMA is inherently sequential, but it is a couple of float ops per row.
+        # Alpha is per base interval, a fast sample moves the average by its share.
+        weights = sample_weights(np.diff(timestamps, prepend=prev_ts), self.interval)
+        alphas = np.where(weights == 1.0, self.ewma_alpha, 1.0 - (1.0 - self.ewma_alpha) ** weights)
+        cpu_smoothed = []
+        net_smoothed = []
+        for cpu_value, net_value, alpha in zip(cpu.tolist(), net.tolist(), alphas.tolist()):
+            cpu_ewma += alpha * (cpu_value - cpu_ewma)
+            net_ewma += alpha * (net_value - net_ewma)
+            cpu_smoothed.append(cpu_ewma)
+            net_smoothed.append(net_ewma)
+        block[:, _INDEX['cpu_ewma']] = cpu_smoothed
+        block[:, _INDEX['net_ewma']] = net_smoothed
+
+        self._prev = (timestamps[-1], cpu[-1], memory[-1], net[-1], cpu_ewma, net_ewma)
+        return weights
+
+    def matrix(self, n=None):
+        size = len(self)
+        n = size if n is None else max(0, min(n, size))
+        end = self._head + self.capacity
+        return self._rows[end - n:end]
+
+    def weights(self, n=None):
+        size = len(self)
+        n = size if n is None else max(0, min(n, size))
+        end = self._head + self.capacity
+        return self._weights[end - n:end]
+
+    def latest(self):
+        if not self.count:
+            return None
+        return self._rows[self._head + self.capacity - 1]
+
+
+def robust_scale(deviation, center):
+    # MAD-based spread with a floor, so near-constant features don't turn noise into huge z-scores
+    return np.maximum(deviation * 1.4826, 0.5 + 0.05 * np.abs(center))
+
+
+def contributions(zscores):
+    # Share of each feature in the deviation, sums to 1
+    magnitude = np.abs(zscores)
+    total = magnitude.sum()
+    if total == 0:
+        return {name: 0.0 for name in FEATURE_NAMES}
+    return {name: float(value) for name, value in zip(FEATURE_NAMES, magnitude / total)}
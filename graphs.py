@@ -0,0 +1,273 @@
+import math
+import time
+from collections import deque
+import numpy as np
+from matplotlib.figure import Figure
+
+TITLES = ['CPU használat (%)', 'Memória használat (%)', 'Hálózati forgalom (Mbit/s)', 'Lemez I/O (MB/s)']
+
+# Plotted series: name -> last n values from the sample store
+SERIES = {
+    'cpu': lambda store, n: store.column('cpu_usage_percent', n),
+    'memory': lambda store, n: store.column('memory_percent', n),
+    'upload': lambda store, n: store.network_total('upload_mbps', n),
+    'download': lambda store, n: store.network_total('download_mbps', n),
+    'disk_read': lambda store, n: store.column('disk_read_mbps', n),
+    'disk_write': lambda store, n: store.column('disk_write_mbps', n),
+}
+
+# Series that can show a single device instead of the total: name -> (device kind, field)
+DEVICE_SERIES = {
+    'upload': ('network', 'upload_mbps'),
+    'download': ('network', 'download_mbps'),
+    'disk_read': ('disk', 'read_mbps'),
+    'disk_write': ('disk', 'write_mbps'),
+}
+
+
+def device_series(kind, field, device):
+    # One device's column, zeros while the store hasn't seen it (yet)
+    def series(store, n):
+        columns = store.interfaces if kind == 'network' else store.disks
+        index = columns.get(device)
+        values = store.network(field, n) if kind == 'network' else store.disk(field, n)
+        return values[:, index] if index is not None else np.zeros(len(values))
+    return series
+
+
+class RenderStats:
+    def __init__(self):
+        self.frames = 0
+        self.blits = 0
+        self.full_draws = 0
+        self.last_ms = 0.0
+        self.mean_ms = 0.0 # Exponentially weighted
+
+    def record(self, duration, full):
+        ms = duration * 1000
+        self.frames += 1
+        if full:
+            self.full_draws += 1
+        else:
+            self.blits += 1
+        self.last_ms = ms
+        self.mean_ms = ms if self.frames == 1 else self.mean_ms + 0.1 * (ms - self.mean_ms)
+
+
+class MinMaxDecimator:
+    # Min/max bucketing to roughly one point per pixel. Buckets are aligned to
+    # absolute sample indices, so they never shift as the window slides: each
+    # frame only feeds the new samples and drops buckets that left the window.
+    def __init__(self):
+        self.window = None
+        self.bucket_size = None
+        self._buckets = deque() # [bucket id, index of min, min, index of max, max]
+        self._seen = None
+
+    def configure(self, window, points):
+        bucket_size = max(1, math.ceil(window / max(points // 2, 1)))
+        if (window, bucket_size) != (self.window, self.bucket_size):
+            self.window = window
+            self.bucket_size = bucket_size
+            self._seen = None
+
+    def reset(self):
+        # The series changed, the next update rebuilds every bucket
+        self._seen = None
+
+    def update(self, store, getter):
+        window = min(self.window, len(store))
+        first = store.count - window
+        new = None if self._seen is None else store.count - self._seen
+        if new is None or new > window:
+            self._rebuild(getter(store, window), first)
+        elif new:
+            for index, value in zip(range(store.count - new, store.count), getter(store, new).tolist()):
+                self._add(index, value)
+        self._seen = store.count
+
+        while self._buckets and (self._buckets[0][0] + 1) * self.bucket_size <= first:
+            self._buckets.popleft()
+        return self._points(first)
+
+    def _add(self, index, value):
+        bucket_id = index // self.bucket_size
+        if self._buckets and self._buckets[-1][0] == bucket_id:
+            bucket = self._buckets[-1]
+            if value < bucket[2]:
+                bucket[1], bucket[2] = index, value
+            if value > bucket[4]:
+                bucket[3], bucket[4] = index, value
+        else:
+            self._buckets.append([bucket_id, index, value, index, value])
+
+    def _rebuild(self, values, first):
+        self._buckets.clear()
+        if not len(values):
+            return
+
+        # Pad both ends to whole buckets, then one argmin/argmax per row
+        size = self.bucket_size
+        lead = first % size
+        padded = np.full(lead + len(values) + (-(lead + len(values)) % size), np.nan)
+        padded[lead:lead + len(values)] = values
+        rows = padded.reshape(-1, size)
+        base = first - lead + np.arange(len(rows)) * size
+        lows = np.nanargmin(rows, axis=1)
+        highs = np.nanargmax(rows, axis=1)
+        ids = base // size
+        picked = np.arange(len(rows))
+        for row in zip(ids.tolist(), (base + lows).tolist(), rows[picked, lows].tolist(),
+                       (base + highs).tolist(), rows[picked, highs].tolist()):
+            self._buckets.append(list(row))
+
+    def _points(self, first):
+        if not self._buckets:
+            return np.zeros(0), np.zeros(0)
+        buckets = np.array(self._buckets, dtype=float)
+        _, low_index, low, high_index, high = buckets.T
+        if self.bucket_size == 1:
+            return low_index, low
+
+        # Two points per bucket, in time order, so spikes of either sign survive
+        low_first = low_index <= high_index
+        x = np.column_stack((np.where(low_first, low_index, high_index), np.where(low_first, high_index, low_index)))
+        y = np.column_stack((np.where(low_first, low, high), np.where(low_first, high, low)))
+        return x.ravel(), y.ravel()
+
+
+class LiveGraphs:
+    # Persistent Line2D artists on static axes. Axes, ticks, titles and grid
+    # are rendered once into a cached background, each frame only restores it
+    # and redraws the lines (blitting). A full draw happens only when the
+    # static part changes: window length, network scale or canvas resize.
+    # The x axis is seconds before the newest sample, so samples taken at a
+    # varying rate (adaptive sampling) are placed by their own timestamps.
+    def __init__(self, history_len=30, interval=1.0):
+        self.figure = Figure(figsize=(10, 4), dpi=100)
+        self.axes = [self.figure.add_subplot(1, len(TITLES), i+1) for i in range(len(TITLES))]
+        self.figure.subplots_adjust(wspace=0.3, left=0.04, right=0.99, top=0.9, bottom=0.15)
+
+        for i, ax in enumerate(self.axes):
+            ax.set_title(TITLES[i], fontsize=9)
+            ax.tick_params(axis='both', which='major', labelsize=8)
+            ax.grid(True, linestyle=':', alpha=0.6)
+        for ax in self.axes[:2]:
+            ax.set_ylim(0, 100)
+            ax.set_yticks([0, 25, 50, 75, 100])
+        for ax in self.axes[2:]:
+            ax.set_ylim(0, 1)
+
+        self.lines = {
+            'cpu': self.axes[0].plot([], [], color='blue', animated=True)[0],
+            'memory': self.axes[1].plot([], [], color='green', animated=True)[0],
+            'upload': self.axes[2].plot([], [], label='Feltöltés', color='orange', animated=True)[0],
+            'download': self.axes[2].plot([], [], label='Letöltés', color='purple', animated=True)[0],
+            'disk_read': self.axes[3].plot([], [], label='Olvasás', color='teal', animated=True)[0],
+            'disk_write': self.axes[3].plot([], [], label='Írás', color='brown', animated=True)[0],
+        }
+        for ax in self.axes[2:]:
+            ax.legend(loc='upper left', fontsize=7)
+
+        self.series = dict(SERIES)
+        self.devices = {'network': None, 'disk': None} # None: total of all devices
+        self.decimators = {name: MinMaxDecimator() for name in SERIES}
+        self.stats = RenderStats()
+        self.canvas = None
+        self._background = None
+        self._needs_full_draw = True
+        self.history_len = None
+        self.interval = None
+        self.window = None # Samples decimated per frame
+        self._start_label = None
+        self.set_window(history_len, '', interval)
+
+    def attach(self, canvas):
+        self.canvas = canvas
+        # Fired by every full draw, including the ones caused by window resizes
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def set_window(self, history_len, start_label, interval=1.0):
+        # history_len samples at the base interval
+        if (history_len, start_label, interval) == (self.history_len, self._start_label, self.interval):
+            return
+        self.history_len = history_len
+        self.interval = interval
+        self._start_label = start_label
+        span = max(history_len - 1, 1) * interval
+        for ax in self.axes:
+            ax.set_xlim(-span, 0)
+            ax.set_xticks([-span, 0])
+            ax.set_xticklabels([start_label, 'Most'])
+        self._needs_full_draw = True
+
+    def _samples_in_window(self, store):
+        # At a fixed rate that is history_len. During bursts more samples fall in
+        # the time window; the count is rounded up to history_len * 2**k so the
+        # decimators are only rebuilt when the rate changes a lot, not every frame.
+        timestamps = store.timestamps()
+        if not len(timestamps):
+            return self.history_len
+        span = max(self.history_len - 1, 1) * self.interval
+        needed = len(timestamps) - int(np.searchsorted(timestamps, timestamps[-1] - span, side='left'))
+        if needed <= self.history_len:
+            return self.history_len
+        return min(self.history_len * 2 ** math.ceil(math.log2(needed / self.history_len)), store.capacity)
+
+    def select_device(self, kind, device):
+        if self.devices[kind] == device:
+            return
+        self.devices[kind] = device
+        for name, (series_kind, field) in DEVICE_SERIES.items():
+            if series_kind == kind:
+                self.series[name] = SERIES[name] if device is None else device_series(kind, field, device)
+                self.decimators[name].reset()
+        ax = self.axes[2 if kind == 'network' else 3]
+        title = TITLES[2 if kind == 'network' else 3]
+        ax.set_title(title if device is None else f"{title} - {device}", fontsize=9)
+        self._needs_full_draw = True
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for line in self.lines.values():
+            line.axes.draw_artist(line)
+
+    def _rescale(self, ax, first, second):
+        peak = max(float(first.max()), float(second.max())) if len(first) else 0.0
+        top = ax.get_ylim()[1]
+        # Only rescale on real changes, every rescale costs a full draw
+        if peak > top or (top > 1 and peak < top / 4):
+            ax.set_ylim(0, max(1.0, peak * 1.25))
+            self._needs_full_draw = True
+
+    def update(self, store):
+        start = time.perf_counter()
+
+        # Cost is bounded by the axes width in pixels, not by the window length
+        points = max(int(self.axes[0].bbox.width), 2)
+        self.window = self._samples_in_window(store)
+        timestamps = store.timestamps(self.window)
+        first = store.count - len(timestamps)
+        for name, decimator in self.decimators.items():
+            decimator.configure(self.window, points)
+            x, y = decimator.update(store, self.series[name])
+            # Sample indices to seconds before the newest sample, which sits at the right edge
+            inside = x >= first
+            x = timestamps[x[inside].astype(np.intp) - first] - timestamps[-1] if len(timestamps) else x
+            self.lines[name].set_data(x, y[inside])
+        self._rescale(self.axes[2], self.lines['upload'].get_ydata(), self.lines['download'].get_ydata())
+        self._rescale(self.axes[3], self.lines['disk_read'].get_ydata(), self.lines['disk_write'].get_ydata())
+
+        full = self._needs_full_draw or self._background is None
+        if full:
+            self._needs_full_draw = False
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_lines()
+            self.canvas.blit(self.figure.bbox)
+
+        self.stats.record(time.perf_counter() - start, full)
@@ -1,31 +1,56 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
-from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import threading
 import time
-from anomaly import AnomalyDetector
+from graphs import LiveGraphs
+from monitor import COALESCE_LATEST
+from rolling import METRICS, window_label
+from sample import DISK_FIELDS, Sample
+from widgets import AGGREGATED_INTERFACE_PREFIXES, CoreHeatmap, KeyedRows, interface_rows
 
 class SysMonitorGUI:
-    def __init__(self, root, monitor):
+    PROCESS_SORT_LABELS = {
+        'cpu_percent': "CPU",
+        'rss_mb': "Memória",
+        'io_mbps': "Lemez I/O",
+    }
+
+    STAGE_LABELS = {
+        'collect': "Mintavétel",
+        'deliver': "Tárolás és továbbítás",
+        'scoring': "Anomália pontozás",
+        'retraining': "Újratanítás",
+        'alerts': "Riasztási szabályok",
+        'gui_frame': "GUI képkocka",
+    }
+
+    ROLLING_METRIC_LABELS = {
+        'cpu': "CPU (%)",
+        'memory': "Memória (%)",
+        'network': "Hálózat (Mbit/s)",
+    }
+
+    ALL_DEVICES = "Összes"
+
+    ANOMALY_MODE_LABELS = {
+        'isolation_forest': "Isolation Forest (háttérben újratanítva)",
+        'streaming': "Folyamatos (robusztus z-score)",
+    }
+
+    def __init__(self, root, engine):
         self.root = root
-        self.monitor = monitor
+        self.engine = engine
+        self.monitor = engine.monitor
 
-        # Default historic data length
+        # Default historic data length, the graphs read the window straight from the sample store
         self.history_len = 30 
-        
-        # Historic data lists
-        self.cpu_history = []
-        self.mem_history = []
-        self.net_upload_history = []
-        self.net_download_history = []
-
-        self.anomaly_contamination = 0.005 # 0.5% anomaly rate
-        self.anomaly_relearning_interval = 180 # Relearn every 180 samples
-        self.anomaly_minimum_samples = 60 # Minimum samples to train
-        self.anomaly_detector = AnomalyDetector(contamination=self.anomaly_contamination, min_samples=self.anomaly_minimum_samples)
-        self.anomaly_score = 0.0 # Last anomaly score
-        self.is_anomaly = False
+
+        self.anomaly_contamination = engine.contamination
+        self.anomaly_relearning_interval = engine.relearning_interval
+        self.anomaly_minimum_samples = engine.min_samples
+        self.anomaly_mode = engine.detector_mode
         
         self._configure_root(root)
         
@@ -33,7 +58,12 @@ class SysMonitorGUI:
         
         self._create_widgets()
 
-        self.update_data()
+        # Redraw when the collector publishes, only the newest sample matters for a frame
+        self.subscription = self.monitor.bus.subscribe('gui', policy=COALESCE_LATEST)
+        self._closing = False
+        self._diagnostics_shown = 0.0
+        root.bind('<<NewSample>>', self._on_new_sample)
+        threading.Thread(target=self._forward_wakeups, name='gui-wakeup', daemon=True).start()
 
 
     def _configure_root(self, root):
@@ -56,13 +86,25 @@ class SysMonitorGUI:
         notebook.pack(fill="both", expand=True)
 
         dashboard_tab = ttk.Frame(notebook)
+        processes_tab = ttk.Frame(notebook)
+        disks_tab = ttk.Frame(notebook)
+        diagnostics_tab = ttk.Frame(notebook)
         settings_tab = ttk.Frame(notebook)
         
         notebook.add(dashboard_tab, text="📊 Monitor")
+        notebook.add(processes_tab, text="🔝 Folyamatok")
+        notebook.add(disks_tab, text="💽 Lemez I/O")
+        notebook.add(diagnostics_tab, text="🩺 Diagnosztika")
         notebook.add(settings_tab, text="⚙️ Beállítások")
 
+        self._label_texts = {} # Label -> (text, colour) shown, a frame only reconfigures labels that changed
+        self._partitions_key = None
+
         self._create_settings_tab(settings_tab)
         self._create_dashboard_tab(dashboard_tab)
+        self._create_processes_tab(processes_tab)
+        self._create_disks_tab(disks_tab)
+        self._create_diagnostics_tab(diagnostics_tab)
 
 
     def _create_dashboard_tab(self, parent):
@@ -81,6 +123,94 @@ class SysMonitorGUI:
         graphs_frame.grid(row=1, column=0, sticky='nsew')
         
 
+    def _create_processes_tab(self, parent):
+        frame = ttk.Frame(parent, padding="15")
+        frame.pack(fill='both', expand=True)
+        frame.grid_rowconfigure(1, weight=1)
+        frame.grid_columnconfigure(2, weight=1)
+
+        ttk.Label(frame, text="🔝 Legtöbb erőforrást használó folyamatok", style="Header.TLabel").grid(row=0, column=0, sticky='w', pady=(0, 10))
+
+        ttk.Label(frame, text="Rendezés:").grid(row=0, column=1, sticky='e', padx=5)
+        self.process_sort_var = tk.StringVar(value=self.PROCESS_SORT_LABELS['cpu_percent'])
+        sort_combo = ttk.Combobox(frame, textvariable=self.process_sort_var, values=list(self.PROCESS_SORT_LABELS.values()), state='readonly', width=15)
+        sort_combo.grid(row=0, column=2, sticky='w', pady=(0, 10))
+        sort_combo.bind('<<ComboboxSelected>>', lambda event: self._update_process_treeview(self.monitor.store.latest['data']) if self.monitor.store.latest else None)
+
+        self.process_count_label = ttk.Label(frame, text="Folyamatok száma: N/A")
+        self.process_count_label.grid(row=0, column=3, sticky='e', padx=10)
+
+        columns = ("pid", "name", "cpu", "rss", "io")
+        self.process_tree = ttk.Treeview(frame, columns=columns, show='headings')
+        headers = {
+            "pid": ("PID", 80, "e"),
+            "name": ("Folyamat", 250, "w"),
+            "cpu": ("CPU (%)", 100, "e"),
+            "rss": ("Memória (MB)", 120, "e"),
+            "io": ("Lemez I/O (MB/s)", 120, "e"),
+        }
+        for col, (text, width, anchor) in headers.items():
+            self.process_tree.heading(col, text=text)
+            self.process_tree.column(col, width=width, anchor=anchor)
+        self.process_tree.grid(row=1, column=0, columnspan=4, sticky='nsew')
+        self.process_rows = KeyedRows(self.process_tree, lambda process: (
+            process[0], process[1], f"{process[2]:.1f}", f"{process[3]:.1f}", f"{process[4]:.3f}"))
+
+
+    def _create_disks_tab(self, parent):
+        frame = ttk.Frame(parent, padding="15")
+        frame.pack(fill='both', expand=True)
+        frame.grid_rowconfigure(1, weight=1)
+        frame.grid_columnconfigure(0, weight=1)
+
+        ttk.Label(frame, text="💽 Lemezek forgalma, műveletei és késleltetése", style="Header.TLabel").grid(row=0, column=0, sticky='w', pady=(0, 10))
+
+        columns = ("device",) + DISK_FIELDS
+        self.disk_tree = ttk.Treeview(frame, columns=columns, show='headings')
+        headers = {
+            "device": ("Eszköz", 150, "w"),
+            "read_mbps": ("Olvasás (MB/s)", 110, "e"),
+            "write_mbps": ("Írás (MB/s)", 110, "e"),
+            "read_iops": ("Olvasási IOPS", 110, "e"),
+            "write_iops": ("Írási IOPS", 110, "e"),
+            "read_latency_ms": ("Olvasási késleltetés (ms)", 150, "e"),
+            "write_latency_ms": ("Írási késleltetés (ms)", 150, "e"),
+        }
+        for col, (text, width, anchor) in headers.items():
+            self.disk_tree.heading(col, text=text)
+            self.disk_tree.column(col, width=width, anchor=anchor)
+        self.disk_tree.grid(row=1, column=0, sticky='nsew')
+        self.disk_rows = KeyedRows(self.disk_tree, lambda row: (row[0],) + tuple(
+            f"{value:.3f}" if i < 2 else f"{value:.0f}" if i < 4 else f"{value:.2f}" for i, value in enumerate(row[1])))
+
+
+    def _create_diagnostics_tab(self, parent):
+        frame = ttk.Frame(parent, padding="15")
+        frame.pack(fill='both', expand=True)
+        frame.grid_rowconfigure(2, weight=1)
+        frame.grid_columnconfigure(0, weight=1)
+
+        ttk.Label(frame, text="🩺 A SysMonitor saját erőforrás-használata", style="Header.TLabel").grid(row=0, column=0, sticky='w', pady=(0, 10))
+        self.diagnostics_label = ttk.Label(frame, text="N/A", style="Value.TLabel")
+        self.diagnostics_label.grid(row=1, column=0, sticky='w', pady=(0, 10))
+
+        columns = ("stage", "count", "mean", "p50", "p90", "p99", "max")
+        self.diagnostics_tree = ttk.Treeview(frame, columns=columns, show='headings')
+        headers = {
+            "stage": ("Szakasz", 220, "w"),
+            "count": ("Darab", 80, "e"),
+            "mean": ("Átlag (ms)", 90, "e"),
+            "p50": ("p50 (ms)", 90, "e"),
+            "p90": ("p90 (ms)", 90, "e"),
+            "p99": ("p99 (ms)", 90, "e"),
+            "max": ("Max (ms)", 90, "e"),
+        }
+        for col, (text, width, anchor) in headers.items():
+            self.diagnostics_tree.heading(col, text=text)
+            self.diagnostics_tree.column(col, width=width, anchor=anchor)
+        self.diagnostics_tree.grid(row=2, column=0, sticky='nsew')
+
+
     def _create_statistics_section(self, parent):
         stats_frame = ttk.Frame(parent)
         
@@ -95,27 +225,128 @@ class SysMonitorGUI:
 
         self.anomaly_label = ttk.Label(stats_frame, text="Rendszer állapota: Folyamatban 🕓", font=("Segoe UI", 10, "bold"), foreground="gray")
         self.anomaly_label.grid(row=1, column=1, sticky='e', padx=10, pady=5)
+        # Firing alert rules: unlike the label above they have hysteresis and a minimum duration, so they don't flap
+        self.alert_label = ttk.Label(stats_frame, text="Riasztások: nincs", font=("Segoe UI", 10, "bold"), foreground="gray")
+        self.alert_label.grid(row=2, column=1, sticky='e', padx=10, pady=5)
         stats_frame.grid_columnconfigure(1, weight=1)
 
+        self._create_core_heatmap(stats_frame).grid(row=0, column=2, rowspan=4, sticky='nw', padx=(15, 0))
+
         ttk.Separator(stats_frame, orient='horizontal').grid(row=4, column=0, columnspan=2, sticky='ew', pady=10)
 
         # Hálózati Treeview
         ttk.Label(stats_frame, text="🌐 Hálózati Forgalom (Mbit/s)", style="Header.TLabel").grid(row=5, column=0, columnspan=2, sticky='w', pady=(10, 5))
+        self._create_network_filters(stats_frame).grid(row=5, column=1, sticky='e', pady=(10, 5))
         self.tree = self._create_network_treeview(stats_frame, 6)
+        self.network_rows = KeyedRows(self.tree, lambda row: (row[0],) + tuple(
+            f"{value:.4f}" if i < 2 else f"{value:.0f}" for i, value in enumerate(row[1])))
+        
+        self._create_rolling_section(stats_frame).grid(row=5, column=2, rowspan=2, sticky='nsew', padx=(15, 0))
         
         stats_frame.grid_rowconfigure(6, weight=1)
         stats_frame.grid_columnconfigure(1, weight=1) 
         
         ttk.Label(stats_frame, text="📊 Grafikonok", style="Header.TLabel").grid(row=7, column=0, columnspan=2, sticky='w', pady=(10, 5))
+        self.render_label = ttk.Label(stats_frame, text="Renderelés: -", foreground="gray")
+        self.render_label.grid(row=7, column=1, sticky='e', padx=10)
 
         return stats_frame
 
 
+    def _create_core_heatmap(self, parent):
+        frame = ttk.Frame(parent)
+        ttk.Label(frame, text="🔥 Magok terhelése", style="Header.TLabel").grid(row=0, column=0, sticky='w', pady=(0, 5))
+        self.core_heatmap = CoreHeatmap(frame)
+        self.core_heatmap.canvas.grid(row=1, column=0, sticky='w')
+        ttk.Label(frame, textvariable=self.core_heatmap.detail, foreground="gray").grid(row=2, column=0, sticky='w')
+        return frame
+
+
+    def _create_network_filters(self, parent):
+        frame = ttk.Frame(parent)
+        self.hide_idle_var = tk.BooleanVar(value=False)
+        self.aggregate_interfaces_var = tk.BooleanVar(value=True)
+        redraw = lambda: self._update_network_treeview(self.monitor.store.latest['data']) if self.monitor.store.latest else None
+        ttk.Checkbutton(frame, text="Tétlen adapterek elrejtése", variable=self.hide_idle_var, command=redraw).pack(side='left', padx=5)
+        ttk.Checkbutton(frame, text=f"{', '.join(f'{prefix}*' for prefix in AGGREGATED_INTERFACE_PREFIXES)} összevonása",
+                        variable=self.aggregate_interfaces_var, command=redraw).pack(side='left', padx=5)
+        self.hidden_interfaces_label = ttk.Label(frame, text="", foreground="gray")
+        self.hidden_interfaces_label.pack(side='left', padx=5)
+        return frame
+
+
+    def _set_text(self, label, text, foreground=None):
+        state = (text, foreground)
+        if self._label_texts.get(label) != state:
+            if foreground is None:
+                label.config(text=text)
+            else:
+                label.config(text=text, foreground=foreground)
+            self._label_texts[label] = state
+
+
+    def _create_rolling_section(self, parent):
+        frame = ttk.Frame(parent)
+        frame.grid_rowconfigure(1, weight=1)
+        frame.grid_columnconfigure(0, weight=1)
+
+        ttk.Label(frame, text="📈 Gördülő statisztikák", style="Header.TLabel").grid(row=0, column=0, sticky='w', pady=(10, 5))
+        self.rolling_windows = {self._window_text(seconds): window_label(seconds) for seconds in self.engine.rolling.windows}
+        self.rolling_window_var = tk.StringVar(value=next(iter(self.rolling_windows)))
+        window_combo = ttk.Combobox(frame, textvariable=self.rolling_window_var, values=list(self.rolling_windows), state='readonly', width=8)
+        window_combo.grid(row=0, column=1, sticky='e', pady=(10, 5))
+        window_combo.bind('<<ComboboxSelected>>', lambda event: self._update_rolling())
+
+        columns = ("metric", "p50", "p95", "p99", "min", "max", "ewma")
+        self.rolling_tree = ttk.Treeview(frame, columns=columns, show='headings', height=len(METRICS))
+        headers = {
+            "metric": ("Mérőszám", 120, "w"),
+            "p50": ("p50", 60, "e"),
+            "p95": ("p95", 60, "e"),
+            "p99": ("p99", 60, "e"),
+            "min": ("Min", 60, "e"),
+            "max": ("Max", 60, "e"),
+            "ewma": ("EWMA", 60, "e"),
+        }
+        for col, (text, width, anchor) in headers.items():
+            self.rolling_tree.heading(col, text=text)
+            self.rolling_tree.column(col, width=width, anchor=anchor)
+        for metric in METRICS:
+            self.rolling_tree.insert("", "end", iid=metric, values=(self.ROLLING_METRIC_LABELS[metric],))
+        self.rolling_tree.grid(row=1, column=0, columnspan=2, sticky='nsew')
+        return frame
+
+
+    @staticmethod
+    def _window_text(seconds):
+        if seconds % 3600 == 0:
+            return f"{seconds // 3600} óra"
+        if seconds % 60 == 0:
+            return f"{seconds // 60} perc"
+        return f"{seconds} mp"
+
+
     def _create_graphs_section(self, parent):
         graphs_frame = ttk.Frame(parent, padding="10", relief="sunken")
 
-        self.fig, self.axes = self._setup_graphs()
+        # Network and disk graphs show the total of all devices or a single one
+        selector = ttk.Frame(graphs_frame)
+        selector.pack(fill='x')
+        self.device_vars = {}
+        self.device_combos = {}
+        for kind, text in (('network', "Hálózati adapter:"), ('disk', "Lemez:")):
+            ttk.Label(selector, text=text).pack(side='left', padx=(10, 5))
+            self.device_vars[kind] = tk.StringVar(value=self.ALL_DEVICES)
+            combo = ttk.Combobox(selector, textvariable=self.device_vars[kind], values=[self.ALL_DEVICES], state='readonly', width=15)
+            combo.pack(side='left')
+            combo.bind('<<ComboboxSelected>>', lambda event, kind=kind: self._select_device(kind))
+            self.device_combos[kind] = combo
+
+        self.graphs = LiveGraphs(self.history_len)
+        self.fig, self.axes = self.graphs.figure, self.graphs.axes
         self.canvas = FigureCanvasTkAgg(self.fig, master=graphs_frame)
+        self.graphs.attach(self.canvas)
+        self._configure_graph_time_axis()
         self.canvas_widget = self.canvas.get_tk_widget()
         self.canvas_widget.pack(fill=tk.BOTH, expand=True)
         
@@ -132,7 +363,7 @@ class SysMonitorGUI:
 
 
     def _create_network_treeview(self, parent, row):
-        columns = ("interface", "upload", "download", "errors_in", "errors_out", "dropped_in", "dropped_out")
+        columns = ("interface", "upload", "download", "errors_in", "errors_out", "dropped_in", "dropped_out", "packets_in", "packets_out")
         tree = ttk.Treeview(parent, columns=columns, show='headings')
         
         headers = {
@@ -142,7 +373,9 @@ class SysMonitorGUI:
             "errors_in": ("Bejövő hibák", 80, "e"),
             "errors_out": ("Kimenő hibák", 80, "e"),
             "dropped_in": ("Bejövő elvesztett csomagok", 100, "e"),
-            "dropped_out": ("Kimenő elvesztett csomagok", 100, "e")
+            "dropped_out": ("Kimenő elvesztett csomagok", 100, "e"),
+            "packets_in": ("Bejövő csomag/s", 90, "e"),
+            "packets_out": ("Kimenő csomag/s", 90, "e")
         }
         
         for col, (text, width, anchor) in headers.items():
@@ -153,167 +386,176 @@ class SysMonitorGUI:
         return tree
 
     
-    def _setup_graphs(self):
-        fig = Figure(figsize=(10, 4), dpi=100)
-        axs = [fig.add_subplot(1, 3, i+1) for i in range(3)] 
-        
-        fig.subplots_adjust(wspace=0.3, left=0.05, right=0.98, top=0.9, bottom=0.15)
-        
-        titles = ['CPU használat (%)', 'Memória használat (%)', 'Hálózati forgalom (Mbit/s)']
-        
-        for i, ax in enumerate(axs):
-            ax.set_title(titles[i], fontsize=9)
-            ax.tick_params(axis='both', which='major', labelsize=8)
-            ax.set_ylim(0, 100)
-            ax.set_yticks([0, 25, 50, 75, 100])
-        
-        axs[2].set_ylim(bottom=0)
-
-        return fig, axs
-
-    
-    def update_data(self):
-        if not self.monitor.data:
-            self.root.after(1000, self.update_data)
+    def _forward_wakeups(self):
+        # Tk calls from another thread are queued to the main loop and wait for it,
+        # so they are made from this thread: a busy or closing GUI never stalls the collector.
+        while not self._closing:
+            if not self.subscription.wait(0.5):
+                continue
+            try:
+                self.root.event_generate('<<NewSample>>', when='tail')
+            except (RuntimeError, tk.TclError):
+                return # Main loop is gone
+
+
+    def close(self):
+        self._closing = True
+        self.monitor.bus.unsubscribe(self.subscription)
+
+
+    def _on_new_sample(self, event=None):
+        sample = self.subscription.get_nowait()
+        if sample is None:
+            # Already drawn by an earlier wakeup
             return
+        self.update_data(sample[1])
 
-        latest_entry = self.monitor.data[-1]
-        data = latest_entry['data']
 
-        if not self.anomaly_detector.is_trained or (len(self.monitor.data) % self.anomaly_relearning_interval == 0 and len(self.monitor.data) > self.anomaly_detector.min_samples):
-            if self.anomaly_detector.train(self.monitor.data):
-                # print("Isolation Forest betanítva.")
-                pass
+    def update_data(self, data):
+        start = time.perf_counter()
+        store = self.monitor.store
 
-        if self.anomaly_detector.is_trained:
-            self.anomaly_score = self.anomaly_detector.predict_anomaly_score(data)
-            
-            self.is_anomaly = self.anomaly_score < 0 
+        self.engine.score()
+        if self.engine.detector.is_trained:
             self._update_anomaly_label()
+        self._update_alert_label()
             
-        cpu_data, mem_data, upload_data, download_data, x_data = self._process_historical_data(data)
-        
         self._update_general_stats(data)
 
         self._update_network_treeview(data)
-        
-        self._update_graphs(cpu_data, mem_data, upload_data, download_data, x_data)
 
-        self.root.after(1000, self.update_data)
+        self._update_disk_treeview(data)
 
-
-    def _process_historical_data(self, data):
-        self.cpu_history.append(data['cpu_usage_percent'])
-        self.mem_history.append(data['memory_percent'])
-            
-        total_upload = sum(s['upload_mbps'] for s in data.get('network_stats', []))
-        total_download = sum(s['download_mbps'] for s in data.get('network_stats', []))
-        self.net_upload_history.append(total_upload)
-        self.net_download_history.append(total_download)
+        self._update_process_treeview(data)
         
-        start_index = max(0, len(self.cpu_history) - self.history_len)
-            
-        cpu_data = self.cpu_history[start_index:]
-        mem_data = self.mem_history[start_index:]
-        upload_data = self.net_upload_history[start_index:]
-        download_data = self.net_download_history[start_index:]
-            
-        x_data = list(range(len(cpu_data))) 
-        
-        return cpu_data, mem_data, upload_data, download_data, x_data
+        self._update_graphs(store)
+
+        # Snapshots walk every histogram and sketch, once a second is plenty
+        if time.monotonic() - self._diagnostics_shown >= 1.0:
+            self._diagnostics_shown = time.monotonic()
+            self._update_rolling()
+            self._update_diagnostics()
+            self._update_device_choices(store)
+        self.monitor.diagnostics.record('gui_frame', time.perf_counter() - start)
+
+
+    def _update_rolling(self):
+        stats = self.engine.rolling.snapshot().get(self.rolling_windows[self.rolling_window_var.get()], {})
+        for metric in METRICS:
+            values = stats.get(metric)
+            if values is None:
+                continue
+            self.rolling_tree.item(metric, values=(self.ROLLING_METRIC_LABELS[metric],) + tuple(
+                f"{values[name]:.1f}" for name in ("p50", "p95", "p99", "min", "max", "ewma")))
+
+
+    def _update_diagnostics(self):
+        metrics = self.monitor.self_metrics()
+        jitter = metrics['jitter']
+        self._set_text(self.diagnostics_label, (
+            f"CPU: {metrics['cpu_percent']:.1f}% ({metrics['cpu_time_s']:.1f} mp) | RSS: {metrics['rss_mb']:.1f} MB | szálak: {metrics['threads']}"
+            f" | időzítés csúszása: p50 {jitter['p50_ms']:.1f} ms, p99 {jitter['p99_ms']:.1f} ms"
+            f" | késett: {metrics['late']}, kimaradt: {metrics['skipped']}, sikertelen: {metrics['failed']}, továbbítási hiba: {metrics['sink_errors']}, eldobott: {metrics['dropped']}"
+            f" | mintavétel: {1 / metrics['interval_s'] if metrics['interval_s'] else 0:.1f} Hz"))
+
+        # Rows are keyed by stage name and updated in place
+        for name, stage in metrics['stages'].items():
+            if name.startswith('probe:'):
+                label = f"Szonda: {name[len('probe:'):]}"
+            else:
+                label = self.STAGE_LABELS.get(name, name)
+            values = (label, stage['count'], f"{stage['mean_ms']:.2f}", f"{stage['p50_ms']:.2f}",
+                      f"{stage['p90_ms']:.2f}", f"{stage['p99_ms']:.2f}", f"{stage['max_ms']:.2f}")
+            if self.diagnostics_tree.exists(name):
+                self.diagnostics_tree.item(name, values=values)
+            else:
+                self.diagnostics_tree.insert("", "end", iid=name, values=values)
 
 
     def _update_general_stats(self, data):
-        # CPU
-        cpu_cores_text = ', '.join(f'{core:.1f}%' for core in data['cpu_usage_per_core_percent'])
-        cpu_text = f"{data['cpu_usage_percent']:.1f}% @ {data['cpu_freq_current_mhz']} MHz - ({cpu_cores_text})"
-        self.general_labels['cpu'].config(text=cpu_text)
+        sample = data if isinstance(data, Sample) else Sample.from_data(data)
+
+        # CPU, the per-core loads go to the heatmap
+        cpu_text = f"{sample.scalar('cpu_usage_percent', 0.0):.1f}% @ {sample.scalar('cpu_freq_current_mhz', 0.0):.0f} MHz ({len(sample.cores())} mag)"
+        self._set_text(self.general_labels['cpu'], cpu_text)
+        self.core_heatmap.update(sample.cores())
             
         # Memory
-        mem_text = f"{data['memory_used_gb']:.2f} GB / {data['memory_total_gb']:.2f} GB ({data['memory_used_gb'] / data['memory_total_gb'] * 100:.1f}%)"
-        self.general_labels['memory'].config(text=mem_text)
-
-        # Storage
-        partitions_info = []
-        for part in data.get('disk_usages', []):
-            usage = part['usage']
-            used_gb = usage['used'] / (1024 ** 3)
-            total_gb = usage['total'] / (1024 ** 3)
-            partitions_info.append(f"{part['mountpoint']} {used_gb:.2f} GB / {total_gb:.2f} GB ({usage['percent']}%)")
-
-        self.general_labels['partitions'].config(text="; ".join(partitions_info))
+        used_gb, total_gb = sample.scalar('memory_used_gb', 0.0), sample.scalar('memory_total_gb', 0.0)
+        mem_text = f"{used_gb:.2f} GB / {total_gb:.2f} GB ({used_gb / total_gb * 100 if total_gb else 0.0:.1f}%)"
+        self._set_text(self.general_labels['memory'], mem_text)
+
+        # Storage, the text is only rebuilt when a mount or its usage changed
+        mounts = sample.values[sample.schema.mounts_at:sample.schema.disks_at]
+        key = (sample.schema.mounts, tuple(mounts))
+        if key != self._partitions_key:
+            self._partitions_key = key
+            partitions_info = []
+            for part in sample.disk_usages():
+                usage = part['usage']
+                used_gb = usage['used'] / (1024 ** 3)
+                total_gb = usage['total'] / (1024 ** 3)
+                partitions_info.append(f"{part['mountpoint']} {used_gb:.2f} GB / {total_gb:.2f} GB ({usage['percent']:.1f}%)")
+            self._set_text(self.general_labels['partitions'], "; ".join(partitions_info))
 
 
     def _update_network_treeview(self, data):
-        network_stats = data.get('network_stats', [])
-        # Sort by network adapter name
-        sorted_stats = sorted(network_stats, key=lambda x: x['interface']) 
-            
-        # Clear previous entries
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # Insert new, sorted data
-        for stats in sorted_stats:
-            self.tree.insert("", "end", values=(
-                stats['interface'],
-                f"{stats['upload_mbps']:.4f}",
-                f"{stats['download_mbps']:.4f}",
-                stats['errors_in'],
-                stats['errors_out'],
-                stats['dropped_in'],
-                stats['dropped_out']
-            ))
+        sample = data if isinstance(data, Sample) else Sample.from_data(data)
+        rows, hidden = interface_rows(sample.schema.interfaces, sample.nics(), self.hide_idle_var.get(),
+                                      AGGREGATED_INTERFACE_PREFIXES if self.aggregate_interfaces_var.get() else ())
+        # Sorted by adapter name, keyed rows updated in place
+        self.network_rows.update([(key, (label, values)) for key, label, values in rows])
+        self._set_text(self.hidden_interfaces_label, f"{hidden} elrejtve" if hidden else "")
 
     
-    def _update_graphs(self, cpu_data, mem_data, upload_data, download_data, x_data):
-        # Clear previous lines on all axes
-        for ax in self.axes:
-            ax.clear()
-        
-        # CPU graph
-        self.axes[0].plot(x_data, cpu_data, color='blue')
-        self.axes[0].set_ylim(0, 100)
-        self.axes[0].set_title('CPU használat (%)', fontsize=9)
-            
-        # Memory graph
-        self.axes[1].plot(x_data, mem_data, color='green')
-        self.axes[1].set_ylim(0, 100)
-        self.axes[1].set_title('Memória használat (%)', fontsize=9)
-
-        # Network graph
-        self.axes[2].plot(x_data, upload_data, label='Feltöltés', color='orange')
-        self.axes[2].plot(x_data, download_data, label='Letöltés', color='purple')
-        self.axes[2].legend(loc='upper left', fontsize=7)
-        self.axes[2].set_title('Hálózati forgalom (Mbit/s)', fontsize=9)
-        self.axes[2].set_ylim(bottom=0)
-        
-        # Common axis settings (Time)
-        self._configure_graph_time_axis(x_data)
-                 
-        # Redraw canvas
-        self.canvas.draw()
+    def _update_disk_treeview(self, data):
+        sample = data if isinstance(data, Sample) else Sample.from_data(data)
+        width = len(DISK_FIELDS)
+        disks = sample.disks()
+        disks = disks.tolist() if hasattr(disks, 'tolist') else list(disks)
+        self.disk_rows.update(sorted((name, (name, tuple(disks[i * width:(i + 1) * width])))
+                                     for i, name in enumerate(sample.schema.disks)))
 
 
-    def _configure_graph_time_axis(self, x_data):
-        current_history_length = len(x_data)
-        
-        # Only the two extreme points need to be marked
-        x_ticks = [x_data[0], x_data[-1]] if x_data else []
+    def _update_device_choices(self, store):
+        # Every device the store has a column for, including unplugged ones still in the window
+        for kind, devices in (('network', store.interfaces), ('disk', store.disks)):
+            choices = [self.ALL_DEVICES] + sorted(devices)
+            if list(self.device_combos[kind]['values']) != choices:
+                self.device_combos[kind]['values'] = choices
 
-        if len(self.monitor.data) > self.history_len:
-            time_now = time.time()
-            time_diff = time_now - current_history_length
-            time_diff_string = time.strftime('%H:%M:%S', time.gmtime(time_diff))
-        else:
-            time_diff_string = f"-{time.strftime('%H:%M:%S', time.gmtime(current_history_length))}"
-        
-        x_labels = [f'{time_diff_string}', 'Most'] if x_data else []
 
-        for ax in self.axes:
-            ax.set_xticks(x_ticks)
-            ax.set_xticklabels(x_labels)
-            ax.grid(True, linestyle=':', alpha=0.6)
+    def _select_device(self, kind):
+        device = self.device_vars[kind].get()
+        self.graphs.select_device(kind, None if device == self.ALL_DEVICES else device)
+        self.graphs.update(self.monitor.store)
+
+
+    def _update_process_treeview(self, data):
+        top_processes = data.get('top_processes')
+        if top_processes is None:
+            return
+
+        sort_key = next(key for key, label in self.PROCESS_SORT_LABELS.items() if label == self.process_sort_var.get())
+        self._set_text(self.process_count_label, f"Folyamatok száma: {data.get('process_count', 0):.0f}")
+
+        self.process_rows.update([(str(process['pid']), (process['pid'], process['name'], process['cpu_percent'],
+                                                          process['rss_mb'], process['io_mbps']))
+                                  for process in top_processes[sort_key]])
+
+
+    def _update_graphs(self, store):
+        self.graphs.update(store)
+
+        stats = self.graphs.stats
+        bus = self.subscription.stats()
+        self._set_text(self.render_label, f"Renderelés: {stats.last_ms:.1f} ms (átlag {stats.mean_ms:.1f} ms) | blit: {stats.blits}, teljes: {stats.full_draws} | kihagyott minta: {bus['dropped']}, késés: {bus['last_latency_ms']:.1f} ms")
+
+
+    def _configure_graph_time_axis(self):
+        # Static relative labels: a changing clock label would force a full redraw every frame
+        window_seconds = round(self.history_len * self.monitor.run_interval)
+        self.graphs.set_window(self.history_len, f"-{time.strftime('%H:%M:%S', time.gmtime(window_seconds))}", self.monitor.run_interval)
 
     
     def _create_settings_tab(self, parent):
@@ -346,8 +588,13 @@ class SysMonitorGUI:
         min_samples_entry = ttk.Entry(frame, textvariable=self.min_samples_var, width=10)
         min_samples_entry.grid(row=6, column=1, sticky='w', pady=5)
         
+        ttk.Label(frame, text="Detektor típusa:").grid(row=7, column=0, sticky='w', pady=5)
+        self.mode_var = tk.StringVar(value=self.ANOMALY_MODE_LABELS[self.anomaly_mode])
+        mode_combo = ttk.Combobox(frame, textvariable=self.mode_var, values=list(self.ANOMALY_MODE_LABELS.values()), state='readonly', width=30)
+        mode_combo.grid(row=7, column=1, sticky='w', pady=5)
+
         apply_button = ttk.Button(frame, text="Alkalmaz", command=self.apply_settings)
-        apply_button.grid(row=7, column=0, columnspan=2, pady=15)
+        apply_button.grid(row=8, column=0, columnspan=2, pady=15)
 
     def apply_settings(self):
         try:
@@ -356,10 +603,7 @@ class SysMonitorGUI:
                 raise ValueError("history_len")
             
             self.history_len = new_len
-            self.cpu_history = self.cpu_history[-new_len:]
-            self.mem_history = self.mem_history[-new_len:]
-            self.net_upload_history = self.net_upload_history[-new_len:]
-            self.net_download_history = self.net_download_history[-new_len:]
+            self._configure_graph_time_axis()
 
             new_contam_percent = float(self.contam_var.get())
             new_contam = new_contam_percent / 100.0
@@ -376,11 +620,14 @@ class SysMonitorGUI:
             if new_min_samples < 5:
                 raise ValueError("min_samples")
             self.anomaly_minimum_samples = new_min_samples
+
+            self.anomaly_mode = next(mode for mode, label in self.ANOMALY_MODE_LABELS.items() if label == self.mode_var.get())
             
-            self.anomaly_detector = AnomalyDetector(
-                contamination=self.anomaly_contamination, 
-                random_state=42, 
-                min_samples=self.anomaly_minimum_samples
+            self.engine.configure_detector(
+                self.anomaly_mode,
+                self.anomaly_contamination,
+                self.anomaly_relearning_interval,
+                self.anomaly_minimum_samples
             )
             
             # Sikeres Üzenet
@@ -401,12 +648,23 @@ class SysMonitorGUI:
                 
             messagebox.showerror("Hiba!", msg)
 
+    def _update_alert_label(self):
+        active = self.engine.alerts.active()
+        if active:
+            self._set_text(self.alert_label, f"Riasztások: {', '.join(active)} 🔔", "red")
+        else:
+            self._set_text(self.alert_label, "Riasztások: nincs", "gray")
+
+
     def _update_anomaly_label(self):
-        if self.is_anomaly:
-            text = f"Rendszer állapota: Detektált anomália ⚠️ ({self.anomaly_score*100:.2f})"
+        score = self.engine.anomaly_score
+        if self.engine.is_anomaly:
+            top = sorted(self.engine.anomaly_contributions.items(), key=lambda item: item[1], reverse=True)[:3]
+            causes = ', '.join(f"{name} {share*100:.0f}%" for name, share in top)
+            text = f"Rendszer állapota: Detektált anomália ⚠️ ({score*100:.2f}) - {causes}"
             color = "red"
         else:
-            text = f"Rendszer állapota: Normál működés ✅ ({self.anomaly_score*100:.2f})"
+            text = f"Rendszer állapota: Normál működés ✅ ({score*100:.2f})"
             color = "green"
 
-        self.anomaly_label.config(text=text, foreground=color)
\ No newline at end of file
+        self._set_text(self.anomaly_label, text, color)
\ No newline at end of file
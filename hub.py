@@ -0,0 +1,388 @@
+import asyncio
+import json
+import socket
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from anomaly import MAX_TRAIN_SAMPLES, create_detector
+from monitor import DROP_OLDEST
+from sample import DISK_FIELDS, MOUNT_FIELDS, NIC_FIELDS, Sample, Schema
+from sampling import history_rows
+from server import ServerThread
+from store import SampleStore
+
+# Wire format: every frame is a FRAME header followed by its payload.
+#   HELLO   JSON {'host', 'interval', 'burst_interval'}, first frame of every connection
+#   SCHEMA  JSON {'cores', 'interfaces', 'mounts', 'disks', 'nic_fields', 'disk_fields'},
+#           whenever the layout of the samples changes
+#   SAMPLES uint32 count, count float64 timestamps, count x width float32 values laid
+#           out as sample.Schema. With FLAG_DELTA every row after the first is XORed
+#           bitwise with the previous one: unchanged values (totals, idle NICs, mounts)
+#           become zero words, which zlib then squeezes out.
+FRAME = struct.Struct('<BBI') # message type, flags, payload length
+COUNT = struct.Struct('<I')
+MSG_HELLO = 1
+MSG_SCHEMA = 2
+MSG_SAMPLES = 3
+FLAG_ZLIB = 1
+FLAG_DELTA = 2
+MAX_PAYLOAD = 16 * 1024 * 1024
+
+
+def encode_frame(kind, payload, compress=False, flags=0):
+    if compress:
+        packed = zlib.compress(payload, 1)
+        # Not worth it for tiny or incompressible payloads
+        if len(packed) < len(payload):
+            payload, flags = packed, flags | FLAG_ZLIB
+    return FRAME.pack(kind, flags, len(payload)) + payload
+
+
+def inflate(payload):
+    # Bounded like the frames themselves, a small frame must not expand into gigabytes
+    decompressor = zlib.decompressobj()
+    data = decompressor.decompress(payload, MAX_PAYLOAD)
+    if decompressor.unconsumed_tail or decompressor.unused_data or not decompressor.eof:
+        raise ValueError(f"compressed frame is truncated, has trailing data or inflates past {MAX_PAYLOAD} bytes")
+    return data
+
+
+def encode_json(kind, value):
+    return encode_frame(kind, json.dumps(value).encode('utf-8'))
+
+
+# Per-NIC fields of agents and recordings from before the field lists were sent
+LEGACY_NIC_FIELDS = ('upload_mbps', 'download_mbps', 'errors_in', 'errors_out', 'dropped_in', 'dropped_out')
+
+
+def encode_schema(schema):
+    return encode_json(MSG_SCHEMA, {'cores': schema.cores, 'interfaces': list(schema.interfaces),
+                                    'mounts': [list(mount) for mount in schema.mounts],
+                                    'disks': list(schema.disks),
+                                    'nic_fields': list(NIC_FIELDS), 'disk_fields': list(DISK_FIELDS)})
+
+
+class WireSchema:
+    # The schema of a SCHEMA frame. A sender with other per-device fields
+    # (an older agent or recording) gets its rows mapped onto the local
+    # layout by field name, fields it doesn't send read as zero.
+    def __init__(self, layout):
+        self.schema = Schema.intern(int(layout['cores']), tuple(layout['interfaces']),
+                                    tuple(tuple(mount) for mount in layout.get('mounts', ())),
+                                    tuple(layout.get('disks', ())))
+        nic_fields = tuple(layout.get('nic_fields', LEGACY_NIC_FIELDS))
+        disk_fields = tuple(layout.get('disk_fields', DISK_FIELDS))
+        self._columns = None
+        self.width = self.schema.width
+        if nic_fields != NIC_FIELDS or disk_fields != DISK_FIELDS:
+            self._map(nic_fields, disk_fields)
+
+    def _map(self, nic_fields, disk_fields):
+        schema = self.schema
+        columns = list(range(schema.nics_at)) # Scalars and cores are the same everywhere
+        at = schema.nics_at
+        for count, sent, fields in ((len(schema.interfaces), nic_fields, NIC_FIELDS),
+                                    (len(schema.mounts), MOUNT_FIELDS, MOUNT_FIELDS),
+                                    (len(schema.disks), disk_fields, DISK_FIELDS)):
+            position = {field: i for i, field in enumerate(sent)}
+            for _ in range(count):
+                columns += [at + position[field] if field in position else -1 for field in fields]
+                at += len(sent)
+        self._columns = np.array(columns)
+        self.width = at
+
+    def rows(self, values):
+        if self._columns is None:
+            return values
+        rows = values[:, np.maximum(self._columns, 0)]
+        rows[:, self._columns < 0] = 0.0
+        return rows
+
+
+def _xor_rows(bits):
+    delta = bits.copy()
+    delta[1:] ^= bits[:-1]
+    return delta
+
+
+def encode_samples(samples, compress=False):
+    # All samples must share one schema
+    timestamps = np.array([timestamp for timestamp, sample in samples], dtype='<f8')
+    values = np.array([sample.values for timestamp, sample in samples], dtype='<f4')
+    flags = 0
+    if compress:
+        timestamps = _xor_rows(timestamps.view('<u8'))
+        values = _xor_rows(values.view('<u4'))
+        flags = FLAG_DELTA
+    return encode_frame(MSG_SAMPLES, COUNT.pack(len(samples)) + timestamps.tobytes() + values.tobytes(), compress, flags)
+
+
+def decode_samples(payload, flags, width):
+    count, = COUNT.unpack_from(payload)
+    if len(payload) != COUNT.size + count * (8 + 4 * width):
+        raise ValueError("sample frame doesn't match the schema")
+    timestamps = np.frombuffer(payload, '<u8', count, COUNT.size)
+    values = np.frombuffer(payload, '<u4', count * width, COUNT.size + 8 * count).reshape(count, width)
+    if flags & FLAG_DELTA:
+        timestamps = np.bitwise_xor.accumulate(timestamps)
+        values = np.bitwise_xor.accumulate(values, axis=0)
+    return timestamps.view('<f8'), values.view('<f4').astype(float)
+
+
+class HubAgent:
+    # Streams the samples of a local SysMonitor to a hub. Samples wait in a
+    # bus subscription while the hub is unreachable (up to `buffer` of them)
+    # and go out in batches of batch_size, or after max_delay seconds.
+    def __init__(self, monitor, address, name=None, batch_size=10, max_delay=2.0, compress=False, buffer=3600):
+        self.monitor = monitor
+        self.address = address
+        self.name = name or socket.gethostname()
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.compress = compress
+        self.subscription = monitor.bus.subscribe('agent', buffer, DROP_OLDEST)
+        self.sent_samples = 0
+        self.sent_bytes = 0
+        self.reconnects = 0
+        self.last_error = None
+        self._pending = [] # Survives reconnects, cleared only once sent
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _frames(self, schema):
+        frames = []
+        batch = []
+        for timestamp, sample in self._pending:
+            if sample.schema is not schema:
+                if batch:
+                    frames.append(encode_samples(batch, self.compress))
+                    batch = []
+                schema = sample.schema
+                frames.append(encode_schema(schema))
+            batch.append((timestamp, sample))
+        if batch:
+            frames.append(encode_samples(batch, self.compress))
+        return frames, schema
+
+    def _session(self, sock):
+        sampler = self.monitor.sampler
+        sock.sendall(encode_json(MSG_HELLO, {'host': self.name, 'interval': self.monitor.run_interval,
+                                             'burst_interval': None if sampler is None else sampler.burst_interval}))
+        schema = None # The hub forgets it with the connection
+        oldest = None
+        while True:
+            stopping = self._stop.is_set()
+            timeout = self.max_delay if oldest is None else max(0.0, oldest + self.max_delay - time.monotonic())
+            if not stopping:
+                self.subscription.wait(timeout)
+            self._pending.extend(self.subscription.drain())
+            if self._pending and oldest is None:
+                oldest = time.monotonic()
+
+            if self._pending and (stopping or len(self._pending) >= self.batch_size
+                                  or time.monotonic() - oldest >= self.max_delay):
+                frames, schema = self._frames(schema)
+                payload = b''.join(frames)
+                sock.sendall(payload)
+                self.sent_samples += len(self._pending)
+                self.sent_bytes += len(payload)
+                self._pending.clear()
+                oldest = None
+            if stopping:
+                return
+
+    def run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                with socket.create_connection(self.address, timeout=10) as sock:
+                    backoff = 1.0
+                    self._session(sock)
+                return
+            except OSError as e:
+                self.last_error = str(e)
+                self.reconnects += 1
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='agent', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        # The last partial batch is flushed if the hub is reachable
+        self._stop.set()
+        self.subscription.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.monitor.bus.unsubscribe(self.subscription)
+
+
+class HostState:
+    def __init__(self, name, retention, detector, interval=1.0, burst_interval=None):
+        self.name = name
+        # Retention counts the agent's base intervals, with room for its bursts
+        self.store = SampleStore(capacity=history_rows(retention, interval, burst_interval))
+        self.detector = detector
+        self.schema = None
+        self.interval = interval
+        self.burst_interval = burst_interval # None when the agent samples at a fixed rate
+        self.connected = False
+        self.last_seen = None
+        self.samples = 0
+        self.batches = 0
+        self.bytes = 0
+        self.cpu_time = 0.0 # Hub CPU spent on this host: decoding, storing, scoring
+        self.anomaly_score = 0.0
+        self.anomaly_contributions = {}
+        self.is_anomaly = False
+
+    def set_schema(self, layout):
+        self.schema = WireSchema(layout)
+
+    def ingest(self, payload, flags):
+        if self.schema is None:
+            raise ValueError(f"{self.name}: samples before a schema")
+        timestamps, values = decode_samples(payload, flags, self.schema.width)
+        schema = self.schema.schema
+        for timestamp, row in zip(timestamps.tolist(), self.schema.rows(values)):
+            self.store.append(timestamp, Sample(schema, row))
+        self.samples += len(timestamps)
+        self.batches += 1
+        self.last_seen = time.time()
+        self.score()
+
+    def score(self):
+        # Once per batch, only the newest sample is scored
+        self.detector.update(self.store)
+        if self.detector.is_trained:
+            self.anomaly_score = self.detector.predict_anomaly_score()
+            self.anomaly_contributions = self.detector.explain()
+            self.is_anomaly = self.anomaly_score < 0
+
+    def summary(self):
+        latest = self.store.latest
+        data = latest['data'] if latest else {}
+        top = sorted(self.anomaly_contributions.items(), key=lambda item: item[1], reverse=True)[:3]
+        return {
+            'host': self.name,
+            'connected': self.connected,
+            'last_seen': None if self.last_seen is None else round(self.last_seen, 3),
+            'samples': self.samples,
+            'bytes': self.bytes,
+            'cpu_ms': round(self.cpu_time * 1000, 3),
+            'cpu_usage_percent': None if 'cpu_usage_percent' not in data else round(data['cpu_usage_percent'], 2),
+            'memory_percent': None if 'memory_percent' not in data else round(data['memory_percent'], 2),
+            'anomaly_trained': self.detector.is_trained,
+            'anomaly_score': round(float(self.anomaly_score), 4),
+            'is_anomaly': bool(self.is_anomaly),
+            'anomaly_features': {name: round(share, 3) for name, share in top},
+        }
+
+
+class Hub:
+    # Reads many agents on one asyncio loop (own thread), one HostState with
+    # its own sample store and anomaly detector per host name. Frames are
+    # decoded, stored and scored in order on a single worker thread, so a
+    # slow detector doesn't stall the reads of the other agents.
+    def __init__(self, host='127.0.0.1', port=9109, retention=3600, detector_mode='isolation_forest',
+                 contamination=0.005, relearning_interval=180, min_samples=60):
+        self.host = host
+        self.port = port
+        self.retention = retention
+        self.detector_options = {
+            'contamination': contamination,
+            'random_state': 42,
+            'min_samples': min_samples,
+            'relearning_interval': relearning_interval,
+        }
+        self.detector_mode = detector_mode
+        self.hosts = {}
+        self.errors = 0
+        self.last_error = None
+        self._server = ServerThread(self._handle, host, port, 'hub')
+        self._worker = None
+
+    def _create_detector(self, interval, burst_interval):
+        return create_detector(self.detector_mode, **self.detector_options, interval=interval,
+                               capacity=history_rows(MAX_TRAIN_SAMPLES, interval, burst_interval))
+
+    def _host(self, hello):
+        name = str(hello['host'])
+        interval = float(hello.get('interval') or 1.0)
+        burst_interval = hello.get('burst_interval')
+        if burst_interval is not None:
+            burst_interval = float(burst_interval)
+        if not (interval > 0 and (burst_interval is None or 0 < burst_interval <= interval)):
+            raise ValueError(f"invalid sampling intervals in hello: {interval}, burst {burst_interval}")
+        state = self.hosts.get(name)
+        if state is None or (state.interval, state.burst_interval) != (interval, burst_interval):
+            # A reconnecting agent continues its own history, unless it now samples at
+            # another rate: the store and the detector's windows count its intervals
+            state = HostState(name, self.retention, self._create_detector(interval, burst_interval),
+                              interval, burst_interval)
+            self.hosts[name] = state
+        state.connected = True
+        return state
+
+    def _frame(self, state, kind, flags, payload):
+        # On the worker thread, returns the connection's host state
+        start = time.thread_time()
+        length = len(payload)
+        if flags & FLAG_ZLIB:
+            payload = inflate(payload)
+        if kind == MSG_HELLO:
+            state = self._host(json.loads(payload))
+        elif state is None:
+            raise ValueError("the first frame must be a hello")
+        elif kind == MSG_SCHEMA:
+            state.set_schema(json.loads(payload))
+        elif kind == MSG_SAMPLES:
+            state.ingest(payload, flags)
+        else:
+            raise ValueError(f"unknown frame type: {kind}")
+        state.bytes += FRAME.size + length
+        state.cpu_time += time.thread_time() - start
+        return state
+
+    async def _handle(self, reader, writer):
+        state = None
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                kind, flags, length = FRAME.unpack(await reader.readexactly(FRAME.size))
+                if length > MAX_PAYLOAD:
+                    raise ValueError(f"frame too large: {length} bytes")
+                payload = await reader.readexactly(length)
+                state = await loop.run_in_executor(self._worker, self._frame, state, kind, flags, payload)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass # Disconnected, or cancelled by stop()
+        except (ValueError, KeyError, TypeError, struct.error, zlib.error) as e:
+            # A broken agent loses its connection, the other hosts are unaffected
+            self.errors += 1
+            self.last_error = str(e)
+        finally:
+            if state is not None:
+                state.connected = False
+            writer.close()
+
+    def start(self):
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='hub-ingest')
+        try:
+            self._server.start()
+        except OSError:
+            self._worker.shutdown()
+            raise
+        self.port = self._server.port
+
+    def stop(self):
+        self._server.stop()
+        if self._worker is not None:
+            self._worker.shutdown()
+            self._worker = None
+
+    def summary(self):
+        return [state.summary() for state in list(self.hosts.values())]
@@ -1,34 +1,201 @@
+import argparse
+import signal
+import sys
 import threading
 import time
-from monitor import SysMonitor
-from gui import SysMonitorGUI
-import tkinter as tk
-import psutil
 
-monitor = SysMonitor(run_interval=1)
-monitor_thread = threading.Thread(target=monitor.run, daemon=True)
+started = time.perf_counter()
 
-def on_closing():
+from anomaly import DETECTOR_MODES
+from engine import MonitorEngine
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="SysMonitor - rendszerfigyelő anomáliadetektálással")
+    parser.add_argument('--headless', action='store_true', help="futtatás grafikus felület nélkül (daemon mód)")
+    parser.add_argument('--interval', type=float, default=1.0, help="mintavételi időköz (mp)")
+    parser.add_argument('--adaptive', action='store_true', help="adaptív mintavétel: anomália, riasztás vagy hirtelen változás esetén sűrűbb mintavétel")
+    parser.add_argument('--burst-interval', type=float, default=0.1, help="mintavételi időköz a sűrített szakaszokban (mp)")
+    parser.add_argument('--burst-hold', type=float, default=10.0, help="a sűrített mintavétel legalább ennyi mp-ig tart az utolsó kiváltó ok után")
+    parser.add_argument('--retention', type=int, default=3600, help="memóriában tartott minták száma, alap időközzel számolva")
+    parser.add_argument('--detector', choices=DETECTOR_MODES, default='isolation_forest', help="anomáliadetektor típusa")
+    parser.add_argument('--storage', default=None, help="könyvtár a tartós, lemezre írt előzményeknek")
+    parser.add_argument('--metrics-port', type=int, default=None, help="Prometheus/OpenMetrics végpont portja (/metrics)")
+    parser.add_argument('--metrics-host', default='127.0.0.1', help="a metrics végpont címe")
+    parser.add_argument('--output', default='-', help="kimeneti fájl (JSON lines) daemon módban, '-' = stdout")
+    parser.add_argument('--report-interval', type=float, default=None, help="kimeneti riportok közötti idő (mp)")
+    parser.add_argument('--agent', metavar='HOST:PORT', default=None, help="agent mód: a minták továbbítása egy hubnak")
+    parser.add_argument('--agent-name', default=None, help="a gép neve a hubon (alapértelmezés: hostname)")
+    parser.add_argument('--compress', action='store_true', help="tömörített továbbítás agent módban")
+    parser.add_argument('--hub-port', type=int, default=None, help="hub mód: agentek fogadása ezen a porton")
+    parser.add_argument('--hub-host', default='127.0.0.1', help="a hub címe")
+    parser.add_argument('--duration', type=float, default=None, help="leállás ennyi mp után")
+    parser.add_argument('--windows', type=int, nargs='+', default=[60, 300, 3600], help="gördülő statisztikák ablakai (mp)")
+    parser.add_argument('--record', metavar='FÁJL', default=None, help="a mintafolyam rögzítése fájlba")
+    parser.add_argument('--replay', metavar='FÁJL', default=None, help="rögzített mintafolyam visszajátszása mintavétel helyett")
+    parser.add_argument('--speed', type=float, default=1.0, help="visszajátszási sebesség (szorzó, 0 = amilyen gyorsan csak lehet)")
+    parser.add_argument('--tune', metavar='FÁJL', default=None, help="detektor paraméterek kiértékelése egy felvételen")
+    parser.add_argument('--contamination', type=float, nargs='+', default=[0.005], help="szennyezettség (arány); --tune esetén több érték is megadható")
+    parser.add_argument('--relearning-interval', type=int, nargs='+', default=[180], help="újratanítási időköz (alap időközű minta); --tune esetén több érték is megadható")
+    parser.add_argument('--min-samples', type=int, nargs='+', default=[60], help="minták száma az első tanításig (alap időközzel számolva); --tune esetén több érték is megadható")
+    parser.add_argument('--workers', type=int, default=None, help="párhuzamos folyamatok száma --tune esetén")
+    parser.add_argument('--rules', metavar='FÁJL', default=None, help="riasztási szabályok (JSON lista), alapértelmezés: beépített szabályok")
+    parser.add_argument('--alert-log', metavar='FÁJL', default=None, help="riasztások naplózása fájlba (JSON lines)")
+    parser.add_argument('--alert-webhook', metavar='URL', default=None, help="riasztások küldése HTTP POST-tal (pl. http://127.0.0.1:9000/alert)")
+    parser.add_argument('--alert-stdout', action='store_true', help="riasztások kiírása a standard kimenetre")
+    parser.add_argument('--alert-rate-limit', type=int, default=60, help="legfeljebb ennyi riasztás percenként")
+    return parser.parse_args(argv)
+
+
+def alert_sinks(args):
+    from alerts import LogFileSink, StdoutSink, WebhookSink
+
+    sinks = []
+    if args.alert_stdout:
+        sinks.append(StdoutSink())
+    if args.alert_log is not None:
+        sinks.append(LogFileSink(args.alert_log))
+    if args.alert_webhook is not None:
+        sinks.append(WebhookSink(args.alert_webhook))
+    return sinks
+
+
+def run_headless(engine, args):
+    from daemon import HeadlessDaemon
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'a', encoding='utf-8')
+    try:
+        HeadlessDaemon(engine, output, args.report_interval).run(duration=args.duration, started=started)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def parse_address(value):
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def signal_event():
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: stop.set())
+    return stop
+
+
+def run_agent(args):
+    from hub import HubAgent
+    from monitor import SysMonitor
+
+    monitor = SysMonitor(run_interval=args.interval, retention=args.retention)
+    if args.adaptive:
+        # No detector or rules on an agent, only sharp changes start a burst
+        from sampling import AdaptiveSampler
+        monitor.sampler = AdaptiveSampler(args.interval, args.burst_interval, hold=args.burst_hold)
+        monitor.sinks.append(monitor.sampler.observe)
+    agent = HubAgent(monitor, parse_address(args.agent), name=args.agent_name, compress=args.compress)
+    agent.start()
+    collector = threading.Thread(target=monitor.run, name='collector', daemon=True)
+    collector.start()
+    print(f"sysmonitor: agent {agent.name} -> {args.agent}", file=sys.stderr, flush=True)
+
+    signal_event().wait(args.duration)
     monitor.stop()
-    monitor_thread.join()
-    root.destroy() 
+    collector.join()
+    agent.stop()
 
 
-if __name__ == "__main__":
+def run_hub(args):
+    import json
+    from hub import Hub
+
+    hub = Hub(args.hub_host, args.hub_port, retention=args.retention, detector_mode=args.detector)
+    hub.start()
+    print(f"sysmonitor: hub listening on {hub.host}:{hub.port}", file=sys.stderr, flush=True)
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'a', encoding='utf-8')
+    stop = signal_event()
+    deadline = None if args.duration is None else time.monotonic() + args.duration
     try:
-        root = tk.Tk()
-        root.protocol("WM_DELETE_WINDOW", on_closing)
-    
+        while not stop.wait(args.report_interval or 5.0):
+            for host in hub.summary():
+                output.write(json.dumps(host) + '\n')
+            output.flush()
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+    finally:
+        hub.stop()
+        if output is not sys.stdout:
+            output.close()
 
-        app = SysMonitorGUI(root, monitor)
 
-        monitor_thread.start()
+def run_tune(args):
+    import json
+    from replay import tune
 
-        root.mainloop()
+    start = time.perf_counter()
+    report = tune(args.tune, args.detector, args.contamination, args.relearning_interval, args.min_samples, args.workers)
+    output = sys.stdout if args.output == '-' else open(args.output, 'a', encoding='utf-8')
+    try:
+        for config in report['configs']:
+            output.write(json.dumps(config) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"sysmonitor: {report['samples']} samples ({report['duration_s']:.0f} s of recording), "
+          f"{len(report['configs'])} configurations in {time.perf_counter() - start:.1f} s", file=sys.stderr, flush=True)
+
+
+def run_gui(engine):
+    # Tkinter and matplotlib are only loaded for the GUI
+    import tkinter as tk
+    from gui import SysMonitorGUI
+
+    root = tk.Tk()
+
+    app = SysMonitorGUI(root, engine)
+
+    def on_closing():
+        app.close()
+        engine.stop()
+        root.destroy()
 
-        while monitor_thread.is_alive():
-            time.sleep(0.1)
+    root.protocol("WM_DELETE_WINDOW", on_closing)
+    engine.start()
 
+    try:
+        root.mainloop()
     except KeyboardInterrupt:
-        monitor.stop()
-        monitor_thread.join()
\ No newline at end of file
+        pass
+    finally:
+        engine.stop()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.agent is not None:
+        return run_agent(args)
+    if args.hub_port is not None:
+        return run_hub(args)
+    if args.tune is not None:
+        return run_tune(args)
+
+    from alerts import load_rules
+
+    engine = MonitorEngine(run_interval=args.interval, retention=args.retention, detector_mode=args.detector,
+                           contamination=args.contamination[0], relearning_interval=args.relearning_interval[0],
+                           min_samples=args.min_samples[0], storage_dir=args.storage,
+                           metrics_address=None if args.metrics_port is None else (args.metrics_host, args.metrics_port),
+                           record_path=args.record, replay_path=args.replay, replay_speed=args.speed,
+                           rolling_windows=args.windows,
+                           alert_rules=None if args.rules is None else load_rules(args.rules),
+                           alert_sinks=alert_sinks(args), alert_rate_limit=args.alert_rate_limit,
+                           adaptive=args.adaptive, burst_interval=args.burst_interval, burst_hold=args.burst_hold)
+    if args.headless:
+        run_headless(engine, args)
+    else:
+        run_gui(engine)
+
+
+if __name__ == "__main__":
+    main()
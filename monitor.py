@@ -1,76 +1,199 @@
-import psutil
+import threading
 import time
+from collections import deque
+from diagnostics import SelfMetrics
+from probes import ProbeEngine, default_probes
+from sample import Sample
+from store import SampleStore
+
+REQUIRED_METRICS = (
+    'cpu_usage_percent',
+    'cpu_usage_per_core_percent',
+    'memory_percent',
+    'disk_percent',
+)
+
+DROP_OLDEST = 'drop_oldest'
+COALESCE_LATEST = 'coalesce_latest'
+OVERFLOW_POLICIES = (DROP_OLDEST, COALESCE_LATEST)
+
+
+class Subscription:
+    # Bounded per-consumer queue. The publisher never waits for a consumer:
+    # deque append/popleft are atomic, a full deque drops its oldest entry by
+    # itself, and every counter has a single writer (publisher or consumer).
+    # coalesce_latest is a one-slot queue, the consumer only sees the newest sample.
+    def __init__(self, bus, name, maxlen=64, policy=DROP_OLDEST):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy: {policy}")
+        self.bus = bus
+        self.name = name
+        self.policy = policy
+        self.maxlen = 1 if policy == COALESCE_LATEST else max(1, maxlen)
+        self._queue = deque(maxlen=self.maxlen) # (seq, published at, timestamp, data)
+        self._wakeup = threading.Event()
+        self.delivered = 0 # Written by the publisher
+        self.max_depth = 0
+        self.consumed = 0 # Written by the consumer
+        self.last_seq = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+    def _put(self, item):
+        self._queue.append(item)
+        self.delivered += 1
+        depth = len(self._queue)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        self._wakeup.set()
+
+    def wait(self, timeout=None):
+        # Blocks until something was published since the previous wait (or wake())
+        if self._wakeup.wait(timeout):
+            self._wakeup.clear()
+            return True
+        return False
+
+    def wake(self):
+        self._wakeup.set()
+
+    def get_nowait(self):
+        try:
+            seq, published, timestamp, data = self._queue.popleft()
+        except IndexError:
+            return None
+        self.consumed += 1
+        self.last_seq = seq
+        self.last_latency = time.monotonic() - published
+        self.max_latency = max(self.max_latency, self.last_latency)
+        return timestamp, data
+
+    def drain(self):
+        items = []
+        while True:
+            item = self.get_nowait()
+            if item is None:
+                return items
+            items.append(item)
+
+    def stats(self):
+        depth = len(self._queue)
+        return {
+            'policy': self.policy,
+            'depth': depth,
+            'maxlen': self.maxlen,
+            'max_depth': self.max_depth,
+            'pressure': round(depth / self.maxlen, 3), # 1.0 = the next sample overwrites one
+            'delivered': self.delivered,
+            'consumed': self.consumed,
+            'dropped': max(self.delivered - self.consumed - depth, 0),
+            'lag': self.bus.seq - self.last_seq, # Published samples this consumer hasn't taken (yet)
+            'last_latency_ms': round(self.last_latency * 1000, 3),
+            'max_latency_ms': round(self.max_latency * 1000, 3),
+        }
+
+
+class SampleBus:
+    # Fan-out of every stored sample to consumers on other threads (GUI, daemon output)
+    def __init__(self):
+        self.seq = 0
+        self._subscriptions = () # Replaced on (un)subscribe, never mutated, so publish needs no lock
+        self._lock = threading.Lock()
+
+    def subscribe(self, name, maxlen=64, policy=DROP_OLDEST):
+        subscription = Subscription(self, name, maxlen, policy)
+        with self._lock:
+            self._subscriptions = self._subscriptions + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+
+    def publish(self, timestamp, data):
+        self.seq += 1
+        item = (self.seq, time.monotonic(), timestamp, data)
+        for subscription in self._subscriptions:
+            subscription._put(item)
+
+    def stats(self):
+        return {subscription.name: subscription.stats() for subscription in self._subscriptions}
+
 
 class SysMonitor:
-    def __init__(self, run_interval=1):
-        self.data = []
+    def __init__(self, run_interval=1, retention=3600, probes=None):
+        self.store = SampleStore(capacity=retention)
+        self.engine = ProbeEngine(probes if probes is not None else default_probes())
+        self.sinks = [] # Called as sink(timestamp, data) for every stored sample, in the collector thread
+        self.bus = SampleBus() # Everything that consumes samples on another thread
+        self.diagnostics = SelfMetrics(run_interval)
+        self.last_error = None
         self.running = True
         self.run_interval = run_interval
+        self.sampler = None # AdaptiveSampler; None samples every run_interval
 
     def collect_data(self):
         try:
-            cpu_usage = psutil.cpu_percent()
-            cpu_usage_cores = psutil.cpu_percent(percpu=True)
-            cpu_freq = psutil.cpu_freq()
-            memory_info = psutil.virtual_memory()
-            disk_info = psutil.disk_usage('/')
-            disk_usages = []
-
-            for disk in psutil.disk_partitions():
-                if disk.fstype:
-                    disk_usages.append({
-                        'mountpoint': disk.mountpoint,
-                        'fstype': disk.fstype,
-                        'usage': psutil.disk_usage(disk.mountpoint)._asdict()
-                    })
-
-            net_now = psutil.net_io_counters(pernic=True)
-            time.sleep(1)
-            net_later = psutil.net_io_counters(pernic=True)
-
-            net_stats = []
-            for adapter in net_now.keys():
-                tx_bytes_diff = (net_later[adapter].bytes_sent - net_now[adapter].bytes_sent) / (1024 * 1024)
-                rx_bytes_diff = (net_later[adapter].bytes_recv - net_now[adapter].bytes_recv) / (1024 * 1024)
-
-                errin_diff = net_later[adapter].errin - net_now[adapter].errin
-                errout_diff = net_later[adapter].errout - net_now[adapter].errout
-
-                dropin_diff = net_later[adapter].dropin - net_now[adapter].dropin
-                dropout_diff = net_later[adapter].dropout - net_now[adapter].dropout
-                
-
-
-                net_stats.append({
-                    'interface': adapter,
-                    'upload_mbps': round(tx_bytes_diff * 8, 4),
-                    'download_mbps': round(rx_bytes_diff * 8, 4),
-                    'errors_in': errin_diff,
-                    'errors_out': errout_diff,
-                    'dropped_in': dropin_diff,
-                    'dropped_out': dropout_diff,
-                })
-
-            return {
-                'cpu_usage_percent': round(cpu_usage, 2),
-                'cpu_usage_per_core_percent': [round(core, 2) for core in cpu_usage_cores],
-                'cpu_freq_current_mhz': round(cpu_freq.current),
-                'memory_total_gb': round(memory_info.total / (1024 ** 3), 4),
-                'memory_used_gb': round(memory_info.used / (1024 ** 3), 4),
-                'memory_percent': round(memory_info.percent, 2),
-                'disk_total_gb': round(disk_info.total / (1024 ** 3), 4),
-                'disk_used_gb': round(disk_info.used / (1024 ** 3), 4),
-                'disk_percent': round(disk_info.percent, 2),
-                'disk_usages': disk_usages,
-                'network_stats': net_stats
-            }
+            data = self.engine.collect()
+            missing = [name for name in REQUIRED_METRICS if name not in data]
+            if missing:
+                return {'error': f"missing metrics: {', '.join(missing)}"}
+            return Sample.from_data(data)
         except Exception as e:
             return {'error': str(e)}
 
+    def probe_stats(self):
+        return self.engine.stats_snapshot()
+
+    def self_metrics(self, probes=True):
+        return self.diagnostics.snapshot(self.engine.stats if probes else None, self.bus)
+
+    def deliver(self, timestamp, data):
+        self.store.append(timestamp, data)
+        for sink in self.sinks:
+            try:
+                sink(timestamp, data)
+            except Exception as e:
+                # A failing sink (full disk under storage or the recorder) must not stop the collector
+                self.diagnostics.sink_errors += 1
+                self.last_error = f"{getattr(sink, '__qualname__', type(sink).__qualname__)}: {e}"
+        self.bus.publish(timestamp, data)
+
     def run(self):
+        # Deadlines advance by the interval, so collection time doesn't accumulate as drift.
+        # The interval is fixed, or chosen per sample by the adaptive sampler.
+        diagnostics = self.diagnostics
+        next_tick = time.monotonic()
         while self.running:
-            self.data.append({'timestamp': round(time.time()), 'data': self.collect_data()})
-            time.sleep(self.run_interval - 1) # Adjusted for the 1 second sleep in collect_data
+            start = time.monotonic()
+            diagnostics.tick(start - next_tick)
+            timestamp = time.time()
+            data = self.collect_data()
+            collected = time.monotonic()
+            diagnostics.record('collect', collected - start)
+            if 'error' in data:
+                self.last_error = data['error']
+                diagnostics.failed += 1
+            else:
+                self.deliver(timestamp, data)
+                diagnostics.record('deliver', time.monotonic() - collected)
+
+            interval = self.run_interval if self.sampler is None else self.sampler.next_interval(timestamp)
+            diagnostics.run_interval = interval
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif interval > 0:
+                # Overran the interval, skip the missed ticks instead of bursting.
+                # The next tick starts now, late against the last missed deadline.
+                skipped = int(-delay // interval)
+                diagnostics.skipped += skipped
+                next_tick += skipped * interval
+            else:
+                next_tick = time.monotonic()
+
+        self.engine.shutdown()
 
     def stop(self):
-        self.running = False
\ No newline at end of file
+        self.running = False
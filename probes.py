@@ -0,0 +1,433 @@
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from operator import itemgetter
+import psutil
+from diagnostics import Histogram
+
+
+def counter_delta(current, previous):
+    # Counters only grow, one that went backwards was reset (driver reload,
+    # device re-plugged): like Prometheus' rate(), the current value is then
+    # the increase since the reset. 32-bit wraps are undone by psutil (nowrap).
+    return current - previous if current >= previous else current
+
+
+def whole_disks(names, ignored=('loop', 'ram')):
+    # Per-disk counters list partitions too (sda1, nvme0n1p1), they would count twice
+    names = set(names)
+    disks = []
+    for name in names:
+        if name.startswith(ignored):
+            continue
+        stripped = name.rstrip('0123456789')
+        if stripped != name and (stripped in names or (stripped.endswith('p') and stripped[:-1] in names)):
+            continue
+        disks.append(name)
+    return tuple(sorted(disks))
+
+
+class ProbeStats:
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+        self.timeouts = 0
+        self.errors = 0
+        self.last_error = None
+        self.histogram = Histogram()
+
+    def record(self, duration):
+        self.histogram.record(duration)
+        self.count += 1
+        self.total_time += duration
+        self.last_time = duration
+        self.max_time = max(self.max_time, duration)
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.count if self.count else 0.0
+
+    def as_dict(self):
+        p50, p99 = self.histogram.percentiles((0.5, 0.99))
+        return {
+            'count': self.count,
+            'mean_ms': round(self.mean_time * 1000, 3),
+            'p50_ms': round(p50 * 1000, 3),
+            'p99_ms': round(p99 * 1000, 3),
+            'last_ms': round(self.last_time * 1000, 3),
+            'max_ms': round(self.max_time * 1000, 3),
+            'total_s': round(self.total_time, 3),
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+        }
+
+
+class Probe:
+    # interval: seconds between runs (0 = every tick), timeout: how long a tick waits for it
+    name = None
+
+    def __init__(self, interval=0, timeout=0.25):
+        self.interval = interval
+        self.timeout = timeout
+
+    def collect(self):
+        raise NotImplementedError
+
+
+class CpuProbe(Probe):
+    name = 'cpu'
+
+    def __init__(self, interval=0, timeout=0.25):
+        super().__init__(interval, timeout)
+        # Non-blocking cpu_percent measures since the previous call, prime it
+        psutil.cpu_percent()
+        psutil.cpu_percent(percpu=True)
+
+    def collect(self):
+        return {
+            'cpu_usage_percent': psutil.cpu_percent(),
+            'cpu_usage_per_core_percent': psutil.cpu_percent(percpu=True),
+        }
+
+
+class CpuFreqProbe(Probe):
+    name = 'cpu_freq'
+
+    def collect(self):
+        cpu_freq = psutil.cpu_freq()
+        return {'cpu_freq_current_mhz': round(cpu_freq.current) if cpu_freq else 0}
+
+
+class MemoryProbe(Probe):
+    name = 'memory'
+
+    def collect(self):
+        memory_info = psutil.virtual_memory()
+        return {
+            'memory_total_gb': memory_info.total / (1024 ** 3),
+            'memory_used_gb': memory_info.used / (1024 ** 3),
+            'memory_percent': memory_info.percent,
+        }
+
+
+class DiskProbe(Probe):
+    name = 'disk'
+
+    def __init__(self, path='/', interval=5, timeout=0.25):
+        super().__init__(interval, timeout)
+        self.path = path
+
+    def collect(self):
+        disk_info = psutil.disk_usage(self.path)
+        return {
+            'disk_total_gb': disk_info.total / (1024 ** 3),
+            'disk_used_gb': disk_info.used / (1024 ** 3),
+            'disk_percent': disk_info.percent,
+        }
+
+
+class PartitionProbe(Probe):
+    # Partition enumeration and per-mount statvfs are the slow part (NFS, hung USB)
+    name = 'partitions'
+
+    def __init__(self, interval=30, timeout=0.5):
+        super().__init__(interval, timeout)
+
+    def collect(self):
+        # (mountpoint, fstype) pairs and one MOUNT_FIELDS row per mount, see sample.Sample
+        mounts = []
+        values = []
+        for disk in psutil.disk_partitions():
+            if disk.fstype:
+                usage = psutil.disk_usage(disk.mountpoint)
+                mounts.append((disk.mountpoint, disk.fstype))
+                values += (usage.total, usage.used, usage.free, usage.percent)
+        return {'mounts': (tuple(mounts), values)}
+
+
+class DiskIOProbe(Probe):
+    name = 'disk_io'
+
+    def __init__(self, interval=0, timeout=0.25):
+        super().__init__(interval, timeout)
+        self._prev_time = time.monotonic()
+        self._prev = psutil.disk_io_counters(perdisk=True) or {}
+        self._names = None
+        self._disks = ()
+
+    def collect(self):
+        now = time.monotonic()
+        counters = psutil.disk_io_counters(perdisk=True) or {}
+        elapsed = max(now - self._prev_time, 1e-6)
+
+        names = tuple(counters)
+        if names != self._names:
+            # Hot-plugged or removed devices, the partition filter only reruns then
+            self._names = names
+            self._disks = whole_disks(names)
+
+        # Cumulative counters become per-second rates here, one DISK_FIELDS row per disk
+        values = []
+        read_total = write_total = 0
+        scale = 1 / (1024 * 1024) / elapsed
+        for disk in self._disks:
+            current = counters[disk]
+            prev = self._prev.get(disk)
+            if prev is None:
+                # Hot-plugged disk, no baseline yet
+                prev = current
+            reads = counter_delta(current.read_count, prev.read_count)
+            writes = counter_delta(current.write_count, prev.write_count)
+            read_bytes = counter_delta(current.read_bytes, prev.read_bytes)
+            write_bytes = counter_delta(current.write_bytes, prev.write_bytes)
+            # Milliseconds spent on the completed requests, per request: the mean latency
+            read_time = counter_delta(getattr(current, 'read_time', 0), getattr(prev, 'read_time', 0))
+            write_time = counter_delta(getattr(current, 'write_time', 0), getattr(prev, 'write_time', 0))
+            values += (
+                read_bytes * scale,
+                write_bytes * scale,
+                reads / elapsed,
+                writes / elapsed,
+                read_time / reads if reads else 0.0,
+                write_time / writes if writes else 0.0,
+            )
+            read_total += read_bytes
+            write_total += write_bytes
+
+        self._prev_time = now
+        self._prev = counters
+        return {
+            'disk_read_mbps': read_total * scale,
+            'disk_write_mbps': write_total * scale,
+            'disks': (self._disks, values),
+        }
+
+
+class NetworkProbe(Probe):
+    name = 'network'
+
+    def __init__(self, interval=0, timeout=0.25):
+        super().__init__(interval, timeout)
+        self._prev_time = time.monotonic()
+        self._prev = psutil.net_io_counters(pernic=True)
+
+    def collect(self):
+        now = time.monotonic()
+        net_now = psutil.net_io_counters(pernic=True)
+        elapsed = max(now - self._prev_time, 1e-6)
+
+        # Cumulative counters become per-interval deltas here, one NIC_FIELDS row per interface
+        values = []
+        scale = 8 / (1024 * 1024) / elapsed
+        for adapter, counters in net_now.items():
+            prev = self._prev.get(adapter)
+            if prev is None:
+                # Hot-plugged adapter, no baseline yet
+                prev = counters
+
+            values += (
+                counter_delta(counters.bytes_sent, prev.bytes_sent) * scale,
+                counter_delta(counters.bytes_recv, prev.bytes_recv) * scale,
+                counter_delta(counters.errin, prev.errin),
+                counter_delta(counters.errout, prev.errout),
+                counter_delta(counters.dropin, prev.dropin),
+                counter_delta(counters.dropout, prev.dropout),
+                counter_delta(counters.packets_recv, prev.packets_recv) / elapsed,
+                counter_delta(counters.packets_sent, prev.packets_sent) / elapsed,
+            )
+
+        self._prev_time = now
+        self._prev = net_now
+        return {'network': (tuple(net_now), values)}
+
+
+class LoadAverageProbe(Probe):
+    name = 'load_average'
+
+    def collect(self):
+        load_1, load_5, load_15 = psutil.getloadavg()
+        return {
+            'load_avg_1': load_1,
+            'load_avg_5': load_5,
+            'load_avg_15': load_15,
+        }
+
+
+class SensorsProbe(Probe):
+    name = 'sensors'
+
+    def __init__(self, interval=10, timeout=0.5):
+        super().__init__(interval, timeout)
+
+    def collect(self):
+        if not hasattr(psutil, 'sensors_temperatures'):
+            return {}
+
+        temperatures = []
+        for sensor, entries in psutil.sensors_temperatures().items():
+            for entry in entries:
+                temperatures.append({
+                    'sensor': sensor,
+                    'label': entry.label or sensor,
+                    'current': entry.current,
+                })
+        return {'temperatures': temperatures}
+
+
+class ProcessProbe(Probe):
+    # psutil.Process handles are kept across ticks: cpu_percent(None) measures
+    # since the previous call on the same handle, so no per-tick sleep is
+    # needed, and only spawned/exited PIDs touch the cache.
+    name = 'processes'
+    TOP_KEYS = ('cpu_percent', 'rss_mb', 'io_mbps')
+
+    def __init__(self, top_n=10, interval=2, timeout=1.0, pids=None, process_factory=None):
+        super().__init__(interval, timeout)
+        self.top_n = top_n
+        self._pids = pids or psutil.pids
+        self._process_factory = process_factory or psutil.Process
+        self._processes = {} # pid -> [process, name, previous io bytes]
+        self._prev_time = time.monotonic()
+
+    def _track(self, pid):
+        try:
+            process = self._process_factory(pid)
+            process.cpu_percent(None)
+            self._processes[pid] = [process, process.name(), None]
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+
+    def collect(self):
+        now = time.monotonic()
+        elapsed = max(now - self._prev_time, 1e-6)
+        self._prev_time = now
+
+        current = set(self._pids())
+        for pid in self._processes.keys() - current:
+            del self._processes[pid]
+        spawned = current - self._processes.keys()
+        for pid in spawned:
+            self._track(pid)
+
+        rows = []
+        for pid, entry in list(self._processes.items()):
+            process = entry[0]
+            try:
+                with process.oneshot():
+                    # A handle primed this tick has no meaningful cpu interval yet
+                    cpu = 0.0 if pid in spawned else process.cpu_percent(None)
+                    rss = process.memory_info().rss
+                    try:
+                        io = process.io_counters()
+                        io_bytes = io.read_bytes + io.write_bytes
+                    except (psutil.AccessDenied, AttributeError):
+                        io_bytes = None
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                # Exited (or the PID got reused) since the last enumeration
+                del self._processes[pid]
+                continue
+            except psutil.AccessDenied:
+                continue
+
+            io_rate = 0.0
+            if io_bytes is not None and entry[2] is not None:
+                io_rate = max(io_bytes - entry[2], 0) / (1024 * 1024) / elapsed
+            entry[2] = io_bytes
+            rows.append((pid, entry[1], cpu, rss / (1024 * 1024), io_rate))
+
+        top = {}
+        for column, key in enumerate(self.TOP_KEYS, start=2):
+            top[key] = [{
+                'pid': pid,
+                'name': name,
+                'cpu_percent': round(cpu, 1),
+                'rss_mb': round(rss_mb, 1),
+                'io_mbps': round(io_mbps, 3),
+            } for pid, name, cpu, rss_mb, io_mbps in heapq.nlargest(self.top_n, rows, key=itemgetter(column))]
+        return {'process_count': len(current), 'top_processes': top}
+
+
+def default_probes():
+    return [
+        CpuProbe(),
+        CpuFreqProbe(interval=5),
+        MemoryProbe(),
+        DiskProbe(),
+        PartitionProbe(),
+        DiskIOProbe(),
+        NetworkProbe(),
+        LoadAverageProbe(),
+        SensorsProbe(),
+        ProcessProbe(),
+    ]
+
+
+class ProbeEngine:
+    def __init__(self, probes, max_workers=None):
+        self.probes = {}
+        self.stats = {}
+        self._results = {}
+        self._last_run = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        for probe in probes:
+            self.register(probe)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or max(4, len(self.probes)),
+                                            thread_name_prefix='probe')
+
+    def register(self, probe):
+        self.probes[probe.name] = probe
+        self.stats[probe.name] = ProbeStats()
+
+    def _run_probe(self, probe):
+        stats = self.stats[probe.name]
+        start = time.perf_counter()
+        try:
+            result = probe.collect()
+        except Exception as e:
+            stats.errors += 1
+            stats.last_error = str(e)
+            return
+        finally:
+            stats.record(time.perf_counter() - start)
+
+        # Results of a probe that finishes after its timeout still land in the cache
+        with self._lock:
+            self._results[probe.name] = result
+
+    def collect(self):
+        now = time.monotonic()
+        waiting = []
+        for name, probe in self.probes.items():
+            pending = self._pending.get(name)
+            if pending is not None and not pending.done():
+                # Still stuck from an earlier tick, keep serving its cached value
+                continue
+            if now - self._last_run.get(name, float('-inf')) < probe.interval:
+                continue
+
+            self._last_run[name] = now
+            future = self._executor.submit(self._run_probe, probe)
+            self._pending[name] = future
+            waiting.append((now + probe.timeout, name, future))
+
+        for deadline, name, future in waiting:
+            try:
+                future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except TimeoutError:
+                self.stats[name].timeouts += 1
+
+        data = {}
+        with self._lock:
+            for result in self._results.values():
+                data.update(result)
+        return data
+
+    def stats_snapshot(self):
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,272 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from features import FeatureExtractor
+from hub import FLAG_ZLIB, FRAME, MSG_HELLO, MSG_SAMPLES, MSG_SCHEMA, WireSchema, decode_samples, encode_json, encode_samples, encode_schema, inflate
+from monitor import SysMonitor
+from sample import Sample
+from store import SampleStore
+
+# A recording is the hub wire format written to a file: a HELLO frame with the
+# sampling interval, then SCHEMA and SAMPLES frames, so the same codec reads both.
+
+
+class Recorder:
+    # Monitor sink, appends every sample to a recording file in batches
+    def __init__(self, path, interval=1.0, batch_size=60, compress=True):
+        self.path = path
+        self.batch_size = batch_size
+        self.compress = compress
+        self.samples = 0
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(encode_json(MSG_HELLO, {'host': 'recording', 'interval': interval}))
+        self._schema = None # Every file starts its own schema sequence
+        self._batch = []
+
+    def __call__(self, timestamp, data):
+        sample = data if isinstance(data, Sample) else Sample.from_data(data)
+        if self._batch and sample.schema is not self._batch[-1][1].schema:
+            self.flush()
+        self._batch.append((timestamp, sample))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        schema = self._batch[0][1].schema
+        if schema is not self._schema:
+            self._file.write(encode_schema(schema))
+            self._schema = schema
+        self._file.write(encode_samples(self._batch, self.compress))
+        self._file.flush()
+        self.samples += len(self._batch)
+        self._batch = []
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def read_frames(path):
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(FRAME.size)
+            if len(header) < FRAME.size:
+                return # A partly written last frame is dropped too
+            kind, flags, length = FRAME.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            if flags & FLAG_ZLIB:
+                payload = inflate(payload)
+            yield kind, flags, payload
+
+
+def read_interval(path):
+    for kind, flags, payload in read_frames(path):
+        if kind == MSG_HELLO:
+            return json.loads(payload).get('interval') or 1.0
+        break
+    raise ValueError(f"{path}: not a recording")
+
+
+def read_blocks(path):
+    # (schema, timestamps, values) per SAMPLES frame
+    schema = None
+    for kind, flags, payload in read_frames(path):
+        if kind == MSG_SCHEMA:
+            schema = WireSchema(json.loads(payload))
+        elif kind == MSG_SAMPLES:
+            if schema is None:
+                raise ValueError(f"{path}: samples before a schema")
+            timestamps, values = decode_samples(payload, flags, schema.width)
+            yield schema.schema, timestamps, schema.rows(values)
+
+
+def read_samples(path):
+    for schema, timestamps, values in read_blocks(path):
+        for timestamp, row in zip(timestamps.tolist(), values):
+            yield timestamp, Sample(schema, row)
+
+
+class ReplayMonitor(SysMonitor):
+    # Feeds a recording to the store, sinks and bus instead of collecting,
+    # speed times faster than it was recorded (0: as fast as possible)
+    def __init__(self, path, speed=1.0, retention=3600):
+        super().__init__(run_interval=read_interval(path), retention=retention, probes=[])
+        self.path = path
+        self.speed = speed
+
+    def run(self):
+        started = time.monotonic()
+        first = None
+        for timestamp, sample in read_samples(self.path):
+            if not self.running:
+                break
+            if first is None:
+                first = timestamp
+            if self.speed > 0:
+                delay = started + (timestamp - first) / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            self.deliver(timestamp, sample)
+        # End of the recording: consumers see that the collector is done
+        self.running = False
+        self.engine.shutdown()
+
+
+def load_features(path, max_interfaces=8):
+    # The whole recording as one feature matrix, computed exactly as the live detectors do
+    blocks = list(read_blocks(path))
+    count = sum(len(timestamps) for _, timestamps, _ in blocks)
+    if not count:
+        raise ValueError(f"{path}: empty recording")
+    store = SampleStore(capacity=count, max_interfaces=max_interfaces)
+    for schema, timestamps, values in blocks:
+        for timestamp, row in zip(timestamps.tolist(), values):
+            store.append(timestamp, Sample(schema, row))
+    features = FeatureExtractor(capacity=count, interval=read_interval(path))
+    features.update(store)
+    return store.timestamps().copy(), features.matrix().copy(), features.weights().copy()
+
+
+# Tuning. Scores are the ones the live detectors compute when the recording is
+# replayed into them sample by sample, except that an IsolationForest refit
+# takes effect on the sample that triggered it instead of a tick or two later
+# (the live fit runs in the background).
+
+_features = None # Set once per worker process
+_weights = None
+
+
+def _init_worker(features, weights):
+    global _features, _weights
+    _features = features
+    _weights = weights
+
+
+def _retrain_points(weights, min_samples, relearning_interval):
+    # Sample counts at which the live detector (re)trains: once min_samples,
+    # then every relearning_interval base intervals are covered
+    covered = np.cumsum(weights)
+    points = []
+    target = min_samples
+    while True:
+        index = int(np.searchsorted(covered, target - 1e-6))
+        if index == len(covered):
+            return points
+        points.append(index + 1)
+        target = covered[index] + relearning_interval
+
+
+def _forest_task(points, ends, max_train_samples, random_state):
+    # One fit per retrain point, scoring the samples until the next one. The
+    # trees don't depend on contamination, it only sets the decision offset,
+    # so every contamination of the grid reuses these fits.
+    from anomaly import training_rows
+    from sklearn.ensemble import IsolationForest
+
+    start = time.process_time()
+    features = _features
+    results = []
+    for point, end in zip(points, ends):
+        train = features[training_rows(_weights[:point], max_train_samples)]
+        model = IsolationForest(random_state=random_state, contamination='auto').fit(train)
+        results.append((point, model.score_samples(train), model.score_samples(features[point - 1:end - 1])))
+    return results, time.process_time() - start
+
+
+def _streaming_task(min_samples):
+    from anomaly import StreamingAnomalyDetector
+
+    start = time.process_time()
+    detector = StreamingAnomalyDetector(min_samples=min_samples)
+    scores = np.full(len(_features), np.nan)
+    for i, (row, weight) in enumerate(zip(_features, _weights.tolist())):
+        detector.observe(row, weight)
+        if detector.is_trained:
+            scores[i] = detector.predict_anomaly_score(row)
+    return scores, time.process_time() - start
+
+
+def _summary(decision, cpu_time, **config):
+    # decision is NaN while the detector is untrained, like the live score of 0
+    anomalous = np.nan_to_num(decision, nan=0.0) < 0
+    events = int(np.count_nonzero(anomalous[1:] & ~anomalous[:-1]) + anomalous[:1].sum())
+    trained = np.flatnonzero(~np.isnan(decision))
+    return dict(config,
+                samples=len(decision),
+                trained_at=int(trained[0]) + 1 if len(trained) else None,
+                detections=int(anomalous.sum()),
+                detection_rate_percent=round(float(anomalous.mean()) * 100, 3),
+                events=events,
+                cpu_s=round(cpu_time, 3),
+                samples_per_s=round(len(decision) / cpu_time, 1) if cpu_time > 0 else None)
+
+
+def tune(path, detector_mode='isolation_forest', contaminations=(0.005,), relearning_intervals=(180,),
+         min_samples_grid=(60,), workers=None, max_train_samples=3600, random_state=42):
+    timestamps, features, weights = load_features(path)
+    count = len(features)
+    workers = workers or os.cpu_count() or 1
+
+    results = []
+    if workers == 1:
+        _init_worker(features, weights)
+        submit = lambda fn, *args: _Done(fn(*args))
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(features, weights))
+        submit = pool.submit
+    try:
+        if detector_mode == 'streaming':
+            # Contamination and retraining don't apply, every sample updates the model
+            futures = {min_samples: submit(_streaming_task, min_samples) for min_samples in min_samples_grid}
+            for min_samples, future in futures.items():
+                scores, cpu_time = future.result()
+                results.append(_summary(scores, cpu_time, detector='streaming', min_samples=min_samples))
+        elif detector_mode == 'isolation_forest':
+            groups = {}
+            for relearning_interval in relearning_intervals:
+                for min_samples in min_samples_grid:
+                    points = _retrain_points(weights, min_samples, relearning_interval)
+                    ends = points[1:] + [count + 1]
+                    # Enough chunks to keep every worker busy, fits dominate the cost
+                    size = max(1, -(-len(points) // (workers * 4)))
+                    groups[relearning_interval, min_samples] = [
+                        submit(_forest_task, points[i:i + size], ends[i:i + size], max_train_samples, random_state)
+                        for i in range(0, len(points), size)]
+            for (relearning_interval, min_samples), futures in groups.items():
+                fits = []
+                cpu_time = 0.0
+                for future in futures:
+                    chunk, task_time = future.result()
+                    fits += chunk
+                    cpu_time += task_time
+                for contamination in contaminations:
+                    decision = np.full(count, np.nan)
+                    for point, train_scores, scores in fits:
+                        # IsolationForest's own offset for this contamination
+                        decision[point - 1:point - 1 + len(scores)] = scores - np.percentile(train_scores, 100.0 * contamination)
+                    results.append(_summary(decision, cpu_time, detector='isolation_forest', contamination=contamination,
+                                            relearning_interval=relearning_interval, min_samples=min_samples,
+                                            fits=len(fits)))
+        else:
+            raise ValueError(f"unknown detector mode: {detector_mode}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return {'samples': count, 'duration_s': round(float(timestamps[-1] - timestamps[0]), 1), 'configs': results}
+
+
+class _Done:
+    # Result holder for running the tasks in-process
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
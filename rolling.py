@@ -0,0 +1,203 @@
+import math
+import threading
+from collections import deque
+import numpy as np
+from sample import NIC_FIELDS, Sample
+
+METRICS = ('cpu', 'memory', 'network')
+WINDOWS = (60, 300, 3600) # Seconds
+QUANTILES = (0.5, 0.95, 0.99)
+
+_UPLOAD = NIC_FIELDS.index('upload_mbps')
+_DOWNLOAD = NIC_FIELDS.index('download_mbps')
+
+
+def window_label(seconds):
+    if seconds % 3600 == 0:
+        return f'{seconds // 3600}h'
+    if seconds % 60 == 0:
+        return f'{seconds // 60}m'
+    return f'{seconds}s'
+
+
+def sample_metrics(sample):
+    nics = sample.nics()
+    width = len(NIC_FIELDS)
+    network = sum(nics[_UPLOAD::width]) + sum(nics[_DOWNLOAD::width])
+    return (sample.scalar('cpu_usage_percent', 0.0), sample.scalar('memory_percent', 0.0), network)
+
+
+class _Window:
+    # Everything one window keeps: the samples still inside it (to evict from
+    # the sketch), monotonic deques for the exact min/max, running sums.
+    # Counts and sums are weighted by the time a sample covers, see RollingStats.
+    def __init__(self, seconds, metrics, buckets):
+        self.seconds = seconds
+        # DDSketch bucket counts per metric. Plain lists: a sample touches one
+        # bucket per metric, indexing a list beats any numpy call at that size.
+        self.counts = [[0.0] * buckets for _ in range(metrics)]
+        self.weight = 0.0
+        self.entries = deque() # (timestamp, keys, values, weight)
+        self.minima = [deque() for _ in range(metrics)] # (timestamp, value), values increasing
+        self.maxima = [deque() for _ in range(metrics)] # (timestamp, value), values decreasing
+        self.sums = [0.0] * metrics
+        self._ewma = [0.0] * metrics
+        self._ewma_weight = 0.0 # Total weight so far, approaches 1 after a few windows
+        self._last = None
+
+    def add(self, timestamp, keys, values, weight):
+        self.entries.append((timestamp, keys, values, weight))
+        self.weight += weight
+        for i, value in enumerate(values):
+            self.counts[i][keys[i]] += weight
+            self.sums[i] += value * weight
+            minima = self.minima[i]
+            while minima and minima[-1][1] >= value:
+                minima.pop()
+            minima.append((timestamp, value))
+            maxima = self.maxima[i]
+            while maxima and maxima[-1][1] <= value:
+                maxima.pop()
+            maxima.append((timestamp, value))
+
+    def evict(self, now):
+        cutoff = now - self.seconds
+        entries = self.entries
+        while entries and entries[0][0] <= cutoff:
+            _, keys, values, weight = entries.popleft()
+            self.weight -= weight
+            for i, value in enumerate(values):
+                self.counts[i][keys[i]] -= weight
+                self.sums[i] -= value * weight
+        for monotonic in self.minima + self.maxima:
+            while monotonic and monotonic[0][0] <= cutoff:
+                monotonic.popleft()
+
+    def smooth(self, elapsed, values):
+        # Time-constant EWMA: a sample weighs by the time it covers, so any
+        # sample spacing works. Divided by the total weight, the start-up
+        # value is an average instead of being pulled towards zero.
+        weight = 1.0 - math.exp(-elapsed / self.seconds)
+        self._ewma = [ewma + weight * (value - ewma) for ewma, value in zip(self._ewma, values)]
+        self._ewma_weight += weight * (1.0 - self._ewma_weight)
+        self._last = values
+
+    def ewma(self, i):
+        if not self._ewma_weight:
+            return self._last[i]
+        return self._ewma[i] / self._ewma_weight
+
+
+class RollingStats:
+    # Incremental statistics of CPU, memory and network traffic over sliding
+    # time windows. Quantiles come from a DDSketch per window: values map to
+    # logarithmic buckets with `relative_accuracy` error, samples leaving the
+    # window decrement their bucket again, so an update is O(1) and a query
+    # only walks the bucket counts, never the history. A sample weighs the
+    # time since the previous one in units of the base interval, at most 1:
+    # a burst of fast samples doesn't outweigh the same time sampled slowly.
+    def __init__(self, windows=WINDOWS, relative_accuracy=0.01, min_value=1e-3, max_value=1e7, interval=1.0):
+        self.windows = tuple(sorted(windows))
+        self.interval = interval
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        # Bucket 0 holds everything below min_value (idle CPU, idle network)
+        self._offset = math.ceil(math.log(min_value) / self._log_gamma) - 1
+        self.buckets = math.ceil(math.log(max_value) / self._log_gamma) - self._offset + 1
+        self._state = [_Window(seconds, len(METRICS), self.buckets) for seconds in self.windows]
+        self._previous = None
+        self.count = 0
+        self._lock = threading.Lock() # Fed by the collector, read by the GUI or the daemon
+
+    def key(self, value):
+        if value < self.min_value:
+            return 0
+        return min(math.ceil(math.log(value) / self._log_gamma) - self._offset, self.buckets - 1)
+
+    def keys(self, values):
+        # key() for a whole block at once
+        values = np.asarray(values, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            keys = np.ceil(np.log(values) / self._log_gamma) - self._offset
+        keys = np.where(values < self.min_value, 0, keys)
+        return np.clip(keys, 0, self.buckets - 1).astype(np.intp)
+
+    def _value(self, keys):
+        # Midpoint (in relative terms) of the buckets
+        values = 2 * self.gamma ** (keys + self._offset) / (self.gamma + 1)
+        return np.where(keys == 0, 0.0, values)
+
+    def _add(self, timestamp, keys, values):
+        elapsed = 0.0 if self._previous is None else max(timestamp - self._previous, 0.0)
+        self._previous = timestamp
+        # Within the lateness tolerance a sample counts fully, so at a fixed rate the sketch stays an exact count
+        weight = 1.0 if not elapsed or self.interval <= 0 or elapsed >= self.interval * 0.9 else elapsed / self.interval
+        for window in self._state:
+            window.evict(timestamp)
+            window.add(timestamp, keys, values, weight)
+            window.smooth(elapsed, values)
+        self.count += 1
+
+    def update(self, timestamp, values):
+        values = tuple(max(float(value), 0.0) for value in values)
+        keys = tuple(self.key(value) for value in values)
+        with self._lock:
+            self._add(timestamp, keys, values)
+
+    def observe(self, timestamp, data):
+        # Monitor sink
+        sample = data if isinstance(data, Sample) else Sample.from_data(data)
+        self.update(timestamp, sample_metrics(sample))
+
+    def extend(self, timestamps, values):
+        # Bulk feed (restored history): bucket keys for the whole block in one go
+        values = np.maximum(np.asarray(values, dtype=float), 0.0)
+        keys = self.keys(values)
+        with self._lock:
+            for timestamp, row_keys, row in zip(np.asarray(timestamps).tolist(), keys.tolist(), values.tolist()):
+                self._add(timestamp, tuple(row_keys), tuple(row))
+
+    def backfill(self, store):
+        window = self.windows[-1]
+        timestamps = store.timestamps()
+        n = int(np.count_nonzero(timestamps > timestamps[-1] - window)) if len(timestamps) else 0
+        if not n:
+            return
+        network = store.network_total('upload_mbps', n) + store.network_total('download_mbps', n)
+        values = np.column_stack((store.column('cpu_usage_percent', n), store.column('memory_percent', n), network))
+        self.extend(store.timestamps(n), values)
+
+    def quantiles(self, window_index, quantiles=QUANTILES):
+        # One cumulative sum per metric, then a binary search per quantile
+        cumulative = np.cumsum(np.array(self._state[window_index].counts), axis=1)
+        totals = cumulative[:, -1]
+        result = np.zeros((len(METRICS), len(quantiles)))
+        for row, total in enumerate(totals.tolist()):
+            if total:
+                ranks = np.array(quantiles) * max(total - 1, 0.0)
+                result[row] = self._value(np.searchsorted(cumulative[row], ranks, side='right'))
+        return result
+
+    def snapshot(self):
+        result = {}
+        with self._lock:
+            for index, window in enumerate(self._state):
+                quantiles = self.quantiles(index)
+                size = len(window.entries)
+                stats = {}
+                for i, metric in enumerate(METRICS):
+                    if not size:
+                        continue
+                    low, high = window.minima[i][0][1], window.maxima[i][0][1]
+                    # The exact extremes bound the sketch's estimates
+                    entry = {f'p{round(q * 100)}': min(max(float(value), low), high) for q, value in zip(QUANTILES, quantiles[i])}
+                    entry.update({
+                        'min': low,
+                        'max': high,
+                        'mean': window.sums[i] / window.weight,
+                        'ewma': window.ewma(i),
+                    })
+                    stats[metric] = entry
+                result[window_label(window.seconds)] = stats
+        return result
@@ -0,0 +1,183 @@
+import math
+from array import array
+
+SCALAR_COLUMNS = (
+    'timestamp',
+    'cpu_usage_percent',
+    'cpu_freq_current_mhz',
+    'memory_total_gb',
+    'memory_used_gb',
+    'memory_percent',
+    'disk_total_gb',
+    'disk_used_gb',
+    'disk_percent',
+    'disk_read_mbps',
+    'disk_write_mbps',
+    'load_avg_1',
+)
+
+NIC_FIELDS = ('upload_mbps', 'download_mbps', 'errors_in', 'errors_out', 'dropped_in', 'dropped_out',
+              'packets_in_ps', 'packets_out_ps')
+MOUNT_FIELDS = ('total', 'used', 'free', 'percent')
+DISK_FIELDS = ('read_mbps', 'write_mbps', 'read_iops', 'write_iops', 'read_latency_ms', 'write_latency_ms')
+
+# Scalars of a sample: the stored columns, then the ones that are only shown live
+SAMPLE_SCALARS = SCALAR_COLUMNS[1:] + ('load_avg_5', 'load_avg_15', 'process_count')
+SCALAR_INDEX = {name: i for i, name in enumerate(SAMPLE_SCALARS)}
+
+# Non-numeric probe results, carried by reference
+EXTRA_KEYS = ('top_processes', 'temperatures')
+
+MISSING = math.nan # A scalar no probe has reported (yet)
+
+
+class Schema:
+    # Layout of Sample.values: SAMPLE_SCALARS, per-core usage, NIC_FIELDS per
+    # interface, MOUNT_FIELDS per mount, DISK_FIELDS per disk. Interned, so
+    # every sample with the same cores/interfaces/mounts/disks shares one
+    # instance and layout changes are an identity check.
+    __slots__ = ('cores', 'interfaces', 'mounts', 'disks', 'cores_at', 'nics_at', 'mounts_at', 'disks_at', 'width')
+    _interned = {}
+
+    def __init__(self, cores, interfaces, mounts, disks):
+        self.cores = cores
+        self.interfaces = interfaces
+        self.mounts = mounts # (mountpoint, fstype) pairs
+        self.disks = disks # Block device names
+        self.cores_at = len(SAMPLE_SCALARS)
+        self.nics_at = self.cores_at + cores
+        self.mounts_at = self.nics_at + len(interfaces) * len(NIC_FIELDS)
+        self.disks_at = self.mounts_at + len(mounts) * len(MOUNT_FIELDS)
+        self.width = self.disks_at + len(disks) * len(DISK_FIELDS)
+
+    @classmethod
+    def intern(cls, cores, interfaces=(), mounts=(), disks=()):
+        key = (cores, interfaces, mounts, disks)
+        schema = cls._interned.get(key)
+        if schema is None:
+            if len(cls._interned) >= 1024:
+                # Interface churn (containers, VPNs), live samples keep their own reference
+                cls._interned.clear()
+            schema = cls._interned[key] = cls(*key)
+        return schema
+
+
+class Sample:
+    # One collected sample as a flat float array plus its interned schema.
+    # Reads of the old nested dict shape (data['memory_percent'],
+    # data.get('network_stats', []), ...) still work, the nested parts are
+    # built on access.
+    __slots__ = ('schema', 'values', 'extras')
+
+    def __init__(self, schema, values, extras=None):
+        self.schema = schema
+        self.values = values
+        self.extras = extras
+
+    @classmethod
+    def from_data(cls, data):
+        # Accepts the compact probe output ('network', 'mounts') as well as the
+        # nested dict shape (synthetic data, restored history)
+        network = data.get('network')
+        if network is None:
+            network_stats = data.get('network_stats', ())
+            network = (tuple(stats['interface'] for stats in network_stats),
+                       [stats.get(field, 0.0) for stats in network_stats for field in NIC_FIELDS])
+        mounts = data.get('mounts')
+        if mounts is None:
+            disk_usages = data.get('disk_usages', ())
+            mounts = (tuple((part['mountpoint'], part['fstype']) for part in disk_usages),
+                      [part['usage'][field] for part in disk_usages for field in MOUNT_FIELDS])
+        disks = data.get('disks')
+        if disks is None:
+            disk_io_stats = data.get('disk_io_stats', ())
+            disks = (tuple(stats['device'] for stats in disk_io_stats),
+                     [stats.get(field, 0.0) for stats in disk_io_stats for field in DISK_FIELDS])
+
+        cores = data.get('cpu_usage_per_core_percent', ())
+        values = array('d', [data.get(name, MISSING) for name in SAMPLE_SCALARS])
+        values.extend(cores)
+        values.extend(network[1])
+        values.extend(mounts[1])
+        values.extend(disks[1])
+
+        extras = None
+        for key in EXTRA_KEYS:
+            if key in data:
+                if extras is None:
+                    extras = {}
+                extras[key] = data[key]
+        return cls(Schema.intern(len(cores), network[0], mounts[0], disks[0]), values, extras)
+
+    def scalar(self, name, default=None):
+        value = self.values[SCALAR_INDEX[name]]
+        return default if value != value else value
+
+    def cores(self):
+        return self.values[self.schema.cores_at:self.schema.nics_at]
+
+    def nics(self):
+        return self.values[self.schema.nics_at:self.schema.mounts_at]
+
+    def network_stats(self):
+        width = len(NIC_FIELDS)
+        nics = self.nics().tolist()
+        return [dict(zip(NIC_FIELDS, nics[i * width:(i + 1) * width]), interface=interface)
+                for i, interface in enumerate(self.schema.interfaces)]
+
+    def disk_usages(self):
+        width = len(MOUNT_FIELDS)
+        usage = self.values[self.schema.mounts_at:self.schema.disks_at].tolist()
+        return [{'mountpoint': mountpoint, 'fstype': fstype, 'usage': dict(zip(MOUNT_FIELDS, usage[i * width:(i + 1) * width]))}
+                for i, (mountpoint, fstype) in enumerate(self.schema.mounts)]
+
+    def disks(self):
+        return self.values[self.schema.disks_at:]
+
+    def disk_io_stats(self):
+        width = len(DISK_FIELDS)
+        disks = self.disks().tolist()
+        return [dict(zip(DISK_FIELDS, disks[i * width:(i + 1) * width]), device=device)
+                for i, device in enumerate(self.schema.disks)]
+
+    # Compatibility with the nested dict shape
+
+    def __getitem__(self, key):
+        index = SCALAR_INDEX.get(key)
+        if index is not None:
+            value = self.values[index]
+            if value != value:
+                raise KeyError(key)
+            return value
+        if key == 'cpu_usage_per_core_percent':
+            return self.cores().tolist()
+        if key == 'network_stats':
+            return self.network_stats()
+        if key == 'disk_usages':
+            return self.disk_usages()
+        if key == 'disk_io_stats':
+            return self.disk_io_stats()
+        if self.extras is not None and key in self.extras:
+            return self.extras[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def keys(self):
+        keys = [name for name in SAMPLE_SCALARS if name in self]
+        keys += ['cpu_usage_per_core_percent', 'network_stats', 'disk_usages', 'disk_io_stats']
+        return keys + list(self.extras or ())
+
+    def as_dict(self):
+        return {key: self[key] for key in self.keys()}
@@ -0,0 +1,112 @@
+import math
+from rolling import sample_metrics
+from sample import Sample
+
+# Share of the history that may be sampled at the burst rate. Stores and
+# training windows get room for it, once it is used up bursts pause until the
+# fast samples scroll out, so a retention still covers its base intervals.
+BURST_SHARE = 0.1
+
+# Smallest change that counts as sharp, however quiet the metric was: cpu and
+# memory in percentage points, network in Mbit/s, disk in MB/s
+CHANGE_FLOORS = (20.0, 5.0, 10.0, 20.0)
+
+
+def history_rows(samples, base_interval, burst_interval=None):
+    # Rows that hold `samples` base intervals when BURST_SHARE of them is sampled
+    # at burst_interval, None for a fixed rate
+    if burst_interval is None:
+        return samples
+    return math.ceil(samples * (1.0 - BURST_SHARE + BURST_SHARE * base_interval / burst_interval))
+
+
+def change_metrics(sample):
+    return sample_metrics(sample) + (sample.scalar('disk_read_mbps', 0.0) + sample.scalar('disk_write_mbps', 0.0),)
+
+
+class AdaptiveSampler:
+    # Picks the interval to the next sample. In steady state that is
+    # base_interval; a trigger (low anomaly score, a rule firing, a sharp
+    # metric change) switches to burst_interval for at least `hold` seconds,
+    # after which the interval grows by `decay` per sample back to the base.
+    # Driven by sample timestamps only, so a recording can be replayed through it.
+    def __init__(self, base_interval, burst_interval=0.1, hold=10.0, decay=2.0, sensitivity=6.0, tau=30.0):
+        if not 0 < burst_interval <= base_interval:
+            raise ValueError("burst_interval must be positive and at most the base interval")
+        if decay <= 1:
+            raise ValueError("decay must be greater than 1")
+        self.base_interval = base_interval
+        self.burst_interval = burst_interval
+        self.hold = hold
+        self.decay = decay
+        self.sensitivity = sensitivity # Change in units of the metric's recent mean deviation
+        self.tau = tau # Seconds, time constant of the baseline
+        self.interval = base_interval
+        self.burst_until = -math.inf
+        self.bursts = 0
+        self.triggers = {} # Reason -> count
+        self.paused = False # Set while the history has no room for fast samples, triggers are ignored
+        self.suppressed = 0
+        self._recent = None
+        self._mean = None
+        self._deviation = None
+        self._last = None
+
+    @property
+    def bursting(self):
+        return self.interval < self.base_interval
+
+    def trigger(self, reason, now):
+        if self.paused:
+            self.suppressed += 1
+            return
+        if now >= self.burst_until:
+            self.bursts += 1
+        self.burst_until = max(self.burst_until, now + self.hold)
+        self.triggers[reason] = self.triggers.get(reason, 0) + 1
+        self.interval = self.burst_interval
+
+    def next_interval(self, now):
+        if now < self.burst_until and not self.paused:
+            self.interval = self.burst_interval
+        else:
+            self.interval = min(self.base_interval, self.interval * self.decay)
+        return self.interval
+
+    def observe(self, timestamp, data):
+        # Monitor sink: a metric far outside its recent spread starts a burst
+        sample = data if isinstance(data, Sample) else Sample.from_data(data)
+        values = change_metrics(sample)
+        if self._mean is None:
+            self._recent = list(values)
+            self._mean = list(values)
+            self._deviation = [0.0] * len(values)
+            self._last = timestamp
+            return
+
+        # At the base rate the raw value is tested; faster samples are averaged over
+        # about one base interval, so the noise of 100 ms readings doesn't extend a burst.
+        # The baseline has a time constant, it moves as fast during a burst as between samples.
+        elapsed = max(timestamp - self._last, 0.0)
+        self._last = timestamp
+        span = min(elapsed / self.base_interval, 1.0)
+        weight = 1.0 - math.exp(-elapsed / self.tau)
+        sharp = False
+        for i, (value, floor) in enumerate(zip(values, CHANGE_FLOORS)):
+            value = self._recent[i] = self._recent[i] + span * (value - self._recent[i])
+            change = abs(value - self._mean[i])
+            if change > max(self.sensitivity * self._deviation[i], floor):
+                sharp = True
+            self._mean[i] += weight * (value - self._mean[i])
+            self._deviation[i] += weight * (change - self._deviation[i])
+        if sharp:
+            self.trigger('change', timestamp)
+
+    def stats(self):
+        return {
+            'interval_s': self.interval,
+            'bursting': self.bursting,
+            'bursts': self.bursts,
+            'triggers': dict(self.triggers),
+            'suppressed': self.suppressed,
+        }
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+
+class ServerThread:
+    # An asyncio TCP server on its own loop and thread. handler is the usual
+    # start_server callback, it runs on that loop. start() returns once the
+    # port is bound and raises there if it can't be (e.g. the port is taken);
+    # stop() closes the server and cancels the handlers still connected.
+    def __init__(self, handler, host, port, name):
+        self.handler = handler
+        self.host = host
+        self.port = port # The bound one after start(), for port 0
+        self.name = name
+        self.loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+    def _serve(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._server = self.loop.run_until_complete(
+                asyncio.start_server(self.handler, self.host, self.port, backlog=1024))
+        except OSError as e:
+            # Reported by start() on the caller's thread
+            self._error = e
+            self.loop.close()
+            self._ready.set()
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self.loop.run_forever()
+
+        # Keep-alive clients may still be connected, cancel their handlers
+        self._server.close()
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+    def start(self):
+        self._ready.clear()
+        self._error = None
+        self._thread = threading.Thread(target=self._serve, name=self.name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            self.loop = None
+            raise self._error
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self.loop = None
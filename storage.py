@@ -0,0 +1,428 @@
+import bisect
+import math
+import os
+import time
+import numpy as np
+from sample import DISK_FIELDS, NIC_FIELDS, Sample
+
+METRICS = (
+    'cpu_usage_percent',
+    'memory_percent',
+    'memory_used_gb',
+    'disk_percent',
+    'disk_read_mbps',
+    'disk_write_mbps',
+    'net_upload_mbps',
+    'net_download_mbps',
+    'net_errors',
+    'net_drops',
+    'load_avg_1',
+    # Format 2: what the detector features need beyond the totals above
+    'cpu_core_max',
+    'cpu_core_std',
+    'net_packets_ps',
+    'disk_iops',
+    'disk_latency_ms',
+)
+FORMAT = 2
+LEGACY_METRICS = METRICS[:11] # Format 1 segments, converted on load
+
+
+def _record_dtype(metrics):
+    return np.dtype([('timestamp', '<f8')] + [(name, '<f4') for name in metrics])
+
+
+def _rollup_dtype(metrics):
+    # Rollups keep mean (under the metric name), min, max and the number of raw samples
+    return np.dtype(
+        [('timestamp', '<f8'), ('count', '<u4')]
+        + [(name, '<f4') for name in metrics]
+        + [(f'{name}_min', '<f4') for name in metrics]
+        + [(f'{name}_max', '<f4') for name in metrics]
+    )
+
+
+# Raw samples: 72 bytes per record
+RECORD_DTYPE = _record_dtype(METRICS)
+ROLLUP_DTYPE = _rollup_dtype(METRICS)
+LEGACY_DTYPES = {RECORD_DTYPE: _record_dtype(LEGACY_METRICS), ROLLUP_DTYPE: _rollup_dtype(LEGACY_METRICS)}
+
+# name: (dtype, bucket width in seconds, records per segment, default retention in seconds)
+LEVELS = {
+    'raw': (RECORD_DTYPE, None, 86400, 7 * 86400),
+    '1m': (ROLLUP_DTYPE, 60, 43200, 90 * 86400),
+    '1h': (ROLLUP_DTYPE, 3600, 8760, None),
+}
+
+
+def record_from_sample(timestamp, data):
+    sample = data if isinstance(data, Sample) else Sample.from_data(data)
+    cores = np.asarray(sample.cores(), dtype=float)
+    nics = np.asarray(sample.nics(), dtype=float).reshape(-1, len(NIC_FIELDS)).sum(axis=0).tolist()
+    disks = np.asarray(sample.disks(), dtype=float).reshape(-1, len(DISK_FIELDS))
+    read_iops, write_iops = disks[:, 2], disks[:, 3]
+    iops = float(read_iops.sum() + write_iops.sum())
+    # Mean latency over all requests, as the detector computes it
+    busy = float((disks[:, 4] * read_iops).sum() + (disks[:, 5] * write_iops).sum())
+    return (
+        timestamp,
+        sample.scalar('cpu_usage_percent', 0.0),
+        sample.scalar('memory_percent', 0.0),
+        sample.scalar('memory_used_gb', 0.0),
+        sample.scalar('disk_percent', 0.0),
+        sample.scalar('disk_read_mbps', 0.0),
+        sample.scalar('disk_write_mbps', 0.0),
+        nics[0],
+        nics[1],
+        nics[2] + nics[3],
+        nics[4] + nics[5],
+        sample.scalar('load_avg_1', 0.0),
+        float(cores.max()) if len(cores) else 0.0,
+        float(cores.std()) if len(cores) else 0.0,
+        nics[6] + nics[7],
+        iops,
+        busy / iops if iops > 0 else 0.0,
+    )
+
+
+def _cores_like(mean, peak, std, cores):
+    # Per-core loads with the persisted mean, max and standard deviation: one
+    # core at the max, the others spread symmetrically around the remaining load
+    if cores < 2 or std <= 0:
+        return [mean] * cores
+    rest = (cores * mean - peak) / (cores - 1)
+    variance = (cores * (std ** 2 + mean ** 2) - peak ** 2) / (cores - 1) - rest ** 2
+    pairs = (cores - 1) // 2
+    spread = math.sqrt(max(variance, 0.0) * (cores - 1) / (2 * pairs)) if pairs else 0.0
+    return [peak] + [rest + spread, rest - spread] * pairs + [rest] * ((cores - 1) % 2)
+
+
+def sample_from_record(record, cores=1):
+    # Compatibility shape for SampleStore: per-core and per-device detail is not
+    # persisted, cores are rebuilt from their mean, max and spread, NICs and
+    # disks collapse into one device each. The detector features come out the same.
+    cpu = float(record['cpu_usage_percent'])
+    return {
+        'cpu_usage_percent': cpu,
+        'cpu_usage_per_core_percent': _cores_like(cpu, float(record['cpu_core_max']), float(record['cpu_core_std']), cores),
+        'memory_percent': float(record['memory_percent']),
+        'memory_used_gb': float(record['memory_used_gb']),
+        'disk_percent': float(record['disk_percent']),
+        'disk_read_mbps': float(record['disk_read_mbps']),
+        'disk_write_mbps': float(record['disk_write_mbps']),
+        'load_avg_1': float(record['load_avg_1']),
+        'network_stats': [{
+            'interface': 'total',
+            'upload_mbps': float(record['net_upload_mbps']),
+            'download_mbps': float(record['net_download_mbps']),
+            'errors_in': float(record['net_errors']),
+            'errors_out': 0,
+            'dropped_in': float(record['net_drops']),
+            'dropped_out': 0,
+            'packets_in_ps': float(record['net_packets_ps']),
+            'packets_out_ps': 0,
+        }],
+        'disk_io_stats': [{
+            'device': 'total',
+            'read_mbps': float(record['disk_read_mbps']),
+            'write_mbps': float(record['disk_write_mbps']),
+            'read_iops': float(record['disk_iops']),
+            'write_iops': 0,
+            'read_latency_ms': float(record['disk_latency_ms']),
+            'write_latency_ms': 0,
+        }],
+    }
+
+
+def _as_rollup(records):
+    rollup = np.zeros(len(records), ROLLUP_DTYPE)
+    rollup['timestamp'] = records['timestamp']
+    rollup['count'] = 1
+    for name in METRICS:
+        rollup[name] = records[name]
+        rollup[f'{name}_min'] = records[name]
+        rollup[f'{name}_max'] = records[name]
+    return rollup
+
+
+def _aggregate(rollup, width):
+    # Groups consecutive records into time buckets with one reduceat per column
+    buckets = np.floor(rollup['timestamp'] / width)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.add.reduceat(rollup['count'].astype(np.float64), starts)
+
+    out = np.zeros(len(starts), ROLLUP_DTYPE)
+    out['timestamp'] = buckets[starts] * width
+    out['count'] = counts
+    for name in METRICS:
+        weighted = rollup[name].astype(np.float64) * rollup['count']
+        out[name] = np.add.reduceat(weighted, starts) / counts
+        out[f'{name}_min'] = np.minimum.reduceat(rollup[f'{name}_min'], starts)
+        out[f'{name}_max'] = np.maximum.reduceat(rollup[f'{name}_max'], starts)
+    return out
+
+
+class _SegmentLevel:
+    def __init__(self, directory, name, dtype, segment_records):
+        self.directory = directory
+        self.name = name
+        self.dtype = dtype
+        self.segment_records = segment_records
+        self.segments = [] # [path, start_ts, end_ts, count], ordered by time
+        self._maps = {}
+        self._active = None
+        self._load()
+
+    def _load(self):
+        prefix = f'{self.name}-'
+        for filename in sorted(os.listdir(self.directory)):
+            if not (filename.startswith(prefix) and filename.endswith('.seg')):
+                continue
+            path = os.path.join(self.directory, filename)
+            if not filename.endswith(f'.v{FORMAT}.seg'):
+                path = self._convert(path)
+            size = os.path.getsize(path)
+            count = size // self.dtype.itemsize
+            if size != count * self.dtype.itemsize:
+                # A record torn by a crash mid-write, appends must start on a record boundary
+                os.truncate(path, count * self.dtype.itemsize)
+            if count == 0:
+                os.remove(path)
+                continue
+            records = np.memmap(path, dtype=self.dtype, mode='r', shape=(count,))
+            self.segments.append([path, float(records[0]['timestamp']), float(records[-1]['timestamp']), count])
+            del records
+
+    def _convert(self, path):
+        # A format 1 segment: the fields it lacks are NaN, "not recorded"
+        legacy = LEGACY_DTYPES[self.dtype]
+        records = np.fromfile(path, dtype=legacy, count=os.path.getsize(path) // legacy.itemsize)
+        converted = np.zeros(len(records), self.dtype)
+        for name in self.dtype.names:
+            converted[name] = records[name] if name in legacy.names else np.nan
+        target = path[:-len('.seg')] + f'.v{FORMAT}.seg'
+        converted.tofile(target + '.tmp')
+        os.replace(target + '.tmp', target)
+        os.remove(path)
+        return target
+
+    def _path(self, start_ts):
+        return os.path.join(self.directory, f'{self.name}-{int(start_ts * 1000):015d}.v{FORMAT}.seg')
+
+    def write(self, records):
+        while len(records):
+            segment = self.segments[-1] if self.segments else None
+            if segment is None or segment[3] >= self.segment_records:
+                # Rotate: a new segment starts at the first record it will hold
+                if self._active is not None:
+                    self._active.close()
+                    self._active = None
+                segment = [self._path(records[0]['timestamp']), float(records[0]['timestamp']), 0.0, 0]
+                self.segments.append(segment)
+
+            if self._active is None:
+                self._active = open(segment[0], 'ab')
+
+            chunk = records[:self.segment_records - segment[3]]
+            self._active.write(chunk.tobytes())
+            self._active.flush()
+            segment[2] = float(chunk[-1]['timestamp'])
+            segment[3] += len(chunk)
+            self._maps.pop(segment[0], None)
+            records = records[len(chunk):]
+
+    def _records(self, segment):
+        path, _, _, count = segment
+        records = self._maps.get(path)
+        if records is None or len(records) != count:
+            records = np.memmap(path, dtype=self.dtype, mode='r', shape=(count,))
+            self._maps[path] = records
+        return records
+
+    def query(self, start, end):
+        # Segments don't overlap, so both bounds are sorted: O(log n) to find the candidates
+        first = bisect.bisect_left(self.segments, start, key=lambda segment: segment[2])
+        last = bisect.bisect_right(self.segments, end, key=lambda segment: segment[1])
+
+        parts = []
+        for segment in self.segments[first:last]:
+            records = self._records(segment)
+            timestamps = records['timestamp']
+            lo = np.searchsorted(timestamps, start, side='left')
+            hi = np.searchsorted(timestamps, end, side='right')
+            if hi > lo:
+                parts.append(records[lo:hi])
+        if not parts:
+            return np.zeros(0, self.dtype)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _drop(self, segment):
+        self._maps.pop(segment[0], None)
+        os.remove(segment[0])
+
+    def expire(self, before):
+        # The newest segment is kept open for appends, only closed ones expire
+        while len(self.segments) > 1 and self.segments[0][2] < before:
+            self._drop(self.segments.pop(0))
+
+    def merge_small(self):
+        # Restarts leave short segments behind; fold adjacent ones while they fit in one segment
+        closed = self.segments[:-1]
+        merged = []
+        group = []
+        for segment in closed + [None]:
+            if segment is not None and sum(s[3] for s in group) + segment[3] <= self.segment_records:
+                group.append(segment)
+                continue
+            if len(group) > 1:
+                combined = np.concatenate([np.array(self._records(s)) for s in group])
+                temporary = group[0][0] + '.tmp'
+                combined.tofile(temporary)
+                for s in group:
+                    self._drop(s)
+                os.replace(temporary, group[0][0])
+                merged.append([group[0][0], group[0][1], group[-1][2], len(combined)])
+            else:
+                merged.extend(group)
+            group = [segment] if segment is not None else []
+        self.segments = merged + self.segments[-1:]
+
+    def close(self):
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+        self._maps.clear()
+
+
+class SegmentStorage:
+    # Append-only on-disk history with 1 minute and 1 hour rollups. Raw records
+    # are buffered and written in batches of flush_records.
+    def __init__(self, directory, flush_records=60, retention=None, segment_records=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_records = flush_records
+        self.retention = {name: level[3] for name, level in LEVELS.items()}
+        self.retention.update(retention or {})
+
+        self.levels = {}
+        for name, (dtype, _, records, _) in LEVELS.items():
+            self.levels[name] = _SegmentLevel(directory, name, dtype, (segment_records or {}).get(name, records))
+
+        self._buffer = np.zeros(flush_records, RECORD_DTYPE)
+        self._buffered = 0
+        self._last_ts = self.levels['raw'].segments[-1][2] if self.levels['raw'].segments else float('-inf')
+        self._pending = {name: None for name, level in LEVELS.items() if level[1]}
+        self._restore_pending()
+
+    def _restore_pending(self):
+        # Open rollup buckets only live in memory: rebuild them from the tail of
+        # the level below, so a restart mid-minute or mid-hour loses nothing.
+        # Buckets that closed while nothing was running are written out first.
+        source = 'raw'
+        for name, (_, width, _, _) in LEVELS.items():
+            if width is None:
+                continue
+            level = self.levels[name]
+            start = level.segments[-1][2] + width if level.segments else float('-inf')
+            tail = self.levels[source].query(start, float('inf'))
+            if len(tail):
+                aggregated = _aggregate(_as_rollup(tail) if source == 'raw' else tail, width)
+                if len(aggregated) > 1:
+                    level.write(aggregated[:-1])
+                self._pending[name] = aggregated[-1:]
+            source = name
+
+    def append(self, timestamp, data):
+        self.append_record(record_from_sample(timestamp, data))
+
+    def append_record(self, record):
+        # The time index needs monotonic timestamps, a wall clock step back is clamped
+        if record[0] < self._last_ts:
+            record = (self._last_ts,) + tuple(record[1:])
+        self._last_ts = record[0]
+
+        self._buffer[self._buffered] = record
+        self._buffered += 1
+        if self._buffered == self.flush_records:
+            self.flush()
+
+    def append_records(self, records):
+        self.flush()
+        records = np.asarray(records, dtype=RECORD_DTYPE)
+        if len(records):
+            self._write_raw(records)
+            self._last_ts = float(records[-1]['timestamp'])
+
+    def flush(self):
+        if self._buffered:
+            records = self._buffer[:self._buffered].copy()
+            self._buffered = 0
+            self._write_raw(records)
+
+    def _write_raw(self, records):
+        self.levels['raw'].write(records)
+
+        rollup = _as_rollup(records)
+        for name, level in LEVELS.items():
+            width = level[1]
+            if width is None:
+                continue
+            # The last bucket is still open, carry it over to the next batch
+            pending = self._pending[name]
+            if pending is not None:
+                rollup = np.concatenate((pending, rollup))
+            aggregated = _aggregate(rollup, width)
+            self._pending[name] = aggregated[-1:]
+            closed = aggregated[:-1]
+            if not len(closed):
+                break
+            self.levels[name].write(closed)
+            rollup = closed
+
+    def query(self, start, end, resolution='raw'):
+        if resolution == 'auto':
+            resolution = self.resolution_for(start, end)
+        records = self.levels[resolution].query(start, end)
+        if resolution == 'raw' and self._buffered:
+            buffered = self._buffer[:self._buffered]
+            mask = (buffered['timestamp'] >= start) & (buffered['timestamp'] <= end)
+            if mask.any():
+                records = np.concatenate((records, buffered[mask]))
+        return records
+
+    def resolution_for(self, start, end, max_points=4000):
+        span = end - start
+        if span <= max_points:
+            return 'raw'
+        if span <= max_points * 60:
+            return '1m'
+        return '1h'
+
+    def latest(self, n):
+        # Newest n raw records, e.g. to warm up the in-memory store after a restart
+        self.flush()
+        parts = []
+        level = self.levels['raw']
+        for segment in reversed(level.segments):
+            if n <= 0:
+                break
+            records = level._records(segment)
+            parts.append(records[-n:])
+            n -= len(parts[-1])
+        if not parts:
+            return np.zeros(0, RECORD_DTYPE)
+        return np.concatenate(parts[::-1])
+
+    def compact(self, now=None):
+        now = time.time() if now is None else now
+        self.flush()
+        for name, level in self.levels.items():
+            retention = self.retention.get(name)
+            if retention is not None:
+                level.expire(now - retention)
+            level.merge_small()
+
+    def close(self):
+        self.flush()
+        for level in self.levels.values():
+            level.close()
@@ -0,0 +1,176 @@
+import numpy as np
+from sample import DISK_FIELDS, NIC_FIELDS, SCALAR_COLUMNS, Sample
+
+SCALAR_INDEX = {name: i for i, name in enumerate(SCALAR_COLUMNS)}
+
+
+OTHER_DEVICE = 'egyéb' # Column the devices over the limit are summed into
+
+
+class _DeviceColumns:
+    # Per-device rows (NICs, disks) of the mirrored buffer. A hot-plugged
+    # device gets a column, an unplugged one reads as zeros from then on and
+    # its column is handed to the next new device once the device has been
+    # gone for the whole retention window. With interface churn (containers,
+    # VPNs) more than `limit` devices can be in the window at once, the
+    # extras share the OTHER_DEVICE column, so totals stay exact.
+    def __init__(self, capacity, devices, fields, limit):
+        self.capacity = capacity
+        self.fields = fields
+        self.limit = max(limit, 2)
+        self.index = {} # Device name -> column index
+        self.names = [] # Column index -> device name
+        self.data = np.zeros((2 * capacity, min(devices, self.limit), len(fields)))
+        self._gone = {} # Column -> sample count when its device disappeared, oldest first
+        self._names = None # Device tuple of the previous sample, and its columns
+        self._columns = []
+        self._shared = False # Several devices of the current tuple write to OTHER_DEVICE
+
+    def write(self, pos, count, names, values):
+        if names is not self._names:
+            # Schemas are interned, the column lookup only reruns when the device set changes
+            self._remap(count, names)
+        row = self.data[pos]
+        row[:] = 0
+        if self._shared:
+            np.add.at(row, self._columns, values.reshape(-1, len(self.fields)))
+        elif self._columns:
+            row[self._columns] = values.reshape(-1, len(self.fields))
+        self.data[pos + self.capacity] = row
+
+    def _remap(self, count, names):
+        for name in names:
+            # A device that came back keeps its column
+            self._gone.pop(self.index.get(name), None)
+        columns = [self._column(name, count) for name in names]
+        present = set(columns)
+        for column in self._columns:
+            # The shared column stays, freeing it could leave the extras nowhere to go
+            if column not in present and self.names[column] != OTHER_DEVICE:
+                self._gone.setdefault(column, count)
+        self._columns = columns
+        self._shared = len(present) < len(columns)
+        self._names = names
+
+    def _column(self, name, count):
+        index = self.index.get(name)
+        if index is not None:
+            return index
+        if self._gone:
+            index, since = next(iter(self._gone.items()))
+            if count - since >= self.capacity:
+                # Nothing of the old device is left in the window, its column is all zeros
+                del self._gone[index]
+                del self.index[self.names[index]]
+                self.names[index] = name
+                self.index[name] = index
+                return index
+        if len(self.names) >= self.limit - 1 and name != OTHER_DEVICE:
+            return self._column(OTHER_DEVICE, count)
+        index = len(self.names)
+        if index == self.data.shape[1]:
+            grown = np.zeros((2 * self.capacity, min(2 * index, self.limit), len(self.fields)))
+            grown[:, :index] = self.data
+            self.data = grown
+        self.names.append(name)
+        self.index[name] = index
+        return index
+
+    def view(self, window, field):
+        return self.data[window, :len(self.names), self.fields.index(field)]
+
+    def clear(self):
+        self.index.clear()
+        self.names.clear()
+        self._gone.clear()
+        self._names = None
+        self._columns = []
+        self._shared = False
+
+
+class SampleStore:
+    # Fixed-capacity columnar ring buffer. Every row is written twice (at i and
+    # i + capacity), so the last n samples are always one contiguous slice and
+    # windowed reads are zero-copy views instead of wrap-around concatenations.
+    def __init__(self, capacity=3600, num_cores=None, max_interfaces=8, max_disks=4, max_devices=64):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = capacity
+        self.count = 0 # Total number of samples ever appended
+        self.latest = None
+        self._head = 0
+
+        self._scalars = np.zeros((2 * capacity, len(SCALAR_COLUMNS)))
+        self._cores = np.zeros((2 * capacity, num_cores)) if num_cores else None
+        self._net = _DeviceColumns(capacity, max_interfaces, NIC_FIELDS, max_devices)
+        self._disks = _DeviceColumns(capacity, max_disks, DISK_FIELDS, max_devices)
+        self.interfaces = self._net.index # Interface name -> column index
+        self.disks = self._disks.index # Disk name -> column index
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp, data):
+        sample = data if isinstance(data, Sample) else Sample.from_data(data)
+        schema = sample.schema
+        values = np.asarray(sample.values, dtype=float)
+        pos = self._head
+        mirror = pos + self.capacity
+
+        row = self._scalars[pos]
+        row[0] = timestamp
+        row[1:] = values[:len(SCALAR_COLUMNS) - 1]
+        np.nan_to_num(row, copy=False) # Metrics no probe has reported yet
+        self._scalars[mirror] = row
+
+        cores = values[schema.cores_at:schema.nics_at]
+        if self._cores is None or self._cores.shape[1] != len(cores):
+            self._cores = np.zeros((2 * self.capacity, len(cores)))
+        self._cores[pos] = cores
+        self._cores[mirror] = cores
+
+        self._net.write(pos, self.count, schema.interfaces, values[schema.nics_at:schema.mounts_at])
+        self._disks.write(pos, self.count, schema.disks, values[schema.disks_at:])
+
+        self._head = (pos + 1) % self.capacity
+        self.count += 1
+        self.latest = {'timestamp': timestamp, 'data': sample}
+
+    def _window(self, n):
+        size = len(self)
+        n = size if n is None else max(0, min(n, size))
+        end = self._head + self.capacity
+        return slice(end - n, end)
+
+    # The returned arrays are views into the buffer; copy them if they must
+    # outlive the next few appends.
+    def column(self, name, n=None):
+        return self._scalars[self._window(n), SCALAR_INDEX[name]]
+
+    def timestamps(self, n=None):
+        return self.column('timestamp', n)
+
+    def cores(self, n=None):
+        if self._cores is None:
+            return np.zeros((0, 0))
+        return self._cores[self._window(n)]
+
+    def network(self, field, n=None):
+        return self._net.view(self._window(n), field)
+
+    def network_total(self, field, n=None):
+        return self.network(field, n).sum(axis=1)
+
+    def disk(self, field, n=None):
+        return self._disks.view(self._window(n), field)
+
+    def disk_total(self, field, n=None):
+        return self.disk(field, n).sum(axis=1)
+
+    def clear(self):
+        self.count = 0
+        self.latest = None
+        self._head = 0
+        self._net.clear()
+        self._disks.clear()
@@ -0,0 +1,157 @@
+import tkinter as tk
+from sample import NIC_FIELDS
+
+AGGREGATED_INTERFACE_PREFIXES = ('veth',) # Container ends of veth pairs, hundreds on a busy host
+
+
+def interface_rows(interfaces, nics, hide_idle=False, aggregate_prefixes=()):
+    # (key, label, NIC_FIELDS values) per shown row sorted by name, plus the
+    # number of hidden idle rows. Interfaces with an aggregated prefix are
+    # summed into one row; idle means no traffic, errors or drops at all.
+    width = len(NIC_FIELDS)
+    nics = nics.tolist() if hasattr(nics, 'tolist') else list(nics)
+    rows = []
+    groups = {}
+    for i, interface in enumerate(interfaces):
+        values = nics[i * width:(i + 1) * width]
+        prefix = next((prefix for prefix in aggregate_prefixes if interface.startswith(prefix)), None)
+        if prefix is None:
+            rows.append((interface, interface, tuple(values)))
+            continue
+        group = groups.get(prefix)
+        if group is None:
+            groups[prefix] = [1, values]
+        else:
+            group[0] += 1
+            group[1] = [total + value for total, value in zip(group[1], values)]
+    for prefix, (count, values) in groups.items():
+        rows.append((f'{prefix}*', f'{prefix}* ({count})', tuple(values)))
+    rows.sort()
+
+    hidden = 0
+    if hide_idle:
+        shown = [row for row in rows if any(row[2])]
+        hidden = len(rows) - len(shown)
+        rows = shown
+    return rows, hidden
+
+
+class KeyedRows:
+    # Keeps a Treeview in sync with a list of keyed rows. Rows keep their iid
+    # across frames: only rows whose values changed are rewritten, new keys
+    # are inserted, vanished ones deleted, and rows are moved only when the
+    # order changed. Values are compared raw and formatted only on a change.
+    def __init__(self, tree, format=None):
+        self.tree = tree
+        self.format = format or (lambda values: values)
+        self._values = {} # iid -> raw values as shown
+        self._order = [] # iids in tree order
+        self.calls = 0 # Tree calls made by the last update
+
+    def update(self, rows):
+        # rows: (iid, raw values) in display order
+        tree = self.tree
+        calls = 0
+        keys = [iid for iid, _ in rows]
+        wanted = set(keys)
+        for iid in self._order:
+            if iid not in wanted:
+                tree.delete(iid)
+                del self._values[iid]
+                calls += 1
+
+        # Survivors first get their relative order, new rows are then inserted at their final index
+        current = [iid for iid in self._order if iid in wanted]
+        survivors = [iid for iid in keys if iid in self._values]
+        if current != survivors:
+            for rank, iid in enumerate(survivors):
+                if current[rank] != iid:
+                    tree.move(iid, '', rank)
+                    current.remove(iid)
+                    current.insert(rank, iid)
+                    calls += 1
+
+        values_by_iid = self._values
+        for index, (iid, values) in enumerate(rows):
+            shown = values_by_iid.get(iid)
+            if shown is None:
+                tree.insert('', index, iid=iid, values=self.format(values))
+                calls += 1
+            elif shown != values:
+                tree.item(iid, values=self.format(values))
+                calls += 1
+            values_by_iid[iid] = values
+        self._order = keys
+        self.calls = calls
+
+    def clear(self):
+        for iid in self._order:
+            self.tree.delete(iid)
+        self._values.clear()
+        self._order = []
+
+
+def _heat_colors(bands):
+    # Green through yellow to red
+    stops = ((0x2e, 0x7d, 0x32), (0xf9, 0xa8, 0x25), (0xc6, 0x28, 0x28))
+    colors = []
+    for band in range(bands):
+        position = band / (bands - 1) * (len(stops) - 1)
+        low = min(int(position), len(stops) - 2)
+        weight = position - low
+        rgb = (round(a + (b - a) * weight) for a, b in zip(stops[low], stops[low + 1]))
+        colors.append('#{:02x}{:02x}{:02x}'.format(*rgb))
+    return colors
+
+
+def heat_bands(loads, bands):
+    top = bands - 1
+    return [min(max(int(load * bands / 100), 0), top) if load == load else 0 for load in loads]
+
+
+class CoreHeatmap:
+    # One cell per core instead of a comma-joined label. Loads are bucketed
+    # into color bands, a frame only recolors the cells that changed band.
+    COLORS = _heat_colors(10)
+
+    def __init__(self, parent, columns=16, cell=14, gap=2):
+        self.columns = columns
+        self.cell = cell
+        self.gap = gap
+        self.canvas = tk.Canvas(parent, width=columns * (cell + gap), height=cell + gap, highlightthickness=0)
+        self.detail = tk.StringVar(value="")
+        self.canvas.bind('<Motion>', self._on_motion)
+        self.canvas.bind('<Leave>', lambda event: self.detail.set(""))
+        self._cells = []
+        self._bands = []
+        self._loads = []
+
+    def _layout(self, count):
+        self.canvas.delete('all')
+        step = self.cell + self.gap
+        self._cells = [self.canvas.create_rectangle(i % self.columns * step, i // self.columns * step,
+                                                    i % self.columns * step + self.cell, i // self.columns * step + self.cell,
+                                                    fill=self.COLORS[0], width=0)
+                       for i in range(count)]
+        self._bands = [0] * count
+        rows = max(1, -(-count // self.columns))
+        self.canvas.config(width=min(count, self.columns) * step, height=rows * step)
+
+    def update(self, loads):
+        loads = loads.tolist() if hasattr(loads, 'tolist') else list(loads)
+        if len(loads) != len(self._cells):
+            self._layout(len(loads))
+        for i, band in enumerate(heat_bands(loads, len(self.COLORS))):
+            if band != self._bands[i]:
+                self.canvas.itemconfigure(self._cells[i], fill=self.COLORS[band])
+                self._bands[i] = band
+        self._loads = loads
+
+    def _on_motion(self, event):
+        step = self.cell + self.gap
+        column, row = event.x // step, event.y // step
+        index = row * self.columns + column
+        if column < self.columns and 0 <= index < len(self._loads):
+            self.detail.set(f"#{index}: {self._loads[index]:.1f}%")
+        else:
+            self.detail.set("")